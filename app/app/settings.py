@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/2.1/ref/settings/
 """
 
 import os
+import sys
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -19,13 +20,26 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/2.1/howto/deployment/checklist/
 
+# Settings that differ between deployments are read from the environment,
+# with defaults suitable for production except for the secret key.
+def env_bool(name, default=False):
+    return os.environ.get(name, str(default)).lower() in ('1', 'true', 'yes')
+
+
+def env_list(name, default=''):
+    return [item for item in os.environ.get(name, default).split(',') if item]
+
+
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = '(5_+q%a&56e=kd8n4v-&en+0#x3*&0a8_%g1=5f+u7wx0khre3'
+SECRET_KEY = os.environ.get(
+    'SECRET_KEY',
+    '(5_+q%a&56e=kd8n4v-&en+0#x3*&0a8_%g1=5f+u7wx0khre3'
+)
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = env_bool('DEBUG')
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = env_list('ALLOWED_HOSTS', 'localhost,127.0.0.1')
 
 
 # Application definition
@@ -45,6 +59,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.HealthCheckMiddleware',
+    'core.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -78,12 +94,46 @@ WSGI_APPLICATION = 'app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.1/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+if os.environ.get('DB_HOST'):
+    # DB_POOL hands each worker thread a connection from an in-process pool
+    # for the length of a request, instead of one persistent connection
+    # per thread kept for DB_CONN_MAX_AGE seconds
+    DB_POOL = env_bool('DB_POOL')
+    DB_STATEMENT_TIMEOUT = int(os.environ.get('DB_STATEMENT_TIMEOUT', 30000))
+    DATABASES = {
+        'default': {
+            'ENGINE': 'core.db.backends.postgresql_pool' if DB_POOL
+            else 'django.db.backends.postgresql',
+            'HOST': os.environ['DB_HOST'],
+            'PORT': os.environ.get('DB_PORT', ''),
+            'NAME': os.environ.get('DB_NAME', 'app'),
+            'USER': os.environ.get('DB_USER', 'postgres'),
+            'PASSWORD': os.environ.get('DB_PASS', ''),
+            'CONN_MAX_AGE': 0 if DB_POOL
+            else int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+            'OPTIONS': {
+                # milliseconds, 0 disables the timeout
+                'options': f'-c statement_timeout={DB_STATEMENT_TIMEOUT}',
+            },
+            'POOL': {
+                'MIN_SIZE': int(os.environ.get('DB_POOL_MIN_SIZE', 0)),
+                'MAX_SIZE': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+                'TIMEOUT': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+            },
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        }
     }
-}
+
+# ping persistent and pooled connections before reusing them, once idle
+# for DB_CONN_HEALTH_CHECK_IDLE seconds
+DB_CONN_HEALTH_CHECKS = env_bool('DB_CONN_HEALTH_CHECKS', True)
+DB_CONN_HEALTH_CHECK_IDLE = int(os.environ.get('DB_CONN_HEALTH_CHECK_IDLE', 30))
 
 
 # Password validation
@@ -104,6 +154,21 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+PASSWORD_HASHERS = [
+    'core.hashers.BoundedPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+
+PASSWORD_HASHING_ITERATIONS = 120000
+# hashes computed at once by all the worker processes and threads, 0 for no
+# bound, a hash waiting PASSWORD_HASHING_TIMEOUT seconds being computed anyway
+PASSWORD_HASHING_CONCURRENCY = int(os.environ.get(
+    'PASSWORD_HASHING_CONCURRENCY', os.cpu_count() or 1
+))
+PASSWORD_HASHING_TIMEOUT = 10
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/2.1/topics/i18n/
@@ -125,7 +190,139 @@ USE_TZ = True
 STATIC_URL = '/static/'
 MEDIA_URL = '/media/'
 
-MEDIA_ROOT = '/vol/web/media'
-STATIC_ROOT = '/vol/web/static'
+MEDIA_ROOT = os.environ.get('MEDIA_ROOT', '/vol/web/media')
+STATIC_ROOT = os.environ.get('STATIC_ROOT', '/vol/web/static')
 
 AUTH_USER_MODEL='core.User'
+
+API_PAGE_SIZE = 100
+API_MAX_PAGE_SIZE = 1000
+RECIPE_EXPORT_CHUNK_SIZE = 500
+
+# The token, list and failed login caches must be shared by every worker
+# process, so PostgreSQL deployments default to memcached. CACHE_BACKEND is
+# 'locmem', 'memcached', 'db' (the table made by createcachetable) or the
+# dotted path of a backend, found at CACHE_LOCATION.
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'db': 'django.core.cache.backends.db.DatabaseCache',
+    'memcached': 'django.core.cache.backends.memcached.MemcachedCache',
+}
+CACHE_LOCATIONS = {
+    'db': 'cache',
+    'memcached': '127.0.0.1:11211',
+}
+CACHE_BACKEND = os.environ.get(
+    'CACHE_BACKEND', 'memcached' if os.environ.get('DB_HOST') else 'locmem'
+)
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS.get(CACHE_BACKEND, CACHE_BACKEND),
+        'LOCATION': os.environ.get(
+            'CACHE_LOCATION', CACHE_LOCATIONS.get(CACHE_BACKEND, '')
+        ),
+    }
+}
+
+# the token and list caches only save database queries, which the database
+# cache would trade for queries of its own, so None turns them off with it
+AUTH_TOKEN_CACHE = None if CACHE_BACKEND == 'db' else 'default'
+AUTH_TOKEN_CACHE_TTL = 300
+
+RECIPE_LIST_CACHE = None if CACHE_BACKEND == 'db' else 'default'
+RECIPE_LIST_CACHE_TTL = 300
+
+API_MAX_BULK_SIZE = 1000
+
+LOGIN_FAILURES_CACHE = 'default'
+LOGIN_FAILURES_LIMIT = 5
+LOGIN_FAILURES_WINDOW = 300
+
+RECIPE_IMAGE_VARIANTS = {
+    'thumbnail': 200,
+    'medium': 800,
+    'large': 1600,
+}
+RECIPE_IMAGE_QUALITY = 80
+RECIPE_IMAGE_WORKERS = 2
+RECIPE_IMAGE_MAX_BYTES = 10 * 2 ** 20
+RECIPE_IMAGE_MAX_DIMENSIONS = (8000, 8000)
+
+DEFAULT_FILE_STORAGE = 'core.storage.ContentAddressedStorage'
+CONTENT_ADDRESSED_DIRS = ['upload/recipe']
+# saved files are kept from being collected until the transaction saving
+# them commits, or for at most CONTENT_ADDRESSED_PENDING_TIMEOUT seconds
+CONTENT_ADDRESSED_CACHE = 'default'
+CONTENT_ADDRESSED_PENDING_TIMEOUT = 300
+
+MEDIA_MAX_AGE = 3600
+MEDIA_IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+# URL prefix of an nginx internal location aliased to MEDIA_ROOT, e.g.
+# '/protected-media/', to let nginx send media files with X-Accel-Redirect
+MEDIA_ACCEL_REDIRECT = os.environ.get('MEDIA_ACCEL_REDIRECT')
+
+# core.middleware logs every request and recipe.images every processed
+# image as JSON lines holding their measures, on stderr at LOG_LEVEL, which
+# defaults to WARNING while the tests run to keep their output readable
+LOG_LEVEL = os.environ.get(
+    'LOG_LEVEL', 'WARNING' if sys.argv[1:2] == ['test'] else 'INFO'
+)
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'structured': {
+            '()': 'core.logs.StructuredFormatter',
+        },
+    },
+    'handlers': {
+        'structured': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'structured',
+        },
+    },
+    'loggers': {
+        'core.middleware': {
+            'handlers': ['structured'],
+            'level': LOG_LEVEL,
+            'propagate': False,
+        },
+        'recipe.images': {
+            'handlers': ['structured'],
+            'level': LOG_LEVEL,
+            'propagate': False,
+        },
+    },
+}
+
+# send the per request measures of core.middleware.MetricsMiddleware back in
+# a Server-Timing header to every client, instead of staff users only
+SERVER_TIMING = env_bool('SERVER_TIMING', DEBUG)
+
+# fail /readyz until every migration is applied
+READYZ_CHECK_MIGRATIONS = env_bool('READYZ_CHECK_MIGRATIONS', True)
+
+# 'auto' searches recipes with the full-text index of the database,
+# 'icontains' with plain substring lookups
+RECIPE_SEARCH_BACKEND = os.environ.get('RECIPE_SEARCH_BACKEND', 'auto')
+RECIPE_SEARCH_CONFIG = 'english'
+
+# core.renderers and core.parsers encode JSON with orjson when it is
+# installed, and speak MessagePack with clients sending or accepting
+# application/msgpack
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.JSONRenderer',
+        'core.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.JSONParser',
+        'core.parsers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    # the number of proxies in front of the app, whose X-Forwarded-For
+    # entries identify clients, e.g. when counting their failed logins
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 0)),
+}
@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        # the password hashing slots are made here, before gunicorn forks
+        # the workers sharing them
+        from core import hashers, signals  # noqa: F401
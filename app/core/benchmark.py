@@ -0,0 +1,371 @@
+import json
+import random
+import re
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.error import HTTPError
+from urllib.parse import urljoin
+from urllib.request import Request, urlopen
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from PIL import Image
+
+from core.models import Tag, Ingredients, Recipe
+from core.search import index_recipes
+from core.stats import rebuild_recipe_stats
+
+
+BENCHMARK_EMAIL = 'bench-{}@benchmark.test'
+QUERIES_RE = re.compile(r'(?:^|,\s*)queries;desc="?(\d+)"?')
+SCENARIOS = (
+    'list', 'detail', 'filter', 'search', 'create', 'upload', 'token', 'tags',
+)
+# words the recipe titles are made of, and searched for
+TITLE_WORDS = (
+    'apple', 'baked', 'bean', 'beef', 'bread', 'butter', 'cake', 'carrot',
+    'cheese', 'chicken', 'chili', 'chocolate', 'coconut', 'creamy', 'curry',
+    'egg', 'fish', 'fried', 'garlic', 'ginger', 'grilled', 'honey', 'lamb',
+    'lemon', 'lentil', 'mango', 'mushroom', 'noodle', 'onion', 'pasta',
+    'pepper', 'pie', 'pork', 'potato', 'pumpkin', 'rice', 'roasted', 'salad',
+    'salmon', 'soup', 'spicy', 'spinach', 'stew', 'sweet', 'tofu', 'tomato',
+)
+
+
+def parse_distribution(value):
+    """ Parse 'N' or 'MIN-MAX' into the (min, max) of a uniform count """
+    low, _, high = str(value).partition('-')
+    low = int(low)
+    high = int(high) if high else low
+    if low < 0 or high < low:
+        raise ValueError(f'invalid distribution {value!r}')
+
+    return low, high
+
+
+def generate_data(users, tags, ingredients, recipes, recipe_tags,
+                  recipe_ingredients, password, seed=0, batch_size=1000):
+    """ Create benchmark users with their tags, ingredients and recipes
+
+    Every count except users is a (min, max) distribution sampled per
+    user, or per recipe for its tags and ingredients, from a random
+    generator seeded with seed, so that a run can be reproduced. Rows are
+    inserted in bulk, which skips the signals, so the list caches of the
+    new users start empty.
+    """
+    rng = random.Random(seed)
+    hashed = make_password(password)
+    User = get_user_model()
+    counts = {'users': 0, 'tags': 0, 'ingredients': 0, 'recipes': 0}
+    offset = User.objects.filter(email__endswith='@benchmark.test').count()
+
+    for index in range(offset, offset + users):
+        with transaction.atomic():
+            user = User.objects.create(
+                email=BENCHMARK_EMAIL.format(index),
+                name=f'Benchmark {index}',
+                password=hashed
+            )
+            tag_ids = _create_names(
+                Tag, user, 'tag', rng.randint(*tags), batch_size
+            )
+            ingredient_ids = _create_names(
+                Ingredients, user, 'ingredient',
+                rng.randint(*ingredients), batch_size
+            )
+            created = _create_recipes(
+                user, rng, rng.randint(*recipes), tag_ids, recipe_tags,
+                ingredient_ids, recipe_ingredients, batch_size
+            )
+        counts['users'] += 1
+        counts['tags'] += len(tag_ids)
+        counts['ingredients'] += len(ingredient_ids)
+        counts['recipes'] += created
+
+    return counts
+
+
+def _bulk_create(model, objs, batch_size):
+    """ Insert objs in batches the database can take in one statement """
+    batch_size = min(batch_size, max(connection.ops.bulk_batch_size(
+        model._meta.concrete_fields, objs
+    ), 1))
+    model.objects.bulk_create(objs, batch_size=batch_size)
+
+
+def _create_names(model, user, prefix, count, batch_size):
+    _bulk_create(
+        model,
+        [model(user=user, name=f'{prefix}-{i}') for i in range(count)],
+        batch_size
+    )
+    return list(
+        model.objects.filter(user=user).values_list('id', flat=True)
+    )
+
+
+def _sample_ids(rng, ids, distribution):
+    count = min(rng.randint(*distribution), len(ids))
+    return rng.sample(ids, count)
+
+
+def _create_recipes(user, rng, count, tag_ids, recipe_tags, ingredient_ids,
+                    recipe_ingredients, batch_size):
+    _bulk_create(Recipe, [
+        Recipe(
+            user=user,
+            title=' '.join(rng.sample(TITLE_WORDS, 3)),
+            time_minutes=rng.randint(1, 240),
+            price=f'{rng.uniform(1, 100):.2f}'
+        )
+        for i in range(count)
+    ], batch_size)
+    recipe_ids = list(
+        Recipe.objects.filter(user=user).values_list('id', flat=True)
+    )
+
+    tag_links = []
+    ingredient_links = []
+    for recipe_id in recipe_ids:
+        tag_links.extend(
+            Recipe.tag.through(recipe_id=recipe_id, tag_id=tag_id)
+            for tag_id in _sample_ids(rng, tag_ids, recipe_tags)
+        )
+        ingredient_links.extend(
+            Recipe.ingredients.through(
+                recipe_id=recipe_id, ingredients_id=ingredient_id
+            )
+            for ingredient_id in _sample_ids(
+                rng, ingredient_ids, recipe_ingredients
+            )
+        )
+    _bulk_create(Recipe.tag.through, tag_links, batch_size)
+    _bulk_create(Recipe.ingredients.through, ingredient_links, batch_size)
+    # bulk inserts skip the signals keeping the search index and the
+    # recipe statistics up to date
+    index_recipes(recipe_ids)
+    rebuild_recipe_stats([user.id])
+
+    return count
+
+
+def percentile(values, percent):
+    """ Return the nearest rank percentile of values """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(int(len(ordered) * percent / 100 + 0.5), 1)
+
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def sample_image():
+    """ Return the bytes of a small JPEG image """
+    content = BytesIO()
+    Image.new('RGB', (64, 64), (200, 100, 50)).save(content, 'JPEG')
+    return content.getvalue()
+
+
+class Harness:
+    """ Drive the API of a running server with concurrent requests
+
+    Every benchmark user logs in through the token endpoint first, and
+    the ids of their recipes and tags are read from the API, so the
+    harness only needs the URL of the server and the users' password.
+    """
+
+    def __init__(self, base_url, users, password, concurrency=8,
+                 requests=200, scenarios=SCENARIOS, timeout=30):
+        self.base_url = base_url
+        self.users = users
+        self.password = password
+        self.concurrency = concurrency
+        self.requests = requests
+        self.scenarios = scenarios
+        self.timeout = timeout
+        self.image = sample_image()
+
+    def request(self, method, path, token=None, body=None,
+                content_type='application/json'):
+        """ Send one request, returning (status, body, seconds, queries) """
+        headers = {}
+        if token is not None:
+            headers['Authorization'] = f'Token {token}'
+        if body is not None:
+            headers['Content-Type'] = content_type
+        req = Request(
+            urljoin(self.base_url, path), data=body, headers=headers,
+            method=method
+        )
+        start = time.perf_counter()
+        try:
+            with urlopen(req, timeout=self.timeout) as res:
+                status, content = res.status, res.read()
+                server_timing = res.headers.get('Server-Timing', '')
+        except HTTPError as error:
+            status, content = error.code, error.read()
+            server_timing = error.headers.get('Server-Timing', '')
+        duration = time.perf_counter() - start
+
+        match = QUERIES_RE.search(server_timing)
+        queries = int(match.group(1)) if match else None
+        return status, content, duration, queries
+
+    def login(self, email):
+        body = json.dumps({'email': email, 'password': self.password})
+        status, content, _, _ = self.request(
+            'POST', '/api/user/token/', body=body.encode()
+        )
+        if status != 200:
+            raise RuntimeError(f'cannot log in {email}: {status}')
+
+        return json.loads(content)['token']
+
+    def load_ids(self, token, path):
+        status, content, _, _ = self.request('GET', path, token)
+        if status != 200:
+            raise RuntimeError(f'cannot list {path}: {status}')
+
+        return [item['id'] for item in json.loads(content)['results']]
+
+    def setup(self):
+        """ Log the users in and load the ids the scenarios refer to """
+        self.sessions = []
+        for index in range(self.users):
+            email = BENCHMARK_EMAIL.format(index)
+            token = self.login(email)
+            self.sessions.append({
+                'email': email,
+                'token': token,
+                'recipes': self.load_ids(token, '/api/recipe/recipes/'),
+                'tags': self.load_ids(token, '/api/recipe/tags/'),
+            })
+
+    def scenario_request(self, scenario, session, rng):
+        """ Return the (method, path, body, content type) of a request """
+        token_path = '/api/user/token/'
+        recipes = '/api/recipe/recipes/'
+        if scenario == 'list':
+            return 'GET', recipes, None, None
+        if scenario == 'tags':
+            return 'GET', '/api/recipe/tags/', None, None
+        if scenario == 'detail' and session['recipes']:
+            recipe_id = rng.choice(session['recipes'])
+            return 'GET', f'{recipes}{recipe_id}/', None, None
+        if scenario == 'filter' and session['tags']:
+            tags = rng.sample(session['tags'], min(2, len(session['tags'])))
+            query = ','.join(str(tag_id) for tag_id in tags)
+            return 'GET', f'{recipes}?tag={query}', None, None
+        if scenario == 'search':
+            query = rng.choice(TITLE_WORDS)
+            return 'GET', f'{recipes}?q={query}', None, None
+        if scenario == 'create':
+            body = json.dumps({
+                'title': f'Benchmark {uuid.uuid4().hex[:8]}',
+                'time_minutes': rng.randint(1, 240),
+                'price': '9.99',
+                'tag': session['tags'][:2],
+                'ingredients': [],
+            })
+            return 'POST', recipes, body.encode(), 'application/json'
+        if scenario == 'upload' and session['recipes']:
+            recipe_id = rng.choice(session['recipes'])
+            boundary = uuid.uuid4().hex
+            body = (
+                f'--{boundary}\r\nContent-Disposition: form-data; '
+                f'name="image"; filename="bench.jpg"\r\n'
+                f'Content-Type: image/jpeg\r\n\r\n'
+            ).encode() + self.image + f'\r\n--{boundary}--\r\n'.encode()
+            return (
+                'POST', f'{recipes}{recipe_id}/upload-image/', body,
+                f'multipart/form-data; boundary={boundary}'
+            )
+        if scenario == 'token':
+            body = json.dumps({
+                'email': session['email'],
+                'password': self.password,
+            })
+            return 'POST', token_path, body.encode(), 'application/json'
+
+        return None
+
+    def run_scenario(self, scenario, seed=0):
+        """ Send the requests of one scenario concurrently """
+        rng = random.Random(seed)
+        planned = []
+        for index in range(self.requests):
+            session = self.sessions[index % len(self.sessions)]
+            spec = self.scenario_request(scenario, session, rng)
+            if spec is not None:
+                planned.append((session, spec))
+
+        def send(item):
+            session, (method, path, body, content_type) = item
+            token = session['token'] if scenario != 'token' else None
+            return self.request(method, path, token, body, content_type)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            responses = list(executor.map(send, planned))
+        elapsed = time.perf_counter() - start
+
+        durations = [duration * 1000 for _, _, duration, _ in responses]
+        queries = [count for *_, count in responses if count is not None]
+        return {
+            'requests': len(responses),
+            'errors': sum(1 for status, *_ in responses if status >= 400),
+            'throughput': len(responses) / elapsed if elapsed else None,
+            'p50': percentile(durations, 50),
+            'p95': percentile(durations, 95),
+            'p99': percentile(durations, 99),
+            'queries': sum(queries) / len(queries) if queries else None,
+        }
+
+    def run(self):
+        self.setup()
+        return {
+            scenario: self.run_scenario(scenario)
+            for scenario in self.scenarios
+        }
+
+
+def compare(results, baseline, tolerance):
+    """ Return the regressions of results against a saved baseline
+
+    Latencies may grow and throughput may drop by the tolerance ratio,
+    query counts may not grow at all.
+    """
+    regressions = []
+    for scenario, base in baseline.items():
+        current = results.get(scenario)
+        if current is None or not current['requests']:
+            continue
+        for key in ('p50', 'p95', 'p99'):
+            if base.get(key) and current[key] > base[key] * (1 + tolerance):
+                regressions.append(
+                    f'{scenario} {key} {current[key]:.1f}ms > '
+                    f'{base[key]:.1f}ms'
+                )
+        if base.get('throughput') and \
+                current['throughput'] < base['throughput'] * (1 - tolerance):
+            regressions.append(
+                f'{scenario} throughput {current["throughput"]:.1f}/s < '
+                f'{base["throughput"]:.1f}/s'
+            )
+        if base.get('queries') is not None and \
+                current['queries'] is not None and \
+                current['queries'] > base['queries']:
+            regressions.append(
+                f'{scenario} queries {current["queries"]:.1f} > '
+                f'{base["queries"]:.1f}'
+            )
+        if current['errors'] > base.get('errors', 0):
+            regressions.append(
+                f'{scenario} errors {current["errors"]} > '
+                f'{base.get("errors", 0)}'
+            )
+
+    return regressions
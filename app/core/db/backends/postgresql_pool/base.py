@@ -0,0 +1,125 @@
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db.backends.postgresql.base import \
+    DatabaseWrapper as PostgreSQLDatabaseWrapper
+from django.db.utils import OperationalError
+from psycopg2 import Error as DatabaseError, extensions
+from psycopg2.pool import ThreadedConnectionPool
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ConnectionPool:
+    """ Bounded pool of psycopg2 connections shared by a process' threads
+
+    Checking out a connection waits up to timeout seconds for one to be
+    returned once max_size are in use. With DB_CONN_HEALTH_CHECKS, the
+    connections left in the pool for DB_CONN_HEALTH_CHECK_IDLE seconds
+    or more are pinged before being handed out, and replaced if the
+    server dropped them.
+    """
+
+    def __init__(self, conn_params, min_size=0, max_size=10, timeout=10):
+        self.pool = ThreadedConnectionPool(min_size, max_size, **conn_params)
+        self.slots = threading.BoundedSemaphore(max_size)
+        self.max_size = max_size
+        self.timeout = timeout
+        # when each connection in the pool was returned, by id
+        self.returned_at = {}
+
+    def is_usable(self, connection):
+        try:
+            connection.cursor().execute('SELECT 1')
+        except DatabaseError:
+            return False
+        return True
+
+    def needs_check(self, connection):
+        """ Return whether a connection checked out sat idle long enough to
+        be pinged, new connections having just been opened
+        """
+        if not settings.DB_CONN_HEALTH_CHECKS:
+            return False
+        returned_at = self.returned_at.pop(id(connection), None)
+        return returned_at is not None and time.monotonic() - returned_at \
+            >= settings.DB_CONN_HEALTH_CHECK_IDLE
+
+    def getconn(self):
+        if not self.slots.acquire(timeout=self.timeout):
+            raise OperationalError('database connection pool exhausted')
+        try:
+            for attempt in range(self.max_size + 1):
+                connection = self.pool.getconn()
+                if not self.needs_check(connection) or \
+                        self.is_usable(connection):
+                    return connection
+                self.pool.putconn(connection, close=True)
+            raise OperationalError('no usable database connection')
+        except BaseException:
+            self.slots.release()
+            raise
+
+    def putconn(self, connection):
+        try:
+            broken = connection.closed or connection.get_transaction_status() \
+                == extensions.TRANSACTION_STATUS_UNKNOWN
+            self.pool.putconn(connection, close=bool(broken))
+            # the pool closes the connections past its min_size
+            if connection.closed:
+                self.returned_at.pop(id(connection), None)
+            else:
+                self.returned_at[id(connection)] = time.monotonic()
+        finally:
+            self.slots.release()
+
+
+def get_pool(alias, settings_dict, conn_params):
+    """ Return the pool of the database alias in this process
+
+    Pools are keyed by process id so that forked workers never share the
+    connections of their parent.
+    """
+    key = (os.getpid(), alias)
+    with _pools_lock:
+        if key not in _pools:
+            options = settings_dict.get('POOL', {})
+            _pools[key] = ConnectionPool(
+                conn_params,
+                min_size=options.get('MIN_SIZE', 0),
+                max_size=options.get('MAX_SIZE', 10),
+                timeout=options.get('TIMEOUT', 10)
+            )
+
+    return _pools[key]
+
+
+class DatabaseWrapper(PostgreSQLDatabaseWrapper):
+    """ PostgreSQL backend taking its connections from a ConnectionPool
+
+    Closing a connection returns it to the pool, so use it with
+    CONN_MAX_AGE = 0 to hand connections back at the end of each request.
+    """
+
+    def get_new_connection(self, conn_params):
+        self.pool = get_pool(self.alias, self.settings_dict, conn_params)
+        connection = self.pool.getconn()
+
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = options['isolation_level']
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.pool.putconn(self.connection)
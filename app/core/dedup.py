@@ -0,0 +1,66 @@
+from django.db import transaction
+from django.db.models import Count, Min
+from django.db.models.functions import Lower
+
+
+def duplicate_name_groups(model):
+    """ Return the (user id, lower name, kept id) of duplicated names """
+    return model.objects.annotate(lower_name=Lower('name')) \
+        .values('user_id', 'lower_name') \
+        .annotate(count=Count('id'), keep_id=Min('id')) \
+        .filter(count__gt=1) \
+        .order_by('user_id', 'lower_name') \
+        .values_list('user_id', 'lower_name', 'keep_id')
+
+
+def merge_group(model, through, column, user_id, lower_name, keep_id):
+    """ Merge the objects of a group into keep_id, re-pointing recipes """
+    duplicate_ids = list(
+        model.objects.annotate(lower_name=Lower('name'))
+        .filter(user_id=user_id, lower_name=lower_name)
+        .exclude(id=keep_id)
+        .values_list('id', flat=True)
+    )
+    linked = set(
+        through.objects.filter(**{f'{column}__in': duplicate_ids})
+        .values_list('recipe_id', flat=True)
+    )
+    linked -= set(
+        through.objects.filter(**{column: keep_id})
+        .values_list('recipe_id', flat=True)
+    )
+    through.objects.filter(**{f'{column}__in': duplicate_ids}).delete()
+    through.objects.bulk_create([
+        through(**{'recipe_id': recipe_id, column: keep_id})
+        for recipe_id in linked
+    ])
+    model.objects.filter(id__in=duplicate_ids).delete()
+
+    return len(duplicate_ids)
+
+
+def merge_duplicate_names(model, field_name, batch_size=100):
+    """ Merge the objects of model sharing a name case-insensitively
+
+    Each batch of groups is merged in its own transaction so that locks
+    on the recipe link table are only held briefly. Yields the user id
+    and the number of objects merged away for every group.
+    """
+    field = model._meta.apps.get_model('core', 'Recipe') \
+        ._meta.get_field(field_name)
+    through = field.remote_field.through
+    column = f'{field.m2m_reverse_field_name()}_id'
+
+    while True:
+        groups = list(duplicate_name_groups(model)[:batch_size])
+        if not groups:
+            return
+
+        with transaction.atomic():
+            merged = [
+                (user_id, merge_group(
+                    model, through, column, user_id, lower_name, keep_id
+                ))
+                for user_id, lower_name, keep_id in groups
+            ]
+        yield from merged
@@ -0,0 +1,88 @@
+import json
+from decimal import Decimal
+
+import msgpack
+from rest_framework.settings import api_settings
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# the line and paragraph separators are valid JSON but not JavaScript
+JS_UNSAFE = ((b'\xe2\x80\xa8', b'\\u2028'), (b'\xe2\x80\xa9', b'\\u2029'))
+
+
+class JSONEncoder(encoders.JSONEncoder):
+    """ DRF's encoder, rendering raw decimals like the serializers do
+
+    DRF turns a Decimal met outside of a serializer field into a float,
+    while its DecimalField gives a string. Both become the same here,
+    following COERCE_DECIMAL_TO_STRING.
+    """
+
+    def default(self, obj):
+        if isinstance(obj, Decimal):
+            return str(obj) if api_settings.COERCE_DECIMAL_TO_STRING \
+                else float(obj)
+
+        return super().default(obj)
+
+
+_encoder = JSONEncoder()
+
+
+def to_primitive(obj):
+    """ Return the JSON compatible value of an object neither orjson nor
+    msgpack know, such as lazy translations, decimals and UUIDs
+    """
+    return _encoder.default(obj)
+
+
+def json_dumps(data):
+    """ Encode data as compact UTF-8 JSON, with orjson when installed """
+    if orjson is not None:
+        content = orjson.dumps(
+            data, default=to_primitive, option=orjson.OPT_NON_STR_KEYS
+        )
+    else:
+        content = json.dumps(
+            data, cls=JSONEncoder, ensure_ascii=False, allow_nan=False,
+            separators=(',', ':')
+        ).encode()
+    for unsafe, escaped in JS_UNSAFE:
+        content = content.replace(unsafe, escaped)
+
+    return content
+
+
+def _reject_constant(value):
+    raise ValueError(f'Out of range float values are not JSON compliant: '
+                     f'{value!r}')
+
+
+def json_loads(content):
+    """ Decode JSON bytes, with orjson when installed
+
+    Raises ValueError on invalid JSON. Numbers with a fraction become
+    floats either way, which DecimalField turns back into the decimal
+    they were written as.
+    """
+    if orjson is not None:
+        return orjson.loads(content)
+
+    return json.loads(content, parse_constant=_reject_constant)
+
+
+def msgpack_dumps(data):
+    """ Encode data as MessagePack, objects converted as for JSON """
+    return msgpack.packb(data, default=to_primitive, use_bin_type=True)
+
+
+def msgpack_loads(content):
+    """ Decode MessagePack bytes, raising ValueError when invalid """
+    try:
+        return msgpack.unpackb(content, raw=False)
+    except (msgpack.UnpackException, TypeError, ValueError) as error:
+        raise ValueError(str(error))
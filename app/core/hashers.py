@@ -0,0 +1,59 @@
+import logging
+import multiprocessing
+import threading
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+logger = logging.getLogger(__name__)
+
+
+def create_hashing_slots():
+    """ Return the semaphore bounding the number of concurrent hashes
+
+    A multiprocessing semaphore is shared with the processes forked after
+    it is made, so the gunicorn workers forked from the master that
+    preloaded the app share a single bound. Platforms without a working
+    sem_open only bound the threads of each process.
+    """
+    size = settings.PASSWORD_HASHING_CONCURRENCY or 1
+    try:
+        return multiprocessing.BoundedSemaphore(size)
+    except (ImportError, OSError):
+        return threading.BoundedSemaphore(size)
+
+
+# made when the app is loaded, see core.apps
+hashing_slots = create_hashing_slots()
+
+
+class BoundedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """ PBKDF2 hasher bounding the number of hashes computed at once
+
+    At most PASSWORD_HASHING_CONCURRENCY hashes use the CPUs at once
+    across every worker process and thread, however many logins arrive
+    together, the others waiting for a slot. A hash waiting longer than
+    PASSWORD_HASHING_TIMEOUT seconds, as when a killed worker never gave
+    its slot back, is computed anyway. Stored hashes using another
+    iteration count are upgraded by Django on the next successful login.
+    """
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_HASHING_ITERATIONS
+
+    def encode(self, password, salt, iterations=None):
+        if not settings.PASSWORD_HASHING_CONCURRENCY:
+            return super().encode(password, salt, iterations)
+
+        acquired = hashing_slots.acquire(
+            timeout=settings.PASSWORD_HASHING_TIMEOUT
+        )
+        if not acquired:
+            logger.warning('password hashed without waiting for a slot')
+        try:
+            return super().encode(password, salt, iterations)
+        finally:
+            if acquired:
+                hashing_slots.release()
@@ -0,0 +1,29 @@
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+
+_migrated = set()
+
+
+def check_database(alias=DEFAULT_DB_ALIAS):
+    """ Run a trivial query, raising OperationalError if it fails """
+    with connections[alias].cursor() as cursor:
+        cursor.execute('SELECT 1')
+        cursor.fetchone()
+
+
+def pending_migrations(alias=DEFAULT_DB_ALIAS):
+    """ Return the migrations not applied to the database yet
+
+    Loading the migration graph is slow, so once every migration is
+    applied the result is remembered for the life of the process.
+    """
+    if alias in _migrated:
+        return []
+
+    executor = MigrationExecutor(connections[alias])
+    plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+    pending = [migration for migration, backwards in plan]
+    if not pending:
+        _migrated.add(alias)
+
+    return pending
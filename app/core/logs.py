@@ -0,0 +1,25 @@
+import json
+import logging
+
+# the attributes of every log record, anything else was passed in extra
+RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {'message'}
+
+
+class StructuredFormatter(logging.Formatter):
+    """ Format records as JSON lines holding the fields passed in extra """
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update(
+            (key, value) for key, value in vars(record).items()
+            if key not in RECORD_ATTRIBUTES
+        )
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+
+        return json.dumps(entry, default=str)
@@ -0,0 +1,90 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmark import Harness, SCENARIOS, compare
+
+
+class Command(BaseCommand):
+    """ Django command to benchmark the API of a running server """
+    help = 'Benchmark the API endpoints and compare them to a baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://localhost:8000')
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=10,
+            help='Number of the users created by seed_benchmark to drive'
+        )
+        parser.add_argument('--password', default='benchmark')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=200,
+            help='Number of requests sent per scenario'
+        )
+        parser.add_argument(
+            '--scenarios',
+            default=','.join(SCENARIOS),
+            help=f'Comma separated scenarios among {", ".join(SCENARIOS)}'
+        )
+        parser.add_argument('--save', help='Save the results as a baseline')
+        parser.add_argument(
+            '--compare',
+            help='Fail if the results regress against this baseline'
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.2,
+            help='Allowed ratio of latency growth and throughput drop'
+        )
+
+    def handle(self, *args, **options):
+        scenarios = options['scenarios'].split(',')
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f'Unknown scenarios {", ".join(unknown)}')
+
+        harness = Harness(
+            options['url'],
+            options['users'],
+            options['password'],
+            concurrency=options['concurrency'],
+            requests=options['requests'],
+            scenarios=scenarios
+        )
+        try:
+            results = harness.run()
+        except (OSError, RuntimeError) as error:
+            raise CommandError(f'Benchmark failed: {error}')
+
+        self.stdout.write(
+            f'{"scenario":<10}{"requests":>9}{"errors":>8}{"req/s":>9}'
+            f'{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}{"queries":>9}'
+        )
+        for scenario, result in results.items():
+            self.stdout.write(
+                f'{scenario:<10}{result["requests"]:>9}{result["errors"]:>8}'
+                + ''.join(
+                    f'{result[key]:>9.1f}' if result[key] is not None
+                    else f'{"-":>9}'
+                    for key in ('throughput', 'p50', 'p95', 'p99', 'queries')
+                )
+            )
+
+        if options['save']:
+            with open(options['save'], 'w') as baseline_file:
+                json.dump(results, baseline_file, indent=2, sort_keys=True)
+        if options['compare']:
+            with open(options['compare']) as baseline_file:
+                baseline = json.load(baseline_file)
+            regressions = compare(results, baseline, options['tolerance'])
+            if regressions:
+                raise CommandError(
+                    'Regressions against the baseline:\n'
+                    + '\n'.join(regressions)
+                )
+            self.stdout.write(self.style.SUCCESS('No regression'))
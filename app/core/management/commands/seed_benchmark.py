@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmark import generate_data, parse_distribution
+
+
+class Command(BaseCommand):
+    """ Django command to create the data the benchmarks run against """
+    help = 'Create benchmark users with their tags, ingredients and recipes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        for name, default in (('tags', '20'), ('ingredients', '50'),
+                              ('recipes', '100-500'), ('recipe-tags', '0-5'),
+                              ('recipe-ingredients', '2-10')):
+            parser.add_argument(
+                f'--{name}',
+                default=default,
+                help=f'Number of {name.replace("-", " ")} as N or MIN-MAX'
+            )
+        parser.add_argument('--password', default='benchmark')
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Seed of the random counts, to reproduce a data set'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            distributions = {
+                name: parse_distribution(options[name])
+                for name in ('tags', 'ingredients', 'recipes',
+                             'recipe_tags', 'recipe_ingredients')
+            }
+        except ValueError as error:
+            raise CommandError(error)
+
+        counts = generate_data(
+            options['users'],
+            password=options['password'],
+            seed=options['seed'],
+            **distributions
+        )
+
+        self.stdout.write(self.style.SUCCESS(', '.join(
+            f'{count} {name}' for name, count in counts.items()
+        )))
@@ -1,20 +1,73 @@
+import random
 import time
-from django.db import connections
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
 from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+
+from core.health import check_database, pending_migrations
 
 
 class Command(BaseCommand):
     """ Django command to pause execution until DB is available"""
 
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=60,
+            help='Seconds to wait before failing'
+        )
+        parser.add_argument(
+            '--initial-delay',
+            type=float,
+            default=0.1,
+            help='Seconds to wait after the first failed attempt'
+        )
+        parser.add_argument(
+            '--max-delay',
+            type=float,
+            default=5,
+            help='Longest wait between two attempts'
+        )
+        parser.add_argument(
+            '--check-migrations',
+            action='store_true',
+            help='Also wait until every migration is applied'
+        )
+
+    def is_ready(self, options):
+        check_database(options['database'])
+        if options['check_migrations']:
+            pending = pending_migrations(options['database'])
+            if pending:
+                raise OperationalError(f'{len(pending)} pending migrations')
+
     def handle(self, *args, **options):
         self.stdout.write(' waiting for database ...')
-        db_conn = None
-        while not db_conn:
+        deadline = time.monotonic() + options['timeout']
+        attempt = 0
+        while True:
             try:
-                db_conn = connections['default']
-            except OperationalError:
-                self.stdout.write('database unavailable, waiting 1 sec')
-                time.sleep(1)
+                self.is_ready(options)
+                break
+            except OperationalError as error:
+                # exponential backoff with full jitter, so that containers
+                # started together do not retry in lockstep
+                delay = random.uniform(0, min(
+                    options['max_delay'],
+                    options['initial_delay'] * 2 ** attempt
+                ))
+                if time.monotonic() + delay > deadline:
+                    raise CommandError(
+                        f'Database unavailable after {options["timeout"]}s: '
+                        f'{error}'
+                    )
+                self.stdout.write(
+                    f'database unavailable, waiting {delay:.2f} sec'
+                )
+                time.sleep(delay)
+                attempt += 1
 
         self.stdout.write(self.style.SUCCESS('Database available'))
@@ -0,0 +1,210 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# upper bounds in milliseconds of the latency histogram buckets
+BUCKETS_MS = (
+    1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000,
+    float('inf'),
+)
+PERCENTILES = (50, 90, 99)
+
+_local = threading.local()
+
+
+class RequestMetrics:
+    """ Durations and query counts measured while handling one request """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.durations = {}
+        self.depth = {}
+
+    def add(self, stage, duration):
+        self.durations[stage] = self.durations.get(stage, 0) + duration
+
+    def record_query(self, execute, sql, params, many, context):
+        """ Execute wrapper timing the queries run on a connection """
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.add('db', time.perf_counter() - start)
+
+    def total(self):
+        return time.perf_counter() - self.start
+
+
+def get_current_metrics():
+    """ Return the metrics of the request handled by this thread, if any """
+    return getattr(_local, 'metrics', None)
+
+
+def set_current_metrics(metrics):
+    _local.metrics = metrics
+
+
+@contextmanager
+def timed(stage):
+    """ Add the time spent in the block to the current request's stage
+
+    Nested blocks of the same stage are only counted once.
+    """
+    metrics = get_current_metrics()
+    if metrics is None:
+        yield
+        return
+
+    depth = metrics.depth.get(stage, 0)
+    metrics.depth[stage] = depth + 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.depth[stage] = depth
+        if depth == 0:
+            metrics.add(stage, time.perf_counter() - start)
+
+
+class TimedSerializerMixin:
+    """ Serializer mixin recording the time spent producing its data """
+
+    @property
+    def data(self):
+        with timed('serialize'):
+            return super().data
+
+
+class Histogram:
+    """ Count of observations per latency bucket """
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS_MS)
+        self.count = 0
+        self.sum = 0
+
+    def observe(self, value_ms):
+        self.counts[bisect.bisect_left(BUCKETS_MS, value_ms)] += 1
+        self.count += 1
+        self.sum += value_ms
+
+    def percentile(self, percent):
+        """ Return the upper bound of the bucket holding the percentile """
+        if not self.count:
+            return None
+        rank = self.count * percent / 100
+        seen = 0
+        for bound, count in zip(BUCKETS_MS, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean': self.sum / self.count if self.count else None,
+            **{f'p{percent}': self.percentile(percent)
+               for percent in PERCENTILES},
+        }
+
+
+class ViewMetrics:
+    """ Histograms of the requests handled by one view """
+
+    def __init__(self):
+        self.histograms = {}
+        self.queries = 0
+        self.response_bytes = 0
+        self.count = 0
+
+    def observe(self, metrics, total, response_size):
+        self.count += 1
+        self.queries += metrics.queries
+        self.response_bytes += response_size or 0
+        for stage, duration in (('total', total), *metrics.durations.items()):
+            self.histograms.setdefault(stage, Histogram()) \
+                .observe(duration * 1000)
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'queries_mean': self.queries / self.count,
+            'response_bytes_mean': self.response_bytes / self.count,
+            'ms': {
+                stage: histogram.summary()
+                for stage, histogram in self.histograms.items()
+            },
+        }
+
+
+class CacheStats:
+    """ Thread safe hit and miss counters of a cache """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def as_dict(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+class MetricsRegistry:
+    """ Metrics of every view and cache used by this process """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+        self.caches = {}
+
+    def cache_stats(self, name):
+        """ Return the hit and miss counters of the cache called name """
+        with self.lock:
+            return self.caches.setdefault(name, CacheStats())
+
+    def observe(self, view_name, metrics, total, response_size):
+        with self.lock:
+            self.views.setdefault(view_name, ViewMetrics()) \
+                .observe(metrics, total, response_size)
+
+    def summary(self):
+        with self.lock:
+            return {
+                view_name: view.summary()
+                for view_name, view in sorted(self.views.items())
+            }
+
+    def cache_summary(self):
+        with self.lock:
+            caches = sorted(self.caches.items())
+        return {name: stats.as_dict() for name, stats in caches}
+
+    def reset(self):
+        with self.lock:
+            self.views = {}
+            caches = list(self.caches.values())
+        for stats in caches:
+            stats.reset()
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,128 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.db.utils import OperationalError
+from django.http import JsonResponse
+
+from core.health import check_database, pending_migrations
+from core.metrics import RequestMetrics, registry, set_current_metrics
+
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsMiddleware:
+    """ Measure the queries, time and response size of every request
+
+    The measures are sent back in a Server-Timing header, logged, and
+    added to the per view histograms of core.metrics.registry.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        request.metrics = metrics
+        set_current_metrics(metrics)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(metrics.record_query)
+                    )
+                response = self.get_response(request)
+        finally:
+            set_current_metrics(None)
+
+        total = metrics.total()
+        if response.streaming:
+            response_size = int(response.get('Content-Length', 0)) or None
+        else:
+            response_size = len(response.content)
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else 'unresolved'
+        registry.observe(view_name, metrics, total, response_size)
+
+        if settings.SERVER_TIMING or self.is_staff(request):
+            response['Server-Timing'] = self.server_timing(metrics, total)
+        durations = {
+            stage: round(duration * 1000, 3)
+            for stage, duration in metrics.durations.items()
+        }
+        logger.info(
+            '%s %s %s %.1fms %d queries', request.method, request.path,
+            response.status_code, total * 1000, metrics.queries,
+            extra={
+                'view': view_name,
+                'status': response.status_code,
+                'queries': metrics.queries,
+                'duration_ms': round(total * 1000, 3),
+                'durations_ms': durations,
+                'response_bytes': response_size,
+            }
+        )
+
+        return response
+
+    def process_template_response(self, request, response):
+        """ Time the rendering, done by the handler right after this """
+        start = time.perf_counter()
+
+        def rendered(response):
+            request.metrics.add('render', time.perf_counter() - start)
+        response.add_post_render_callback(rendered)
+
+        return response
+
+    def is_staff(self, request):
+        """ Return whether the request was made by a staff user, who gets
+        the Server-Timing header even with SERVER_TIMING off
+        """
+        user = getattr(request, 'user', None)
+        return bool(getattr(user, 'is_staff', False))
+
+    def server_timing(self, metrics, total):
+        entries = [
+            f'{stage};dur={duration * 1000:.1f}'
+            for stage, duration in metrics.durations.items()
+        ]
+        entries.append(f'total;dur={total * 1000:.1f}')
+        entries.append(f'queries;desc="{metrics.queries}"')
+
+        return ', '.join(entries)
+
+
+class HealthCheckMiddleware:
+    """ Answer the liveness and readiness probes before anything else
+
+    The probes skip the host validation, sessions, authentication and
+    metrics of the other middleware. /healthz only shows the process
+    serves requests, /readyz also runs a trivial query and, with
+    READYZ_CHECK_MIGRATIONS, checks that every migration is applied.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.path == '/healthz':
+            return JsonResponse({'status': 'ok'})
+        if request.path == '/readyz':
+            return self.readiness()
+
+        return self.get_response(request)
+
+    def readiness(self):
+        try:
+            check_database()
+            if settings.READYZ_CHECK_MIGRATIONS and pending_migrations():
+                raise OperationalError('pending migrations')
+        except OperationalError as error:
+            logger.warning('not ready: %s', error)
+            return JsonResponse({'status': 'unavailable'}, status=503)
+
+        return JsonResponse({'status': 'ok'})
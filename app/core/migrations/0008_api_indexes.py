@@ -0,0 +1,35 @@
+# Generated by Django 2.1.15 on 2026-10-18 01:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_recipe_image'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ingredients',
+            index=models.Index(fields=['user', '-name', 'id'], name='core_ingredients_user_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['user', 'id'], name='core_recipe_user_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['user', '-name', 'id'], name='core_tag_user_name_idx'),
+        ),
+        migrations.RunSQL(
+            ['CREATE INDEX core_recipe_tag_tag_recipe_idx '
+             'ON core_recipe_tag (tag_id, recipe_id)'],
+            ['DROP INDEX core_recipe_tag_tag_recipe_idx'],
+        ),
+        migrations.RunSQL(
+            ['CREATE INDEX core_recipe_ingr_ingr_recipe_idx '
+             'ON core_recipe_ingredients (ingredients_id, recipe_id)'],
+            ['DROP INDEX core_recipe_ingr_ingr_recipe_idx'],
+        ),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations
+
+from core.dedup import merge_duplicate_names
+
+
+def merge_duplicates(apps, schema_editor):
+    """ Merge the existing duplicates so the unique indexes can be built
+
+    Every object sharing a name case-insensitively with an older object
+    of the same user is merged into it, its recipes being re-pointed. The
+    historical models are merged in batches committed one at a time, as
+    by the merge_duplicate_names command. Migration 0015 then builds the
+    unique indexes.
+    """
+    for model_name, field_name in (('Tag', 'tag'),
+                                   ('Ingredients', 'ingredients')):
+        model = apps.get_model('core', model_name)
+        # every step of the generator merges and commits a batch
+        list(merge_duplicate_names(model, field_name))
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('core', '0008_api_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 2.1.15 on 2026-10-18 01:59
+
+import core.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_unique_names'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(db_index=True, null=True, upload_to=core.models.recipe_image_file_path),
+        ),
+    ]
@@ -0,0 +1,83 @@
+from django.conf import settings
+from django.db import migrations
+from django.db.utils import OperationalError
+
+# core.search as of this migration: the search document of a recipe is its
+# title, then the names of its tags and of its ingredients
+DOCUMENT_SQL = '''
+    SELECT r.id, r.title,
+        (SELECT {aggregate}(t.name, ' ') FROM core_recipe_tag rt
+         JOIN core_tag t ON t.id = rt.tag_id WHERE rt.recipe_id = r.id),
+        (SELECT {aggregate}(i.name, ' ') FROM core_recipe_ingredients ri
+         JOIN core_ingredients i ON i.id = ri.ingredients_id
+         WHERE ri.recipe_id = r.id)
+    FROM core_recipe r
+'''
+POSTGRESQL_DOCUMENT = (
+    "setweight(to_tsvector(%(config)s::regconfig, coalesce(d.title, '')), "
+    "'A') || "
+    "setweight(to_tsvector(%(config)s::regconfig, coalesce(d.tags, '')), "
+    "'B') || "
+    "setweight(to_tsvector(%(config)s::regconfig, "
+    "coalesce(d.ingredients, '')), 'C')"
+)
+TABLES = {
+    'sqlite': 'core_recipe_fts',
+    'postgresql': 'core_recipe_search',
+}
+
+
+def create_index(apps, schema_editor):
+    """ Create the full-text index of the recipes and fill it """
+    vendor = schema_editor.connection.vendor
+    with schema_editor.connection.cursor() as cursor:
+        if vendor == 'sqlite':
+            try:
+                cursor.execute(
+                    'CREATE VIRTUAL TABLE core_recipe_fts USING fts5('
+                    "title, tags, ingredients, tokenize='porter unicode61')"
+                )
+            except OperationalError:
+                # SQLite built without FTS5, searches fall back to icontains
+                return
+            cursor.execute(
+                'INSERT INTO core_recipe_fts '
+                '(rowid, title, tags, ingredients) '
+                + DOCUMENT_SQL.format(aggregate='group_concat')
+            )
+        elif vendor == 'postgresql':
+            cursor.execute(
+                'CREATE TABLE core_recipe_search ('
+                'recipe_id integer PRIMARY KEY REFERENCES core_recipe (id) '
+                'ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, '
+                'document tsvector NOT NULL)'
+            )
+            cursor.execute(
+                'CREATE INDEX core_recipe_search_document_idx '
+                'ON core_recipe_search USING GIN (document)'
+            )
+            cursor.execute(
+                'INSERT INTO core_recipe_search (recipe_id, document) '
+                f'SELECT d.id, {POSTGRESQL_DOCUMENT} FROM ('
+                + DOCUMENT_SQL.format(aggregate='string_agg')
+                + ') d (id, title, tags, ingredients)',
+                {'config': settings.RECIPE_SEARCH_CONFIG}
+            )
+
+
+def drop_index(apps, schema_editor):
+    table = TABLES.get(schema_editor.connection.vendor)
+    if table is not None:
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {table}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_recipe_image_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 2.1.15 on 2026-10-18 02:38
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+import django.db.models.deletion
+
+
+def count_recipes(apps, schema_editor):
+    """ Fill the counters from the existing recipes, as core.stats does
+    as of this migration
+    """
+    recipe_model = apps.get_model('core', 'Recipe')
+    recipe_stats = apps.get_model('core', 'RecipeStats')
+    recipe_stats.objects.bulk_create(
+        recipe_stats(user_id=row.pop('user_id'), **row)
+        for row in recipe_model.objects.order_by().values('user_id')
+        .annotate(
+            recipe_count=Count('id'),
+            time_minutes_sum=Sum('time_minutes'),
+            price_sum=Sum('price'),
+        )
+    )
+    for model_name, stats_name, key in (
+            ('Tag', 'TagStats', 'tag_id'),
+            ('Ingredients', 'IngredientStats', 'ingredient_id')):
+        model = apps.get_model('core', model_name)
+        stats_model = apps.get_model('core', stats_name)
+        stats_model.objects.bulk_create(
+            stats_model(**{key: related_id, 'recipe_count': count})
+            for related_id, count in model.objects.order_by()
+            .annotate(count=Count('recipe')).filter(count__gt=0)
+            .values_list('id', 'count')
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_recipe_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngredientStats',
+            fields=[
+                ('ingredient', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='core.Ingredients')),
+                ('recipe_count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RecipeStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='recipe_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('recipe_count', models.IntegerField(default=0)),
+                ('time_minutes_sum', models.BigIntegerField(default=0)),
+                ('price_sum', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TagStats',
+            fields=[
+                ('tag', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='core.Tag')),
+                ('recipe_count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(count_recipes, migrations.RunPython.noop),
+    ]
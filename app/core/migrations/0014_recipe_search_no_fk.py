@@ -0,0 +1,43 @@
+from django.db import migrations
+
+# flush truncates the model tables only, which fails past a foreign key
+# from a table it does not know, so the search documents of deleted recipes
+# are deleted by the post_delete signal of the recipes instead
+DROP_SQL = '''
+    ALTER TABLE IF EXISTS core_recipe_search
+    DROP CONSTRAINT IF EXISTS core_recipe_search_recipe_id_fkey
+'''
+PRUNE_SQL = '''
+    DELETE FROM core_recipe_search s WHERE NOT EXISTS
+        (SELECT 1 FROM core_recipe r WHERE r.id = s.recipe_id)
+'''
+ADD_SQL = '''
+    ALTER TABLE core_recipe_search
+    ADD CONSTRAINT core_recipe_search_recipe_id_fkey
+    FOREIGN KEY (recipe_id) REFERENCES core_recipe (id)
+    ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED
+'''
+
+
+def drop_foreign_key(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_SQL)
+
+
+def add_foreign_key(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql' and \
+            'core_recipe_search' in connection.introspection.table_names():
+        schema_editor.execute(PRUNE_SQL)
+        schema_editor.execute(ADD_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_recipe_sort_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_foreign_key, add_foreign_key),
+    ]
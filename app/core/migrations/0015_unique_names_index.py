@@ -0,0 +1,60 @@
+from django.db import migrations
+
+TABLES = ('core_tag', 'core_ingredients')
+
+
+def index_name(table):
+    return f'{table}_user_lower_name_uniq'
+
+
+def create_indexes(apps, schema_editor):
+    """ Build the unique (user, LOWER(name)) indexes of migration 0009
+
+    PostgreSQL builds them without blocking writes, outside of any
+    transaction. A build failed on duplicates created since the merge
+    leaves an invalid index, dropped here so that migrating again, once
+    merge_duplicate_names has run, builds it anew.
+    """
+    connection = schema_editor.connection
+    concurrently = 'CONCURRENTLY' if connection.vendor == 'postgresql' \
+        else ''
+    for table in TABLES:
+        name = index_name(table)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT indisvalid FROM pg_index '
+                    'WHERE indexrelid = to_regclass(%s)',
+                    [name]
+                )
+                row = cursor.fetchone()
+            if row is not None and not row[0]:
+                schema_editor.execute(
+                    f'DROP INDEX CONCURRENTLY IF EXISTS {name}'
+                )
+        schema_editor.execute(
+            f'CREATE UNIQUE INDEX {concurrently} IF NOT EXISTS {name} '
+            f'ON {table} (user_id, LOWER(name))'
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    concurrently = 'CONCURRENTLY' if connection.vendor == 'postgresql' \
+        else ''
+    for table in TABLES:
+        schema_editor.execute(
+            f'DROP INDEX {concurrently} IF EXISTS {index_name(table)}'
+        )
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('core', '0014_recipe_search_no_fk'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
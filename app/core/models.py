@@ -55,6 +55,15 @@ class Tag(models.Model):
         on_delete=models.CASCADE,
     )
 
+    class Meta:
+        # (user, LOWER(name)) is also unique, see migration 0015
+        indexes = [
+            models.Index(
+                fields=['user', '-name', 'id'],
+                name='core_tag_user_name_idx'
+            ),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -67,6 +76,15 @@ class Ingredients(models.Model):
         on_delete=models.CASCADE
     )
 
+    class Meta:
+        # (user, LOWER(name)) is also unique, see migration 0015
+        indexes = [
+            models.Index(
+                fields=['user', '-name', 'id'],
+                name='core_ingredients_user_name_idx'
+            ),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -83,7 +101,72 @@ class Recipe(models.Model):
     link = models.CharField(max_length=255, blank=True)
     ingredients = models.ManyToManyField('Ingredients')
     tag = models.ManyToManyField('Tag')
-    image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    image = models.ImageField(
+        null=True,
+        upload_to=recipe_image_file_path,
+        db_index=True
+    )
+
+    class Meta:
+        # one index per column the API filters and sorts on, see
+        # recipe.filters
+        indexes = [
+            models.Index(
+                fields=['user', 'id'],
+                name='core_recipe_user_id_idx'
+            ),
+            models.Index(
+                fields=['user', 'time_minutes', 'id'],
+                name='core_recipe_user_time_idx'
+            ),
+            models.Index(
+                fields=['user', 'price', 'id'],
+                name='core_recipe_user_price_idx'
+            ),
+            models.Index(
+                fields=['user', 'title', 'id'],
+                name='core_recipe_user_title_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.title
+
+
+class RecipeStats(models.Model):
+    """ Running totals of the recipes of a user, kept by recipe.signals """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='recipe_stats'
+    )
+    recipe_count = models.IntegerField(default=0)
+    time_minutes_sum = models.BigIntegerField(default=0)
+    price_sum = models.DecimalField(
+        max_digits=15,
+        decimal_places=2,
+        default=0
+    )
+
+
+class TagStats(models.Model):
+    """ Number of recipes linked to a tag, kept by recipe.signals """
+    tag = models.OneToOneField(
+        'Tag',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    recipe_count = models.IntegerField(default=0)
+
+
+class IngredientStats(models.Model):
+    """ Number of recipes using an ingredient, kept by recipe.signals """
+    ingredient = models.OneToOneField(
+        'Ingredients',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    recipe_count = models.IntegerField(default=0)
@@ -0,0 +1,33 @@
+from django.utils.translation import gettext as _
+from rest_framework import parsers
+from rest_framework.exceptions import ParseError
+
+from core import renderers
+from core.encoders import json_loads, msgpack_loads
+
+
+class JSONParser(parsers.JSONParser):
+    """ Parse JSON with orjson when it is installed
+
+    The body is decoded from UTF-8, the only encoding JSON exchanged
+    between systems may use.
+    """
+    renderer_class = renderers.JSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return json_loads(stream.read())
+        except ValueError as error:
+            raise ParseError(_('JSON parse error - %s') % error)
+
+
+class MessagePackParser(parsers.BaseParser):
+    """ Parse MessagePack bodies sent as application/msgpack """
+    media_type = 'application/msgpack'
+    renderer_class = renderers.MessagePackRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack_loads(stream.read())
+        except ValueError as error:
+            raise ParseError(_('MessagePack parse error - %s') % error)
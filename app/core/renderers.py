@@ -0,0 +1,36 @@
+from rest_framework import renderers
+
+from core.encoders import JSONEncoder, json_dumps, msgpack_dumps
+
+
+class JSONRenderer(renderers.JSONRenderer):
+    """ Render compact JSON with orjson when it is installed
+
+    Indented output, asked for by the browsable API or with an
+    'indent' media type parameter, is left to the standard encoder.
+    """
+    encoder_class = JSONEncoder
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent is not None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        return json_dumps(data)
+
+
+class MessagePackRenderer(renderers.BaseRenderer):
+    """ Render MessagePack, negotiated with Accept: application/msgpack """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        return msgpack_dumps(data)
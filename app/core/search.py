@@ -0,0 +1,327 @@
+import re
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.db.utils import OperationalError
+
+from core.models import Recipe
+
+# the search document of a recipe is its title, then the names of its tags
+# and of its ingredients, from the most to the least relevant
+DOCUMENT_SQL = '''
+    SELECT r.id, r.title,
+        (SELECT {aggregate}(t.name, ' ') FROM core_recipe_tag rt
+         JOIN core_tag t ON t.id = rt.tag_id WHERE rt.recipe_id = r.id),
+        (SELECT {aggregate}(i.name, ' ') FROM core_recipe_ingredients ri
+         JOIN core_ingredients i ON i.id = ri.ingredients_id
+         WHERE ri.recipe_id = r.id)
+    FROM core_recipe r
+'''
+TOKEN_RE = re.compile(r'\w+')
+
+
+def recipe_id_column(connection):
+    """ Return the quoted id column of the recipes in an outer query """
+    return '{}.{}'.format(
+        connection.ops.quote_name(Recipe._meta.db_table),
+        connection.ops.quote_name('id')
+    )
+
+
+def joined(queryset, table, key, condition, params):
+    """ Join the rows of table whose key is the recipe id, on condition
+
+    The ranking functions read the row of the matched document, so the
+    index table is joined rather than searched once per recipe in a
+    correlated subquery. extra() is used because the index tables have
+    no model.
+    """
+    recipe_id = recipe_id_column(connections[queryset.db])
+    return queryset.extra(
+        tables=[table],
+        where=[f'{table}.{key} = {recipe_id}', condition],
+        params=params
+    )
+
+
+class SearchBackend:
+    """ Recipe search matching the query against every column """
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def create(self):
+        pass
+
+    def drop(self):
+        pass
+
+    def is_installed(self):
+        return True
+
+    def index(self, documents):
+        pass
+
+    def delete(self, recipe_ids):
+        pass
+
+    def prune(self):
+        pass
+
+    def search(self, queryset, query):
+        """ Filter queryset on query and annotate the rank of each row """
+        matches = Q(title__icontains=query) | \
+            Q(tag__name__icontains=query) | \
+            Q(ingredients__name__icontains=query)
+        return queryset.filter(
+            id__in=Recipe.objects.filter(matches).values('id')
+        ).annotate(rank=Value(0.0, output_field=FloatField()))
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """ Recipe search in an FTS5 table whose rowids are the recipe ids """
+    table = 'core_recipe_fts'
+    # bm25 weights of the title, tag and ingredient columns
+    weights = (10.0, 5.0, 5.0)
+
+    def create(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE {self.table} USING '
+                f"fts5(title, tags, ingredients, tokenize='porter unicode61')"
+            )
+            cursor.execute(
+                f'INSERT INTO {self.table} '
+                f'(rowid, title, tags, ingredients) '
+                + DOCUMENT_SQL.format(aggregate='group_concat')
+            )
+
+    def drop(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {self.table}')
+
+    def is_installed(self):
+        return self.table in self.connection.introspection.table_names()
+
+    def index(self, documents):
+        self.delete([document[0] for document in documents])
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {self.table} '
+                f'(rowid, title, tags, ingredients) VALUES (%s, %s, %s, %s)',
+                documents
+            )
+
+    def delete(self, recipe_ids):
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {self.table} WHERE rowid = %s',
+                [(recipe_id,) for recipe_id in recipe_ids]
+            )
+
+    def prune(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.table} '
+                f'WHERE rowid NOT IN (SELECT id FROM core_recipe)'
+            )
+
+    def search(self, queryset, query):
+        # quote every word so that the query cannot use the FTS5 syntax
+        match = ' '.join(f'"{token}"' for token in TOKEN_RE.findall(query))
+        if not match:
+            return queryset.none() \
+                .annotate(rank=Value(0.0, output_field=FloatField()))
+
+        weights = ', '.join(str(weight) for weight in self.weights)
+        return joined(
+            queryset, self.table, 'rowid', f'{self.table} MATCH %s', [match]
+        ).annotate(rank=RawSQL(
+            f'-bm25({self.table}, {weights})', [], output_field=FloatField()
+        ))
+
+
+class PostgreSQLSearchBackend(SearchBackend):
+    """ Recipe search in a tsvector column with a GIN index
+
+    The table has no foreign key to the recipes, which flush would fail to
+    truncate it past, the documents being deleted with their recipes by
+    the post_delete signal instead.
+    """
+    table = 'core_recipe_search'
+    document = (
+        "setweight(to_tsvector(%s::regconfig, coalesce(%s, '')), 'A') || "
+        "setweight(to_tsvector(%s::regconfig, coalesce(%s, '')), 'B') || "
+        "setweight(to_tsvector(%s::regconfig, coalesce(%s, '')), 'C')"
+    )
+
+    @property
+    def config(self):
+        return settings.RECIPE_SEARCH_CONFIG
+
+    def create(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TABLE {self.table} ('
+                f'recipe_id integer PRIMARY KEY, '
+                f'document tsvector NOT NULL)'
+            )
+            cursor.execute(
+                f'CREATE INDEX {self.table}_document_idx '
+                f'ON {self.table} USING GIN (document)'
+            )
+            document = self.document.replace('%s', '{}').format(
+                '%(config)s', 'd.title', '%(config)s', 'd.tags',
+                '%(config)s', 'd.ingredients'
+            )
+            cursor.execute(
+                f'INSERT INTO {self.table} (recipe_id, document) '
+                f'SELECT d.id, {document} FROM ('
+                + DOCUMENT_SQL.format(aggregate='string_agg')
+                + ') d (id, title, tags, ingredients)',
+                {'config': self.config}
+            )
+
+    def drop(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {self.table}')
+
+    def is_installed(self):
+        return self.table in self.connection.introspection.table_names()
+
+    def index(self, documents):
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {self.table} (recipe_id, document) '
+                f'VALUES (%s, {self.document}) '
+                f'ON CONFLICT (recipe_id) '
+                f'DO UPDATE SET document = EXCLUDED.document',
+                [
+                    (recipe_id, self.config, title, self.config, tags,
+                     self.config, ingredients)
+                    for recipe_id, title, tags, ingredients in documents
+                ]
+            )
+
+    def delete(self, recipe_ids):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.table} WHERE recipe_id = ANY(%s)',
+                [list(recipe_ids)]
+            )
+
+    def prune(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.table} s WHERE NOT EXISTS '
+                f'(SELECT 1 FROM core_recipe r WHERE r.id = s.recipe_id)'
+            )
+
+    def search(self, queryset, query):
+        ts_query = 'plainto_tsquery(%s::regconfig, %s)'
+        return joined(
+            queryset, self.table, 'recipe_id',
+            f'{self.table}.document @@ {ts_query}', [self.config, query]
+        ).annotate(rank=RawSQL(
+            f'ts_rank({self.table}.document, {ts_query})',
+            [self.config, query],
+            output_field=FloatField()
+        ))
+
+
+BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgreSQLSearchBackend,
+}
+_installed = {}
+
+
+def get_search_backend(alias=DEFAULT_DB_ALIAS):
+    """ Return the search backend of the database alias
+
+    Falls back to icontains lookups when RECIPE_SEARCH_BACKEND is
+    'icontains', or when the database has no full-text index.
+    """
+    connection = connections[alias]
+    backend_class = BACKENDS.get(connection.vendor, SearchBackend)
+    if settings.RECIPE_SEARCH_BACKEND == 'icontains':
+        backend_class = SearchBackend
+
+    backend = backend_class(connection)
+    if alias not in _installed:
+        _installed[alias] = backend.is_installed()
+    if not _installed[alias]:
+        return SearchBackend(connection)
+
+    return backend
+
+
+def create_search_index(connection):
+    """ Create and fill the full-text index of the recipes, if supported """
+    backend = BACKENDS.get(connection.vendor, SearchBackend)(connection)
+    try:
+        backend.create()
+    except OperationalError:
+        # SQLite built without FTS5, searches fall back to icontains
+        pass
+    _installed.pop(connection.alias, None)
+
+
+def drop_search_index(connection):
+    BACKENDS.get(connection.vendor, SearchBackend)(connection).drop()
+    _installed.pop(connection.alias, None)
+
+
+def prune_search_index(connection):
+    """ Delete the documents of the recipes deleted without signals """
+    backend = BACKENDS.get(connection.vendor, SearchBackend)(connection)
+    if backend.is_installed():
+        backend.prune()
+
+
+def search_documents(recipe_ids):
+    """ Return the (id, title, tags, ingredients) of the given recipes """
+    documents = {
+        recipe_id: [recipe_id, title, [], []]
+        for recipe_id, title in Recipe.objects.filter(id__in=recipe_ids)
+        .values_list('id', 'title')
+    }
+    for position, field_name in ((2, 'tag'), (3, 'ingredients')):
+        field = Recipe._meta.get_field(field_name)
+        through = field.remote_field.through
+        column = field.m2m_reverse_field_name()
+        for recipe_id, name in through.objects \
+                .filter(recipe_id__in=documents) \
+                .values_list('recipe_id', f'{column}__name'):
+            documents[recipe_id][position].append(name)
+
+    return [
+        (recipe_id, title, ' '.join(tags), ' '.join(ingredients))
+        for recipe_id, title, tags, ingredients in documents.values()
+    ]
+
+
+def index_recipes(recipe_ids, batch_size=500):
+    """ Write the search documents of the given recipes """
+    recipe_ids = list(recipe_ids)
+    backend = get_search_backend()
+    for start in range(0, len(recipe_ids), batch_size):
+        batch = recipe_ids[start:start + batch_size]
+        documents = search_documents(batch)
+        backend.index(documents)
+        # recipes deleted meanwhile
+        missing = set(batch) - {document[0] for document in documents}
+        if missing:
+            backend.delete(missing)
+
+
+def unindex_recipes(recipe_ids):
+    """ Remove the search documents of the given recipes """
+    get_search_backend().delete(list(recipe_ids))
+
+
+def search_recipes(queryset, query):
+    """ Filter queryset on the search query, annotating each row's rank """
+    return get_search_backend().search(queryset, query)
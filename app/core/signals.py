@@ -0,0 +1,40 @@
+import time
+
+from django.conf import settings
+from django.core.signals import request_finished, request_started
+from django.db import connections
+from django.dispatch import receiver
+
+
+@receiver(request_finished)
+def remember_connection_release(**kwargs):
+    """ Record when the open connections were last used by a request """
+    now = time.monotonic()
+    for connection in connections.all():
+        if connection.connection is not None:
+            connection.released_at = now
+
+
+@receiver(request_started)
+def check_persistent_connections(**kwargs):
+    """ Drop the persistent connections the database server closed
+
+    A connection kept open by CONN_MAX_AGE may have been closed by the
+    server or a proxy since the previous request. Pinging it when a
+    request starts avoids failing that request's first query, but costs
+    a round trip, so only connections left idle for at least
+    DB_CONN_HEALTH_CHECK_IDLE seconds are pinged.
+    """
+    if not settings.DB_CONN_HEALTH_CHECKS:
+        return
+
+    now = time.monotonic()
+    for connection in connections.all():
+        if connection.connection is None or connection.in_atomic_block:
+            continue
+        released_at = getattr(connection, 'released_at', None)
+        if released_at is not None and \
+                now - released_at < settings.DB_CONN_HEALTH_CHECK_IDLE:
+            continue
+        if not connection.is_usable():
+            connection.close()
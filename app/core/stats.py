@@ -0,0 +1,178 @@
+from collections import Counter, defaultdict
+from decimal import Decimal
+
+from django.apps import apps as global_apps
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+
+from core.models import Tag, Ingredients, RecipeStats, TagStats, \
+    IngredientStats
+
+TOTAL_FIELDS = ('recipe_count', 'time_minutes_sum', 'price_sum')
+# the counter table of the recipe links to each related model
+LINK_STATS = {
+    'tag': TagStats,
+    'ingredients': IngredientStats,
+}
+
+
+def to_decimal(value):
+    """ Return a price as a Decimal, whatever type it was assigned as """
+    if value is None or isinstance(value, Decimal):
+        return value
+
+    return Decimal(str(value))
+
+
+def _ensure_rows(model, keys):
+    """ Create the missing counter rows of keys, starting at zero """
+    existing = set(
+        model.objects.filter(pk__in=keys).values_list('pk', flat=True)
+    )
+    missing = [model(pk=key) for key in set(keys) - existing]
+    if not missing:
+        return
+
+    try:
+        with transaction.atomic():
+            model.objects.bulk_create(missing)
+    except IntegrityError:
+        # some were created concurrently
+        for obj in missing:
+            model.objects.get_or_create(pk=obj.pk)
+
+
+def add_counts(model, deltas):
+    """ Add {key: {field: delta}} to the counter rows of model
+
+    The rows are changed with UPDATE ... SET field = field + delta, so
+    concurrent requests never lose each other's changes, and keys sharing
+    the same deltas are updated in one statement. Rows are only created
+    for positive deltas: a missing row means its owner is being deleted.
+    """
+    groups = defaultdict(list)
+    for key, changes in deltas.items():
+        changes = tuple(sorted(
+            (field, delta) for field, delta in changes.items() if delta
+        ))
+        if changes:
+            groups[changes].append(key)
+    _ensure_rows(model, [
+        key for changes, keys in groups.items()
+        if any(delta > 0 for field, delta in changes)
+        for key in keys
+    ])
+
+    for changes, keys in groups.items():
+        model.objects.filter(pk__in=keys).update(**{
+            field: F(field) + delta for field, delta in changes
+        })
+
+
+def add_recipe_totals(recipes, sign=1):
+    """ Add the given recipes to the totals of their owners """
+    deltas = defaultdict(Counter)
+    for recipe in recipes:
+        deltas[recipe.user_id].update({
+            'recipe_count': sign,
+            'time_minutes_sum': sign * recipe.time_minutes,
+            'price_sum': sign * to_decimal(recipe.price),
+        })
+    add_counts(RecipeStats, deltas)
+
+
+def add_link_counts(field_name, counts, sign=1):
+    """ Add {related id: number of recipes} to the counts of field_name """
+    add_counts(LINK_STATS[field_name], {
+        key: {'recipe_count': sign * count} for key, count in counts.items()
+    })
+
+
+def get_recipe_stats(user):
+    """ Return the totals of the recipes of user and the counts per tag
+    and per ingredient, read from the counter tables only
+    """
+    totals = RecipeStats.objects.filter(user=user).first() or \
+        RecipeStats(user=user)
+    count = totals.recipe_count
+    stats = {
+        'recipe_count': count,
+        'average_time_minutes': totals.time_minutes_sum / count
+        if count else None,
+        'average_price': (to_decimal(totals.price_sum) / count)
+        .quantize(Decimal('0.01')) if count else None,
+    }
+    for name, model in (('tags', Tag), ('ingredients', Ingredients)):
+        stats[name] = model.objects \
+            .filter(user=user, stats__recipe_count__gt=0) \
+            .annotate(recipe_count=F('stats__recipe_count')) \
+            .order_by('-recipe_count', 'name', 'id')
+
+    return stats
+
+
+def _expected_counts(apps, user_ids):
+    """ Return the {model: {key: values}} computed from the recipes """
+    recipe_model = apps.get_model('core', 'Recipe')
+    recipes = recipe_model.objects.all()
+    if user_ids is not None:
+        recipes = recipes.filter(user_id__in=user_ids)
+    expected = {
+        apps.get_model('core', 'RecipeStats'): {
+            row['user_id']: tuple(row[field] for field in TOTAL_FIELDS)
+            for row in recipes.order_by().values('user_id').annotate(
+                recipe_count=Count('id'),
+                time_minutes_sum=Sum('time_minutes'),
+                price_sum=Sum('price'),
+            )
+        },
+    }
+    for field_name, model in LINK_STATS.items():
+        field = recipe_model._meta.get_field(field_name)
+        related = field.related_model.objects.all()
+        if user_ids is not None:
+            related = related.filter(user_id__in=user_ids)
+        expected[apps.get_model('core', model.__name__)] = {
+            key: (count,) for key, count in related.order_by()
+            .annotate(count=Count('recipe')).filter(count__gt=0)
+            .values_list('id', 'count')
+        }
+
+    return expected
+
+
+def rebuild_recipe_stats(user_ids=None, apps=global_apps):
+    """ Recompute the counters of the given users, or of every user
+
+    Returns the number of counter rows which had drifted from the
+    recipes. Changes committed while the rebuild runs may be lost, so it
+    is meant for quiet periods, such as right after a migration.
+    """
+    corrected = 0
+    with transaction.atomic():
+        for model, expected in _expected_counts(apps, user_ids).items():
+            fields = [
+                field.name for field in model._meta.concrete_fields
+                if not field.primary_key
+            ]
+            rows = model.objects.all()
+            if user_ids is not None:
+                owner = 'user_id' if model._meta.pk.name == 'user' \
+                    else f'{model._meta.pk.name}__user_id'
+                rows = rows.filter(**{f'{owner}__in': user_ids})
+            current = {
+                values[0]: values[1:]
+                for values in rows.values_list('pk', *fields)
+                if any(values[1:])
+            }
+            corrected += len(set(current) ^ set(expected)) + sum(
+                1 for key in set(current) & set(expected)
+                if current[key] != expected[key]
+            )
+            rows.delete()
+            model.objects.bulk_create(
+                model(pk=key, **dict(zip(fields, values)))
+                for key, values in expected.items()
+            )
+
+    return corrected
@@ -0,0 +1,110 @@
+import hashlib
+import os
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+
+
+def content_hash(content):
+    """ Return the SHA-256 hex digest of a file, read chunk by chunk """
+    digest = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+
+    return digest.hexdigest()
+
+
+def content_addressed_name(directory, digest, ext):
+    """ Return the sharded name of a file with the given digest """
+    return os.path.join(
+        directory, digest[:2], digest[2:4], digest + ext.lower()
+    )
+
+
+def _pending_key(name):
+    return f'content-addressed-pending:{name}'
+
+
+def get_pending_cache():
+    """ Return the cache holding the names handed out by uncommitted saves """
+    return caches[settings.CONTENT_ADDRESSED_CACHE]
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """ File system storage naming uploads after the hash of their content
+
+    Files saved directly under one of CONTENT_ADDRESSED_DIRS are moved to
+    <dir>/<ab>/<cd>/<hash>.<ext>, so identical uploads share one file and
+    no directory grows past 256 entries. Names already inside a shard,
+    like derived images, are saved as given.
+    """
+
+    def is_content_addressed(self, name):
+        """ Return whether name is renamed after its content on save """
+        directory = os.path.dirname(name).strip('/')
+        return directory in settings.CONTENT_ADDRESSED_DIRS
+
+    def mark_pending(self, name):
+        """ Keep name from being deleted until the current transaction,
+        which may be about to refer to it, is committed
+        """
+        cache = get_pending_cache()
+        key = _pending_key(name)
+        cache.set(key, True, settings.CONTENT_ADDRESSED_PENDING_TIMEOUT)
+        transaction.on_commit(lambda: cache.delete(key))
+
+    def is_pending(self, name):
+        """ Return whether a transaction not committed yet saved name """
+        return get_pending_cache().get(_pending_key(name)) is not None
+
+    def delete_unless_pending(self, name):
+        """ Delete name unless it is pending, returning whether it was
+
+        The file is moved aside before the last check, so that a save of
+        the same content either marked it pending before that check, and
+        it is moved back, or finds it gone and writes it again.
+        """
+        if self.is_pending(name):
+            return False
+        path = self.path(name)
+        aside = f'{path}.{uuid.uuid4().hex}.deleted'
+        try:
+            os.rename(path, aside)
+        except FileNotFoundError:
+            return True
+        if self.is_pending(name):
+            os.replace(aside, path)
+            return False
+
+        os.remove(aside)
+        return True
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not self.is_content_addressed(name):
+            return super().save(name, content, max_length)
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+
+        directory, basename = os.path.split(name)
+        name = content_addressed_name(
+            directory,
+            content_hash(content),
+            os.path.splitext(basename)[1]
+        )
+        # an identical file may be found here while it is being collected,
+        # so it is marked before looking for it
+        self.mark_pending(name)
+        if self.exists(name):
+            return name
+
+        return super().save(name, content, max_length)
@@ -0,0 +1,118 @@
+import shutil
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import LiveServerTestCase, TestCase, override_settings
+
+from core.benchmark import Harness, SCENARIOS, compare, percentile
+from core.models import Tag, Ingredients, Recipe
+
+
+class SeedBenchmarkTests(TestCase):
+    """ Test generating the benchmark data """
+
+    def test_seed_benchmark(self):
+        """ Test the requested number of rows are created per user """
+        call_command(
+            'seed_benchmark', '--users=2', '--tags=3', '--ingredients=4',
+            '--recipes=5', '--recipe-tags=2', '--recipe-ingredients=1-3',
+            stdout=StringIO()
+        )
+
+        self.assertEqual(
+            get_user_model().objects
+            .filter(email__endswith='@benchmark.test').count(),
+            2
+        )
+        self.assertEqual(Tag.objects.count(), 6)
+        self.assertEqual(Ingredients.objects.count(), 8)
+        self.assertEqual(Recipe.objects.count(), 10)
+        self.assertEqual(Recipe.tag.through.objects.count(), 20)
+        links = Recipe.ingredients.through.objects.count()
+        self.assertTrue(10 <= links <= 30)
+
+    def test_seed_benchmark_appends_users(self):
+        """ Test seeding again adds new users """
+        call_command('seed_benchmark', '--users=1', '--recipes=0',
+                     stdout=StringIO())
+        call_command('seed_benchmark', '--users=1', '--recipes=0',
+                     stdout=StringIO())
+
+        self.assertTrue(get_user_model().objects.filter(
+            email='bench-1@benchmark.test'
+        ).exists())
+
+
+class CompareTests(TestCase):
+    """ Test comparing benchmark results with a baseline """
+
+    baseline = {
+        'list': {
+            'requests': 10, 'errors': 0, 'throughput': 100,
+            'p50': 10, 'p95': 20, 'p99': 30, 'queries': 4,
+        },
+    }
+
+    def result(self, **changes):
+        return {'list': dict(self.baseline['list'], **changes)}
+
+    def test_no_regression(self):
+        """ Test results within the tolerance pass """
+        results = self.result(p95=23, throughput=85)
+
+        self.assertEqual(compare(results, self.baseline, 0.2), [])
+
+    def test_regressions(self):
+        """ Test slower, busier or failing results are reported """
+        results = self.result(p99=40, throughput=50, queries=5, errors=1)
+
+        regressions = compare(results, self.baseline, 0.2)
+
+        self.assertEqual(len(regressions), 4)
+
+    def test_percentile(self):
+        """ Test the nearest rank percentile """
+        values = list(range(1, 101))
+
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertIsNone(percentile([], 50))
+
+
+@patch('recipe.views.schedule_processing')
+class HarnessTests(LiveServerTestCase):
+    """ Test driving a live server with the benchmark harness """
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings = override_settings(
+            MEDIA_ROOT=self.media_root, SERVER_TIMING=True
+        )
+        self.settings.enable()
+        call_command(
+            'seed_benchmark', '--users=2', '--tags=3', '--recipes=3',
+            '--password=benchmark', stdout=StringIO()
+        )
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def test_run_every_scenario(self, mock_schedule):
+        """ Test every scenario is measured without errors """
+        # the in-memory SQLite test database locks on concurrent writes
+        harness = Harness(
+            self.live_server_url, 2, 'benchmark', concurrency=1, requests=4
+        )
+
+        results = harness.run()
+
+        self.assertEqual(set(results), set(SCENARIOS))
+        for scenario, result in results.items():
+            self.assertEqual(result['requests'], 4, scenario)
+            self.assertEqual(result['errors'], 0, scenario)
+            self.assertIsNotNone(result['p95'])
+            self.assertIsNotNone(result['queries'])
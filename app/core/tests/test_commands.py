@@ -1,5 +1,6 @@
 from unittest.mock import patch
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
 from django.test import TestCase
 
@@ -8,15 +9,51 @@ class CommandTests(TestCase):
 
     def test_wait_for_db_ready(self):
         """Test waiting for Db, whenDb is available"""
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.return_value = True
+        with patch('core.management.commands.wait_for_db.check_database') \
+                as cd:
             call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 1)
+            self.assertEqual(cd.call_count, 1)
 
     @patch('time.sleep', return_value=True)
     def test_wait_for_db(self, ts):
         """test for Db """
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.side_effect = [OperationalError] * 5 + [True]
+        with patch('core.management.commands.wait_for_db.check_database') \
+                as cd:
+            cd.side_effect = [OperationalError] * 5 + [None]
             call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 6)
+            self.assertEqual(cd.call_count, 6)
+            self.assertEqual(ts.call_count, 5)
+
+    @patch('time.sleep', return_value=True)
+    def test_wait_for_db_backoff(self, ts):
+        """Test the waits grow exponentially up to the max delay"""
+        with patch('core.management.commands.wait_for_db.check_database') \
+                as cd, \
+                patch('random.uniform', side_effect=lambda low, high: high):
+            cd.side_effect = [OperationalError] * 6 + [None]
+            call_command('wait_for_db', '--initial-delay=1', '--max-delay=8')
+
+        delays = [call[0][0] for call in ts.call_args_list]
+        self.assertEqual(delays, [1, 2, 4, 8, 8, 8])
+
+    @patch('time.sleep', return_value=True)
+    def test_wait_for_db_timeout(self, ts):
+        """Test the command fails once the timeout is reached"""
+        with patch('core.management.commands.wait_for_db.check_database') \
+                as cd:
+            cd.side_effect = OperationalError
+            with self.assertRaises(CommandError):
+                call_command('wait_for_db', '--timeout=0')
+
+        ts.assert_not_called()
+
+    @patch('time.sleep', return_value=True)
+    def test_wait_for_migrations(self, ts):
+        """Test waiting for the migrations to be applied"""
+        with patch('core.management.commands.wait_for_db.check_database'), \
+                patch('core.management.commands.wait_for_db'
+                      '.pending_migrations') as pm:
+            pm.side_effect = [['0010_recipe_image_index'], []]
+            call_command('wait_for_db', '--check-migrations')
+
+        self.assertEqual(pm.call_count, 2)
@@ -0,0 +1,136 @@
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from django.core.signals import request_finished, request_started
+from django.db import connection
+from django.db.utils import OperationalError
+from django.test import SimpleTestCase, TransactionTestCase, \
+    override_settings
+
+try:
+    import psycopg2
+except ImportError:
+    psycopg2 = None
+
+
+class ConnectionHealthCheckTests(TransactionTestCase):
+    """ Test pinging persistent connections when a request starts """
+
+    def setUp(self):
+        connection.ensure_connection()
+        # as if the connection had never served a request
+        connection.released_at = None
+        # keep the connection like CONN_MAX_AGE = None would
+        persistent = patch.object(connection, 'close_at', None)
+        persistent.start()
+        self.addCleanup(persistent.stop)
+
+    def test_unusable_connection_closed(self):
+        """ Test a connection the server dropped is closed """
+        with patch.object(connection, 'is_usable', return_value=False), \
+                patch.object(connection, 'close') as close:
+            request_started.send(sender=self.__class__)
+
+        close.assert_called_once_with()
+
+    def test_usable_connection_kept(self):
+        """ Test a working connection is reused """
+        with patch.object(connection, 'is_usable', return_value=True), \
+                patch.object(connection, 'close') as close:
+            request_started.send(sender=self.__class__)
+
+        close.assert_not_called()
+
+    @override_settings(DB_CONN_HEALTH_CHECK_IDLE=30)
+    def test_recently_used_connection_not_pinged(self):
+        """ Test a connection used by the previous request is not pinged """
+        request_finished.send(sender=self.__class__)
+
+        with patch.object(connection, 'is_usable') as is_usable:
+            request_started.send(sender=self.__class__)
+
+        is_usable.assert_not_called()
+
+    @override_settings(DB_CONN_HEALTH_CHECK_IDLE=30)
+    def test_idle_connection_pinged(self):
+        """ Test a connection idle for long enough is pinged """
+        connection.released_at = time.monotonic() - 60
+
+        with patch.object(connection, 'is_usable', return_value=True) \
+                as is_usable:
+            request_started.send(sender=self.__class__)
+
+        is_usable.assert_called_once_with()
+
+    @override_settings(DB_CONN_HEALTH_CHECKS=False)
+    def test_health_checks_disabled(self):
+        """ Test connections are not pinged with health checks off """
+        with patch.object(connection, 'is_usable') as is_usable:
+            request_started.send(sender=self.__class__)
+
+        is_usable.assert_not_called()
+
+
+@unittest.skipIf(psycopg2 is None, 'psycopg2 is not installed')
+@patch('core.db.backends.postgresql_pool.base.ThreadedConnectionPool')
+class ConnectionPoolTests(SimpleTestCase):
+    """ Test the pool of the postgresql_pool backend """
+
+    def make_pool(self, **kwargs):
+        from core.db.backends.postgresql_pool.base import ConnectionPool
+        return ConnectionPool({'dbname': 'app'}, **kwargs)
+
+    @override_settings(DB_CONN_HEALTH_CHECK_IDLE=30)
+    def test_dead_connection_replaced(self, mock_pool):
+        """ Test idle connections failing their ping are closed and
+        replaced
+        """
+        dead, alive = MagicMock(), MagicMock()
+        dead.cursor.return_value.execute.side_effect = psycopg2.Error
+        mock_pool.return_value.getconn.side_effect = [dead, alive]
+        pool = self.make_pool()
+        pool.returned_at[id(dead)] = time.monotonic() - 60
+
+        self.assertIs(pool.getconn(), alive)
+        mock_pool.return_value.putconn.assert_called_once_with(
+            dead, close=True
+        )
+        alive.cursor.assert_not_called()
+
+    @override_settings(DB_CONN_HEALTH_CHECK_IDLE=30)
+    def test_recently_returned_connection_not_pinged(self, mock_pool):
+        """ Test a connection returned by the previous request is handed
+        out without a ping
+        """
+        conn = MagicMock(closed=0)
+        conn.get_transaction_status.return_value = \
+            psycopg2.extensions.TRANSACTION_STATUS_IDLE
+        mock_pool.return_value.getconn.return_value = conn
+        pool = self.make_pool()
+
+        pool.putconn(pool.getconn())
+        pool.getconn()
+
+        conn.cursor.assert_not_called()
+
+    def test_pool_exhausted(self, mock_pool):
+        """ Test checking out more than max_size connections times out """
+        pool = self.make_pool(max_size=1, timeout=0.01)
+        pool.getconn()
+
+        with self.assertRaises(OperationalError):
+            pool.getconn()
+
+    def test_putconn_frees_a_slot(self, mock_pool):
+        """ Test a returned connection can be checked out again """
+        pool = self.make_pool(max_size=1, timeout=0.01)
+        conn = MagicMock(closed=0)
+        conn.get_transaction_status.return_value = \
+            psycopg2.extensions.TRANSACTION_STATUS_IDLE
+        mock_pool.return_value.getconn.return_value = conn
+
+        pool.putconn(pool.getconn())
+
+        self.assertIs(pool.getconn(), conn)
+        mock_pool.return_value.putconn.assert_called_with(conn, close=False)
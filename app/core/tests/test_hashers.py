@@ -0,0 +1,66 @@
+from unittest.mock import MagicMock, patch
+
+from django.contrib.auth import authenticate, get_user_model
+from django.test import TestCase, override_settings
+
+from core.hashers import BoundedPBKDF2PasswordHasher
+
+
+class BoundedHasherTests(TestCase):
+
+    def test_hash_computed_in_slot(self):
+        """ Test the key derivation holds a hashing slot while it runs """
+        slots = MagicMock()
+        slots.acquire.return_value = True
+
+        def check_slot(*args, **kwargs):
+            slots.acquire.assert_called_once()
+            slots.release.assert_not_called()
+            return b'hash'
+
+        with patch('core.hashers.hashing_slots', slots), \
+                patch('django.contrib.auth.hashers.pbkdf2', check_slot):
+            BoundedPBKDF2PasswordHasher().encode('password', 'salt')
+
+        slots.release.assert_called_once_with()
+
+    def test_hash_computed_without_slot_after_timeout(self):
+        """ Test a hash waiting too long for a slot is computed anyway """
+        slots = MagicMock()
+        slots.acquire.return_value = False
+
+        with patch('core.hashers.hashing_slots', slots), \
+                self.assertLogs('core.hashers', 'WARNING'):
+            encoded = BoundedPBKDF2PasswordHasher().encode('password', 'salt')
+
+        self.assertTrue(
+            BoundedPBKDF2PasswordHasher().verify('password', encoded)
+        )
+        slots.release.assert_not_called()
+
+    @override_settings(PASSWORD_HASHING_CONCURRENCY=0)
+    def test_hash_computed_unbounded(self):
+        """ Test hashing takes no slot without a bound """
+        with patch('core.hashers.hashing_slots') as slots:
+            encoded = BoundedPBKDF2PasswordHasher().encode('password', 'salt')
+
+        self.assertTrue(BoundedPBKDF2PasswordHasher().verify(
+            'password',
+            encoded
+        ))
+        slots.acquire.assert_not_called()
+
+    def test_hash_upgraded_on_login(self):
+        """ Test a login re-hashes a password with other iterations """
+        with override_settings(PASSWORD_HASHING_ITERATIONS=1000):
+            user = get_user_model().objects.create_user(
+                'test@test.com',
+                'test@123'
+            )
+        self.assertIn('$1000$', user.password)
+
+        with override_settings(PASSWORD_HASHING_ITERATIONS=2000):
+            authenticate(username='test@test.com', password='test@123')
+
+        user.refresh_from_db()
+        self.assertIn('$2000$', user.password)
@@ -0,0 +1,44 @@
+from unittest.mock import patch
+
+from django.db.utils import OperationalError
+from django.test import TestCase, override_settings
+
+
+class HealthCheckTests(TestCase):
+    """ Test the liveness and readiness probes """
+
+    def test_healthz(self):
+        """ Test the liveness probe answers without querying """
+        with self.assertNumQueries(0):
+            res = self.client.get('/healthz')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json(), {'status': 'ok'})
+
+    @override_settings(ALLOWED_HOSTS=['example.com'])
+    def test_healthz_any_host(self):
+        """ Test probes sent to the pod address are answered """
+        res = self.client.get('/healthz', HTTP_HOST='10.0.0.7')
+
+        self.assertEqual(res.status_code, 200)
+
+    def test_readyz(self):
+        """ Test the readiness probe when the database is migrated """
+        res = self.client.get('/readyz')
+
+        self.assertEqual(res.status_code, 200)
+
+    @patch('core.middleware.check_database', side_effect=OperationalError)
+    def test_readyz_database_down(self, mock_check):
+        """ Test the readiness probe fails without a database """
+        res = self.client.get('/readyz')
+
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res.json(), {'status': 'unavailable'})
+
+    @patch('core.middleware.pending_migrations', return_value=['0011'])
+    def test_readyz_pending_migrations(self, mock_pending):
+        """ Test the readiness probe fails until migrations are applied """
+        res = self.client.get('/readyz')
+
+        self.assertEqual(res.status_code, 503)
@@ -0,0 +1,131 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+CONTENT = b'0123456789' * 10
+DIGEST = hashlib.sha256(CONTENT).hexdigest()
+HASHED_NAME = f'upload/recipe/{DIGEST[:2]}/{DIGEST[2:4]}/{DIGEST}.jpg'
+
+
+def media_url(name):
+    return reverse('media', args=[name])
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, MEDIA_ACCEL_REDIRECT=None)
+class ServeMediaTests(TestCase):
+    """ Test serving the uploaded media files """
+
+    def setUp(self):
+        for name in (HASHED_NAME, 'upload/recipe/plain.jpg'):
+            path = os.path.join(MEDIA_ROOT, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as media_file:
+                media_file.write(CONTENT)
+
+    def tearDown(self):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def test_serve_content_addressed_file(self):
+        """ Test a content addressed file is cached as immutable """
+        res = self.client.get(media_url(HASHED_NAME))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(b''.join(res.streaming_content), CONTENT)
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+        self.assertEqual(res['Content-Length'], str(len(CONTENT)))
+        self.assertEqual(res['ETag'], f'"{DIGEST}"')
+        self.assertIn('immutable', res['Cache-Control'])
+        self.assertIn('Last-Modified', res)
+
+    def test_serve_plain_file(self):
+        """ Test other files are revalidated using their hash as ETag """
+        res = self.client.get(media_url('upload/recipe/plain.jpg'))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res['ETag'], f'"{DIGEST}"')
+        self.assertNotIn('immutable', res['Cache-Control'])
+
+    def test_not_modified(self):
+        """ Test matching If-None-Match and If-Modified-Since return 304 """
+        res = self.client.get(media_url(HASHED_NAME))
+
+        res_etag = self.client.get(
+            media_url(HASHED_NAME), HTTP_IF_NONE_MATCH=res['ETag']
+        )
+        res_date = self.client.get(
+            media_url(HASHED_NAME),
+            HTTP_IF_MODIFIED_SINCE=res['Last-Modified']
+        )
+
+        self.assertEqual(res_etag.status_code, 304)
+        self.assertEqual(res_etag['ETag'], res['ETag'])
+        self.assertEqual(res_date.status_code, 304)
+
+    def test_range(self):
+        """ Test a byte range returns partial content """
+        res = self.client.get(media_url(HASHED_NAME), HTTP_RANGE='bytes=5-14')
+
+        self.assertEqual(res.status_code, 206)
+        self.assertEqual(b''.join(res.streaming_content), CONTENT[5:15])
+        self.assertEqual(res['Content-Length'], '10')
+        self.assertEqual(res['Content-Range'], f'bytes 5-14/{len(CONTENT)}')
+
+    def test_suffix_range(self):
+        """ Test a suffix byte range returns the end of the file """
+        res = self.client.get(media_url(HASHED_NAME), HTTP_RANGE='bytes=-5')
+
+        self.assertEqual(res.status_code, 206)
+        self.assertEqual(b''.join(res.streaming_content), CONTENT[-5:])
+
+    def test_range_not_satisfiable(self):
+        """ Test a range past the end of the file returns 416 """
+        res = self.client.get(media_url(HASHED_NAME), HTTP_RANGE='bytes=500-')
+
+        self.assertEqual(res.status_code, 416)
+        self.assertEqual(res['Content-Range'], f'bytes */{len(CONTENT)}')
+
+    def test_if_range_mismatch(self):
+        """ Test a stale If-Range returns the whole file """
+        res = self.client.get(
+            media_url(HASHED_NAME),
+            HTTP_RANGE='bytes=5-14',
+            HTTP_IF_RANGE='"stale"'
+        )
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(b''.join(res.streaming_content), CONTENT)
+
+    def test_missing_file(self):
+        """ Test missing files and paths outside MEDIA_ROOT return 404 """
+        res_missing = self.client.get(media_url('upload/recipe/none.jpg'))
+        res_outside = self.client.get(media_url('../../etc/passwd'))
+        res_dir = self.client.get(media_url('upload/recipe'))
+
+        self.assertEqual(res_missing.status_code, 404)
+        self.assertEqual(res_outside.status_code, 404)
+        self.assertEqual(res_dir.status_code, 404)
+
+    def test_method_not_allowed(self):
+        """ Test media files cannot be written to """
+        res = self.client.post(media_url(HASHED_NAME))
+
+        self.assertEqual(res.status_code, 405)
+
+    @override_settings(MEDIA_ACCEL_REDIRECT='/protected-media/')
+    def test_accel_redirect(self):
+        """ Test the file is left to the proxy with X-Accel-Redirect """
+        res = self.client.get(media_url(HASHED_NAME))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.content, b'')
+        self.assertEqual(
+            res['X-Accel-Redirect'], f'/protected-media/{HASHED_NAME}'
+        )
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+        self.assertIn('immutable', res['Cache-Control'])
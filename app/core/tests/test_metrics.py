@@ -0,0 +1,110 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.logs import StructuredFormatter
+from core.metrics import Histogram, registry
+from core.models import Tag
+from recipe.cache import get_list_cache
+
+
+TAGS_URL = reverse('recipe:tag-list')
+METRICS_URL = reverse('metrics')
+
+
+class MetricsTests(TestCase):
+    """ Test measuring the requests served """
+
+    def setUp(self):
+        get_list_cache().clear()
+        registry.reset()
+        self.user = get_user_model().objects.create_user(
+            'metrics@test.com',
+            'test@123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    @override_settings(SERVER_TIMING=True)
+    def test_server_timing_header(self):
+        """ Test the stages of a request are sent back in Server-Timing """
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.get(TAGS_URL)
+
+        stages = [
+            entry.split(';')[0] for entry in res['Server-Timing'].split(', ')
+        ]
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        for stage in ('db', 'serialize', 'render', 'total', 'queries'):
+            self.assertIn(stage, stages)
+
+    @override_settings(SERVER_TIMING=False)
+    def test_server_timing_header_staff_only(self):
+        """ Test only staff users get Server-Timing with it turned off """
+        res = self.client.get(TAGS_URL)
+        self.assertNotIn('Server-Timing', res)
+
+        self.user.is_staff = True
+        self.user.save()
+        res = self.client.get(TAGS_URL)
+        self.assertIn('Server-Timing', res)
+
+    def test_metrics_aggregated_per_view(self):
+        """ Test the requests are aggregated by view name """
+        self.client.get(TAGS_URL)
+        self.client.get(TAGS_URL)
+
+        summary = registry.summary()['recipe:tag-list']
+
+        self.assertEqual(summary['count'], 2)
+        self.assertEqual(summary['ms']['total']['count'], 2)
+        self.assertGreater(summary['response_bytes_mean'], 0)
+
+    def test_request_logged(self):
+        """ Test every request is logged with its measures as JSON """
+        with self.assertLogs('core.middleware', 'INFO') as logs:
+            self.client.get(TAGS_URL)
+
+        entry = json.loads(StructuredFormatter().format(logs.records[0]))
+        self.assertEqual(entry['view'], 'recipe:tag-list')
+        self.assertEqual(entry['status'], 200)
+        self.assertIn('queries', entry)
+        self.assertIn('db', entry['durations_ms'])
+
+    def test_metrics_endpoint_admin_only(self):
+        """ Test the metrics endpoint requires an admin user """
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_metrics_endpoint(self):
+        """ Test an admin user can read the metrics """
+        admin = get_user_model().objects.create_superuser(
+            'admin@test.com',
+            'test@123'
+        )
+        self.client.force_authenticate(admin)
+        self.client.get(TAGS_URL)
+
+        res = self.client.get(METRICS_URL)
+
+        views = res.data['views']
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('recipe:tag-list', views)
+        self.assertIn('p99', views['recipe:tag-list']['ms']['total'])
+
+    def test_histogram_percentiles(self):
+        """ Test percentiles are the upper bound of their bucket """
+        histogram = Histogram()
+        for value in [0.5] * 90 + [30] * 9 + [700]:
+            histogram.observe(value)
+
+        self.assertEqual(histogram.percentile(50), 1)
+        self.assertEqual(histogram.percentile(99), 50)
+        self.assertEqual(histogram.percentile(100), 1000)
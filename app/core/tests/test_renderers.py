@@ -0,0 +1,136 @@
+import io
+from decimal import Decimal
+from unittest.mock import patch
+
+import msgpack
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.test import APIClient
+
+from core import encoders
+from core.models import Recipe
+from core.parsers import JSONParser, MessagePackParser
+from core.renderers import JSONRenderer
+
+
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+class JSONRendererTests(SimpleTestCase):
+    """ Test the JSON renderer and parser """
+
+    data = {
+        'title': 'Dal\u2028',
+        'price': Decimal('5.50'),
+        'label': gettext_lazy('Invalid cursor'),
+        'ids': [1, 2],
+        'nested': {'none': None, 'yes': True},
+    }
+    expected = (
+        '{"title":"Dal\\u2028","price":"5.50","label":"Invalid cursor",'
+        '"ids":[1,2],"nested":{"none":null,"yes":true}}'
+    ).encode()
+
+    def test_render(self):
+        """ Test compact JSON with decimals rendered as strings """
+        self.assertEqual(JSONRenderer().render(self.data), self.expected)
+
+    def test_render_without_orjson(self):
+        """ Test the standard library encoder gives the same output """
+        with patch.object(encoders, 'orjson', None):
+            self.assertEqual(JSONRenderer().render(self.data), self.expected)
+
+    def test_render_indented(self):
+        """ Test an indent in the media type pretty prints the output """
+        content = JSONRenderer().render(
+            self.data, 'application/json; indent=2'
+        )
+
+        self.assertIn(b'\n  "price": "5.50"', content)
+
+    def test_parse(self):
+        """ Test parsing with and without orjson """
+        for orjson in (encoders.orjson, None):
+            with patch.object(encoders, 'orjson', orjson):
+                self.assertEqual(
+                    JSONParser().parse(io.BytesIO(b'{"a":[1,"\xc3\xa9"]}')),
+                    {'a': [1, '\xe9']}
+                )
+                with self.assertRaises(ParseError):
+                    JSONParser().parse(io.BytesIO(b'{"a":'))
+                with self.assertRaises(ParseError):
+                    JSONParser().parse(io.BytesIO(b'{"a":NaN}'))
+
+
+class MessagePackTests(TestCase):
+    """ Test negotiating MessagePack on the API """
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'msgpack@test.com',
+            'test@123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_as_msgpack(self):
+        """ Test Accept: application/msgpack renders the list compactly """
+        Recipe.objects.create(
+            user=self.user, title='Dal', time_minutes=10, price=5.00
+        )
+        json_res = self.client.get(RECIPE_URL)
+
+        res = self.client.get(RECIPE_URL, HTTP_ACCEPT='application/msgpack')
+
+        self.assertEqual(res['Content-Type'], 'application/msgpack')
+        self.assertEqual(
+            msgpack.unpackb(res.content, raw=False), json_res.json()
+        )
+        self.assertLess(len(res.content), len(json_res.content))
+
+    def test_create_from_msgpack(self):
+        """ Test a MessagePack body is parsed """
+        body = msgpack.packb({
+            'title': 'Dal', 'time_minutes': 10, 'price': '5.50',
+            'tag': [], 'ingredients': [],
+        })
+
+        res = self.client.post(
+            RECIPE_URL, body, content_type='application/msgpack'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            Recipe.objects.get(id=res.data['id']).price, Decimal('5.50')
+        )
+
+    def test_invalid_msgpack(self):
+        """ Test a malformed MessagePack body is a 400 """
+        with self.assertRaises(ParseError):
+            MessagePackParser().parse(io.BytesIO(b'\xc1'))
+
+        res = self.client.post(
+            RECIPE_URL, b'\x92\x01', content_type='application/msgpack'
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BenchmarkRenderersTests(SimpleTestCase):
+
+    def test_benchmark_renderers(self):
+        """ Test every format is timed and round trips the payload """
+        out = io.StringIO()
+
+        call_command(
+            'benchmark_renderers', '--rows=10', '--repeat=1', stdout=out
+        )
+
+        lines = out.getvalue().splitlines()
+        self.assertGreaterEqual(len(lines), 2)
+        for line in lines:
+            self.assertIn('round trip: ok', line)
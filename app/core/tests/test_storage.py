@@ -0,0 +1,46 @@
+import hashlib
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+
+from core.storage import ContentAddressedStorage
+
+
+class ContentAddressedStorageTests(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.TemporaryDirectory()
+        self.storage = ContentAddressedStorage(location=self.media_root.name)
+
+    def tearDown(self):
+        self.media_root.cleanup()
+
+    def test_upload_named_after_content(self):
+        """ Test uploads are stored under a sharded hash of their content """
+        name = self.storage.save('upload/recipe/a.JPG', ContentFile(b'img'))
+
+        digest = hashlib.sha256(b'img').hexdigest()
+        self.assertEqual(
+            name,
+            f'upload/recipe/{digest[:2]}/{digest[2:4]}/{digest}.jpg'
+        )
+
+    def test_identical_uploads_share_a_file(self):
+        """ Test saving the same content twice stores it once """
+        name1 = self.storage.save('upload/recipe/a.jpg', ContentFile(b'img'))
+        name2 = self.storage.save('upload/recipe/b.jpg', ContentFile(b'img'))
+        name3 = self.storage.save('upload/recipe/c.jpg', ContentFile(b'new'))
+
+        self.assertEqual(name1, name2)
+        self.assertNotEqual(name1, name3)
+
+    @override_settings(CONTENT_ADDRESSED_DIRS=['upload/recipe'])
+    def test_other_names_kept(self):
+        """ Test files outside the content addressed dirs keep their name """
+        name = self.storage.save(
+            'upload/recipe/ab/cd/abcd_thumbnail.webp',
+            ContentFile(b'img')
+        )
+
+        self.assertEqual(name, 'upload/recipe/ab/cd/abcd_thumbnail.webp')
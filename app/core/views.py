@@ -0,0 +1,185 @@
+import hashlib
+import mimetypes
+import os
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_safe
+from rest_framework.authentication import SessionAuthentication, \
+    TokenAuthentication
+from rest_framework.decorators import api_view, authentication_classes, \
+    permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from core.metrics import registry
+
+# <dir>/ab/cd/<sha256>.<ext>, as written by core.storage
+CONTENT_ADDRESSED_RE = re.compile(
+    r'(?:^|/)(?P<a>[0-9a-f]{2})/(?P<b>[0-9a-f]{2})/'
+    r'(?P<digest>(?P=a)(?P=b)[0-9a-f]{60})\.[A-Za-z0-9]+$'
+)
+RANGE_RE = re.compile(r'^bytes=(?P<start>\d*)-(?P<end>\d*)$')
+
+
+@lru_cache(maxsize=4096)
+def file_digest(path, mtime_ns, size):
+    """ Return the SHA-256 of a file, cached until it is modified """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as media_file:
+        for chunk in iter(lambda: media_file.read(64 * 2 ** 10), b''):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def parse_range(header, size):
+    """ Return the (start, end) of a single byte range, end inclusive
+
+    Returns None when the header should be ignored, such as for multiple
+    ranges, and raises ValueError when the range cannot be satisfied.
+    """
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if match is None:
+        return None
+    start, end = match.group('start'), match.group('end')
+    if not start and not end:
+        return None
+
+    if not start:
+        # suffix range, the last <end> bytes
+        length = int(end)
+        if length == 0 or size == 0:
+            raise ValueError('unsatisfiable range')
+        return max(size - length, 0), size - 1
+
+    start = int(start)
+    if start >= size:
+        raise ValueError('unsatisfiable range')
+    end = int(end) if end else size - 1
+    if end < start:
+        return None
+
+    return start, min(end, size - 1)
+
+
+class RangeFile:
+    """ File-like object reading only a byte range of a file """
+
+    def __init__(self, media_file, start, end):
+        self.media_file = media_file
+        self.remaining = end - start + 1
+        media_file.seek(start)
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.media_file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.media_file.close()
+
+
+def media_headers(response, etag, stat, immutable):
+    """ Set the validator and caching headers of a media response """
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Accept-Ranges'] = 'bytes'
+    if immutable:
+        response['Cache-Control'] = \
+            f'public, max-age={settings.MEDIA_IMMUTABLE_MAX_AGE}, immutable'
+    else:
+        response['Cache-Control'] = \
+            f'public, max-age={settings.MEDIA_MAX_AGE}'
+
+
+@require_safe
+def serve_media(request, path):
+    """ Serve a file from MEDIA_ROOT with conditional and range requests
+
+    Content-addressed files carry their hash in their name, which is used
+    as their ETag and makes them safe to cache forever. Whole files are
+    streamed with FileResponse, so WSGI servers with a file wrapper send
+    them with sendfile. With MEDIA_ACCEL_REDIRECT set, only the headers
+    are produced and a fronting nginx sends the file itself.
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        stat = os.stat(full_path)
+    except (OSError, SuspiciousFileOperation):
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+
+    match = CONTENT_ADDRESSED_RE.search(path)
+    if match is not None:
+        digest = match.group('digest')
+    else:
+        digest = file_digest(full_path, stat.st_mtime_ns, stat.st_size)
+    etag = quote_etag(digest)
+
+    headers = HttpResponse()
+    media_headers(headers, etag, stat, match is not None)
+    conditional = get_conditional_response(
+        request, etag=etag, last_modified=int(stat.st_mtime),
+        response=headers
+    )
+    if conditional is not headers:
+        return conditional
+
+    content_type = mimetypes.guess_type(full_path)[0] or \
+        'application/octet-stream'
+    if settings.MEDIA_ACCEL_REDIRECT:
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT + path
+        media_headers(response, etag, stat, match is not None)
+        return response
+
+    byte_range = None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if 'HTTP_RANGE' in request.META and if_range in (None, etag):
+        try:
+            byte_range = parse_range(
+                request.META['HTTP_RANGE'], stat.st_size
+            )
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+            return response
+
+    media_file = open(full_path, 'rb')
+    if byte_range is None:
+        response = FileResponse(media_file, content_type=content_type)
+    else:
+        start, end = byte_range
+        response = FileResponse(
+            RangeFile(media_file, start, end),
+            status=206,
+            content_type=content_type
+        )
+        response['Content-Length'] = end - start + 1
+        response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+    media_headers(response, etag, stat, match is not None)
+
+    return response
+
+
+@api_view(['GET'])
+@authentication_classes((TokenAuthentication, SessionAuthentication))
+@permission_classes((IsAdminUser,))
+def metrics(request):
+    """ Return the latency histograms of every view served by this process,
+    and the hit rates of its caches
+    """
+    return Response({
+        'views': registry.summary(),
+        'caches': registry.cache_summary(),
+    })
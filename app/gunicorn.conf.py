@@ -0,0 +1,52 @@
+# Gunicorn configuration, tuned through the environment.
+# Run with: gunicorn --config gunicorn.conf.py app.wsgi
+import multiprocessing
+import os
+
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+# processes serve requests in parallel; threads let one process overlap
+# the requests waiting on the database or on disk
+workers = int(os.environ.get(
+    'GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1
+))
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+worker_class = os.environ.get(
+    'GUNICORN_WORKER_CLASS', 'gthread' if threads > 1 else 'sync'
+)
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# recycle workers now and then to bound the growth of their memory
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+# load the application once in the master so that workers share its memory
+preload_app = True
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def when_ready(server):
+    """ Refuse to run several workers with caches local to each of them
+
+    Cached tokens, list generations and failed logins would then only be
+    invalidated in the worker that handled the change.
+    """
+    from django.conf import settings
+
+    local = [
+        alias for alias, config in settings.CACHES.items()
+        if config['BACKEND'].endswith('.LocMemCache')
+    ]
+    if server.cfg.workers > 1 and local:
+        raise RuntimeError(
+            f'{server.cfg.workers} workers cannot share the local memory '
+            f'cache {", ".join(local)}: set CACHE_BACKEND to memcached, '
+            f'or GUNICORN_WORKERS to 1'
+        )
@@ -0,0 +1,113 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def get_list_cache():
+    """ Return the cache holding the list responses, None when the lists
+    are not cached
+    """
+    if settings.RECIPE_LIST_CACHE is None:
+        return None
+
+    return caches[settings.RECIPE_LIST_CACHE]
+
+
+def _generation_key(user_id):
+    return f'recipe-gen:{user_id}'
+
+
+def _new_generation():
+    """ Return a generation never handed out before """
+    return int(time.time() * 1000000)
+
+
+def reset_generation(user_id):
+    """ Start a fresh generation for user, orphaning the cached lists """
+    cache = get_list_cache()
+    if cache is not None:
+        cache.set(_generation_key(user_id), _new_generation(), None)
+
+
+def get_generation(user_id):
+    """ Return the current generation of the data of user """
+    cache = get_list_cache()
+    key = _generation_key(user_id)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, _new_generation(), None)
+        generation = cache.get(key)
+
+    return generation
+
+
+def bump_generation(user_id):
+    """ Invalidate every cached list of user """
+    cache = get_list_cache()
+    if cache is None:
+        return
+
+    try:
+        cache.incr(_generation_key(user_id))
+    except ValueError:
+        reset_generation(user_id)
+
+
+class CachedListMixin:
+    """ Cache list responses per user until the user's data changes
+
+    The cache key and the ETag are both derived from the user's data
+    generation, so a matching If-None-Match is answered without running
+    the query or serializing anything.
+    """
+    cache_prefix = None
+
+    def get_list_cache_key(self, request):
+        """ Return the cache key of the list requested """
+        generation = get_generation(request.user.id)
+        return ':'.join([
+            'recipe-list',
+            self.cache_prefix,
+            str(request.user.id),
+            str(generation),
+            hashlib.md5(request.build_absolute_uri().encode()).hexdigest(),
+        ])
+
+    def get_list_etag(self, cache_key, request):
+        """ Return the ETag of the list for the negotiated format """
+        value = f'{cache_key}:{request.accepted_renderer.format}'
+        return '"%s"' % hashlib.md5(value.encode()).hexdigest()
+
+    def list(self, request, *args, **kwargs):
+        cache = get_list_cache()
+        if cache is None:
+            return super().list(request, *args, **kwargs)
+
+        cache_key = self.get_list_cache_key(request)
+        etag = self.get_list_etag(cache_key, request)
+        if_none_match = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+        if etag in if_none_match or '*' in if_none_match:
+            response = Response(
+                status=status.HTTP_304_NOT_MODIFIED,
+                headers={'ETag': etag}
+            )
+            patch_vary_headers(response, ['Accept'])
+            return response
+
+        data = cache.get(cache_key)
+        if data is None:
+            response = super().list(request, *args, **kwargs)
+            cache.set(cache_key, response.data, settings.RECIPE_LIST_CACHE_TTL)
+        else:
+            response = Response(data)
+
+        response['ETag'] = etag
+        # the same list is rendered as JSON or MessagePack
+        patch_vary_headers(response, ['Accept'])
+        return response
@@ -0,0 +1,44 @@
+from core.encoders import json_dumps
+
+
+def iter_chunks(queryset, chunk_size):
+    """ Yield lists of objects from queryset in id order, chunk by chunk
+
+    Each chunk is a separate query starting after the last seen id, so
+    prefetches run per chunk and only one chunk is held in memory.
+    """
+    queryset = queryset.order_by('id')
+    last_id = None
+    while True:
+        chunk = queryset
+        if last_id is not None:
+            chunk = chunk.filter(id__gt=last_id)
+        chunk = list(chunk[:chunk_size])
+        if not chunk:
+            return
+
+        yield chunk
+        last_id = chunk[-1].id
+
+
+def iter_json(queryset, serializer_class, chunk_size, ndjson=False,
+              context=None):
+    """ Yield the serialized queryset as a JSON array or as NDJSON """
+    separator = b'\n' if ndjson else b','
+    if not ndjson:
+        yield b'['
+
+    first = True
+    for chunk in iter_chunks(queryset, chunk_size):
+        items = serializer_class(
+            chunk, many=True, context=context or {}
+        ).data
+        body = separator.join(json_dumps(item) for item in items)
+        if ndjson:
+            yield body + b'\n'
+        else:
+            yield body if first else separator + body
+        first = False
+
+    if not ndjson:
+        yield b']'
@@ -0,0 +1,155 @@
+import math
+from decimal import Decimal
+
+from django.core.exceptions import ImproperlyConfigured, \
+    ValidationError as DjangoValidationError
+from django.db.models import Count
+from django.utils.translation import gettext as _
+from rest_framework.exceptions import ValidationError
+
+
+MATCH_ANY = 'any'
+MATCH_ALL = 'all'
+MATCH_MODES = (MATCH_ANY, MATCH_ALL)
+
+RANGE_LOOKUPS = ('exact', 'lt', 'lte', 'gt', 'gte', 'range')
+# the lookups clients may filter on, and the columns they may sort on,
+# each being the second column of a (user, column, id) index so that any
+# filtered or sorted list stays a range scan of one index
+RECIPE_FILTERS = {
+    'time_minutes': RANGE_LOOKUPS,
+    'price': RANGE_LOOKUPS,
+    'title': ('exact', 'startswith'),
+}
+RECIPE_ORDERINGS = ('id', 'time_minutes', 'price', 'title')
+# greater than any character, closing the range of a prefix
+MAX_CHAR = '\U0010ffff'
+# the widest integer columns of the supported databases, SQLite giving
+# integer fields no range validators
+INTEGER_RANGE = (-2 ** 63, 2 ** 63 - 1)
+
+
+def filter_by_related(queryset, through, column, ids, mode=MATCH_ANY):
+    """ Keep recipes linked to any or all of ids through an M2M table
+
+    The through table is only read inside an IN subquery, so each recipe
+    is returned once without joining or de-duplicating the outer query.
+    """
+    ids = set(ids)
+    links = through.objects.filter(**{f'{column}__in': ids})
+    if mode == MATCH_ALL:
+        links = links.values('recipe_id') \
+            .annotate(matched=Count(column)) \
+            .filter(matched=len(ids))
+
+    return queryset.filter(id__in=links.values('recipe_id'))
+
+
+def column_value(field, value, validate=True):
+    """ Return value converted to the type of field and checked to fit
+    its column, raising Django's ValidationError otherwise
+
+    The validators of field are skipped unless validate is set, a bound
+    compared to the column being valid past the values it may hold.
+    """
+    value = field.to_python(value)
+    if value is None:
+        raise DjangoValidationError(field.error_messages['null'], 'null')
+    if (isinstance(value, Decimal) and not value.is_finite()) or \
+            (isinstance(value, float) and not math.isfinite(value)):
+        raise DjangoValidationError(field.error_messages['invalid'], 'invalid',
+                                    {'value': value})
+    if validate:
+        field.run_validators(value)
+    low, high = INTEGER_RANGE
+    if isinstance(value, int) and not low <= value <= high:
+        raise DjangoValidationError(
+            _('Ensure this value is between %(low)s and %(high)s.'),
+            'out_of_range', {'low': low, 'high': high}
+        )
+
+    return value
+
+
+def _lookup_values(field, param, lookup, value):
+    """ Return the value of a lookup converted to the type of field """
+    values = value.split(',') if lookup == 'range' else [value]
+    if lookup == 'range' and len(values) != 2:
+        msg = _('Expected two comma separated values.')
+        raise ValidationError({param: [msg]})
+    try:
+        values = [
+            column_value(field, item, validate=lookup == 'exact')
+            for item in values
+        ]
+    except DjangoValidationError as error:
+        raise ValidationError({param: error.messages})
+
+    return values if lookup == 'range' else values[0]
+
+
+def lookup_filters(params, model, filters):
+    """ Return the filter() keywords of the <column>__<lookup> params
+
+    A prefix is matched as a range of the column as well, which an index
+    can seek to whatever the collation, so title__startswith is case
+    sensitive on every database.
+    """
+    lookups = {}
+    for param, value in params.items():
+        name, __, lookup = param.partition('__')
+        if name not in filters:
+            if lookup:
+                msg = _('Filtering on %s is not supported.') % name
+                raise ValidationError({param: [msg]})
+            continue
+        lookup = lookup or 'exact'
+        if lookup not in filters[name]:
+            msg = _('Expected one of: %s.') % ', '.join(
+                f'{name}__{allowed}' for allowed in filters[name]
+            )
+            raise ValidationError({param: [msg]})
+
+        value = _lookup_values(
+            model._meta.get_field(name), param, lookup, value
+        )
+        if lookup == 'startswith':
+            if not value:
+                continue
+            lookups[f'{name}__gte'] = value
+            lookups[f'{name}__lt'] = value + MAX_CHAR
+        lookups[f'{name}__{lookup}'] = value
+
+    return lookups
+
+
+def index_ordering(model, column):
+    """ Return the columns of the (user, column, ...) index of model """
+    for index in model._meta.indexes:
+        if index.fields[:2] == ['user', column]:
+            return tuple(index.fields[1:])
+
+    raise ImproperlyConfigured(
+        f'{model.__name__} has no (user, {column}) index to sort on'
+    )
+
+
+def parse_ordering(value, model, orderings):
+    """ Return the ordering requested as [-]<column>
+
+    Only one column is accepted, and the ordering is completed with the
+    following columns of its index, all in the same direction, so the
+    rows are read in index order instead of being sorted.
+    """
+    descending = value.startswith('-')
+    column = value[1:] if descending else value
+    if column not in orderings:
+        msg = _('Expected a single column to sort on, one of: %s.') % \
+            ', '.join(orderings)
+        raise ValidationError({'ordering': [msg]})
+
+    ordering = index_ordering(model, column)
+    if descending:
+        ordering = tuple(f'-{field}' for field in ordering)
+
+    return ordering
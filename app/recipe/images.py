@@ -0,0 +1,156 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, features
+
+from core.models import Recipe
+
+
+logger = logging.getLogger(__name__)
+
+ORIENTATION_TAG = 0x0112
+# the transposition turning an image upright for each value of its EXIF
+# orientation tag, as cameras store portrait photos sideways
+ORIENTATIONS = {
+    2: Image.FLIP_LEFT_RIGHT,
+    3: Image.ROTATE_180,
+    4: Image.FLIP_TOP_BOTTOM,
+    5: Image.TRANSPOSE,
+    6: Image.ROTATE_270,
+    7: Image.TRANSVERSE,
+    8: Image.ROTATE_90,
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_image_executor():
+    """ Return the pool processing the uploaded images """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.RECIPE_IMAGE_WORKERS,
+                thread_name_prefix='recipe-image'
+            )
+
+    return _executor
+
+
+def variant_format():
+    """ Return the format of the variants, WebP when Pillow supports it """
+    return 'WEBP' if features.check('webp') else 'JPEG'
+
+
+def variant_name(name, variant):
+    """ Return the storage name of a variant of the image name """
+    root = os.path.splitext(name)[0]
+    ext = 'webp' if variant_format() == 'WEBP' else 'jpg'
+    return f'{root}_{variant}.{ext}'
+
+
+def variant_names(name):
+    """ Return the storage names of every variant of the image name """
+    return {
+        variant: variant_name(name, variant)
+        for variant in settings.RECIPE_IMAGE_VARIANTS
+    }
+
+
+def delete_variants(name, storage=default_storage):
+    """ Delete the variants of the image name """
+    for variant in variant_names(name).values():
+        storage.delete(variant)
+
+
+def upright(image):
+    """ Return image turned the way its EXIF orientation says it is seen
+
+    ImageOps.exif_transpose does the same from Pillow 6 on.
+    """
+    try:
+        exif = image._getexif() or {}
+    except (AttributeError, IndexError, KeyError, TypeError, ValueError):
+        exif = {}
+    method = ORIENTATIONS.get(exif.get(ORIENTATION_TAG))
+
+    return image if method is None else image.transpose(method)
+
+
+def process_image(name, storage=default_storage):
+    """ Write the resized variants of the image name, returning timings
+
+    Variants are re-encoded from the decoded pixels only, so they carry
+    none of the EXIF data of the upload, and are turned upright first
+    since their orientation tag is dropped as well.
+    """
+    timings = {}
+    start = time.perf_counter()
+    with storage.open(name) as image_file:
+        image = Image.open(image_file)
+        image.load()
+    image = upright(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGB')
+    timings['decode'] = time.perf_counter() - start
+
+    image_format = variant_format()
+    if image_format == 'JPEG' and image.mode == 'RGBA':
+        image = image.convert('RGB')
+    for variant, size in settings.RECIPE_IMAGE_VARIANTS.items():
+        start = time.perf_counter()
+        resized = image.copy()
+        resized.thumbnail((size, size), Image.LANCZOS)
+        content = BytesIO()
+        resized.save(
+            content,
+            image_format,
+            quality=settings.RECIPE_IMAGE_QUALITY
+        )
+        target = variant_name(name, variant)
+        storage.delete(target)
+        storage.save(target, ContentFile(content.getvalue()))
+        timings[variant] = time.perf_counter() - start
+
+    logger.info(
+        'processed recipe image %s in %s', name,
+        ', '.join(f'{stage}={duration * 1000:.1f}ms'
+                  for stage, duration in timings.items()),
+        extra={'timings': timings}
+    )
+    return timings
+
+
+def _process_image_logged(name):
+    try:
+        return process_image(name)
+    except Exception:
+        logger.exception('failed to process recipe image %s', name)
+        raise
+
+
+def schedule_processing(name):
+    """ Process the image name in the background, returning a future """
+    return get_image_executor().submit(_process_image_logged, name)
+
+
+def collect_image(name, storage=default_storage):
+    """ Delete the image name and its variants once no recipe uses it
+
+    An image saved again for a recipe not committed yet is kept.
+    """
+    if not name or Recipe.objects.filter(image=name).exists():
+        return False
+    if not storage.delete_unless_pending(name):
+        return False
+
+    delete_variants(name, storage)
+    return True
@@ -0,0 +1,80 @@
+import io
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework import parsers, renderers
+
+from core import encoders
+from core.benchmark import TITLE_WORDS
+from core.parsers import JSONParser, MessagePackParser
+from core.renderers import JSONRenderer, MessagePackRenderer
+
+
+def recipe_list_payload(rows, seed=0):
+    """ Return a recipe list page as the list endpoint serializes it """
+    rng = random.Random(seed)
+    return {
+        'next': 'http://testserver/api/recipe/recipes/?cursor=eyJwIjpbMV19',
+        'previous': None,
+        'results': [
+            {
+                'id': index + 1,
+                'title': ' '.join(rng.sample(TITLE_WORDS, 3)),
+                'ingredients': sorted(rng.sample(range(1, 500), 6)),
+                'tag': sorted(rng.sample(range(1, 100), 2)),
+                'time_minutes': rng.randint(1, 240),
+                'price': f'{rng.uniform(1, 100):.2f}',
+                'link': '',
+            }
+            for index in range(rows)
+        ],
+    }
+
+
+class Command(BaseCommand):
+    """ Django command to compare the renderers on recipe list payloads """
+    help = 'Time rendering and parsing a recipe list with each format'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Number of timed runs, the fastest one being reported'
+        )
+
+    def best_time(self, function, repeat):
+        """ Return the fastest run of function and its last result """
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = function()
+            best = min(best, time.perf_counter() - start)
+
+        return best, result
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], max(options['repeat'], 1)
+        payload = recipe_list_payload(rows)
+        formats = [
+            ('drf json', renderers.JSONRenderer(), parsers.JSONParser()),
+            (f'json ({"orjson" if encoders.orjson else "stdlib"})',
+             JSONRenderer(), JSONParser()),
+            ('msgpack', MessagePackRenderer(), MessagePackParser()),
+        ]
+
+        for name, renderer, parser in formats:
+            render_time, content = self.best_time(
+                lambda: renderer.render(payload), repeat
+            )
+            parse_time, parsed = self.best_time(
+                lambda: parser.parse(io.BytesIO(content)), repeat
+            )
+            self.stdout.write(
+                f'{name:<14} render {render_time * 1000:7.1f}ms  '
+                f'parse {parse_time * 1000:7.1f}ms  '
+                f'{len(content):9d} bytes  '
+                f'round trip: {"ok" if parsed == payload else "differs"}'
+            )
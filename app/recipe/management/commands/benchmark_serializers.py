@@ -0,0 +1,89 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Prefetch
+
+from core.benchmark import generate_data
+from core.models import Tag, Ingredients, Recipe
+from recipe.serializers import RecipeSerializer, RecipeValuesSerializer
+
+
+class Command(BaseCommand):
+    """ Django command to compare the recipe list serializers """
+    help = 'Time serializing recipes with the model and values serializers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Number of timed runs, the fastest one being reported'
+        )
+
+    def load_instances(self, user):
+        """ Load the recipes as the list did before the values() rows """
+        return list(
+            Recipe.objects.filter(user=user).order_by('id').prefetch_related(
+                Prefetch('tag', queryset=Tag.objects.only('id')),
+                Prefetch('ingredients',
+                         queryset=Ingredients.objects.only('id')),
+            )
+        )
+
+    def load_rows(self, user):
+        """ Load the recipes as values() rows with their related ids """
+        columns = RecipeValuesSerializer.get_columns()[0]
+        rows = list(
+            Recipe.objects.filter(user=user).order_by('id').values(*columns)
+        )
+        RecipeValuesSerializer().add_related_ids(rows)
+        return rows
+
+    def measure(self, load, serializer_class, user, repeat):
+        """ Return the fastest load and serialization times, and the data """
+        load_time = serialize_time = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            objects = load(user)
+            loaded = time.perf_counter()
+            data = serializer_class(objects, many=True).data
+            end = time.perf_counter()
+            load_time = min(load_time, loaded - start)
+            serialize_time = min(serialize_time, end - loaded)
+
+        return load_time, serialize_time, data
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], max(options['repeat'], 1)
+        with transaction.atomic():
+            # the data set only lives in this transaction
+            generate_data(
+                1, tags=(20, 20), ingredients=(50, 50), recipes=(rows, rows),
+                recipe_tags=(0, 5), recipe_ingredients=(2, 10),
+                password='benchmark'
+            )
+            user = get_user_model().objects.latest('id')
+            results = {
+                'model': self.measure(
+                    self.load_instances, RecipeSerializer, user, repeat
+                ),
+                'values': self.measure(
+                    self.load_rows, RecipeValuesSerializer, user, repeat
+                ),
+            }
+            transaction.set_rollback(True)
+
+        for name, (load_time, serialize_time, data) in results.items():
+            self.stdout.write(
+                f'{name:<7} load {load_time * 1000:8.1f}ms  '
+                f'serialize {serialize_time * 1000:8.1f}ms  '
+                f'{rows / serialize_time:10.0f} rows/s'
+            )
+        model, values = results['model'], results['values']
+        self.stdout.write(self.style.SUCCESS(
+            f'values serializer {model[1] / values[1]:.1f}x faster, '
+            f'same output: {"yes" if model[2] == values[2] else "no"}'
+        ))
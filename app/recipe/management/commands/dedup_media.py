@@ -0,0 +1,73 @@
+import os
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from core.models import Recipe
+from core.storage import content_addressed_name, content_hash
+from recipe.images import delete_variants, schedule_processing
+
+
+class Command(BaseCommand):
+    """ Django command to move existing uploads to content addressed names """
+    help = 'Deduplicate the recipe images uploaded before content addressing'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--delete-orphans',
+            action='store_true',
+            help='Delete the uploads no recipe refers to'
+        )
+
+    def iter_uploads(self, directory):
+        """ Yield the names of the files stored directly in directory """
+        path = default_storage.path(directory)
+        if not os.path.isdir(path):
+            return
+
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    yield os.path.join(directory, entry.name)
+
+    def dedup(self, name, delete_orphans):
+        """ Move one upload to its content addressed name, returns status """
+        recipes = Recipe.objects.filter(image=name)
+        if not recipes.exists():
+            if delete_orphans:
+                default_storage.delete(name)
+                delete_variants(name)
+                return 'deleted'
+            return 'orphan'
+
+        with default_storage.open(name) as content:
+            digest = content_hash(File(content))
+        directory, basename = os.path.split(name)
+        target = content_addressed_name(
+            directory, digest, os.path.splitext(basename)[1]
+        )
+        duplicate = default_storage.exists(target)
+        if not duplicate:
+            target_path = default_storage.path(target)
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            os.replace(default_storage.path(name), target_path)
+
+        recipes.update(image=target)
+        if duplicate:
+            default_storage.delete(name)
+        delete_variants(name)
+        schedule_processing(target)
+
+        return 'merged' if duplicate else 'moved'
+
+    def handle(self, *args, **options):
+        counts = {'moved': 0, 'merged': 0, 'orphan': 0, 'deleted': 0}
+        for directory in settings.CONTENT_ADDRESSED_DIRS:
+            for name in self.iter_uploads(directory):
+                counts[self.dedup(name, options['delete_orphans'])] += 1
+
+        self.stdout.write(self.style.SUCCESS(', '.join(
+            f'{count} {status}' for status, count in counts.items()
+        )))
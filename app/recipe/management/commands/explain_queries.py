@@ -0,0 +1,133 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core.models import Tag, Ingredients, Recipe
+from recipe.filters import MATCH_ANY, MATCH_ALL, RECIPE_FILTERS, \
+    filter_by_related, lookup_filters
+
+
+class Command(BaseCommand):
+    """ Django command to show the query plans of the recipe API """
+    help = 'Run EXPLAIN on the queries behind the recipe API endpoints'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--email',
+            help='Explain the queries for this user instead of the first one'
+        )
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Exit with an error when a plan does not use its index'
+        )
+
+    def get_user(self, email):
+        """ Return the user whose queries are explained """
+        users = get_user_model().objects.order_by('id')
+        if email:
+            users = users.filter(email=email)
+        user = users.first()
+        if user is None:
+            raise CommandError('No user found to explain the queries for')
+
+        return user
+
+    def get_queries(self, user):
+        """ Return (label, queryset, expected index) triples """
+        recipes = Recipe.objects.filter(user=user).order_by('id')
+        tag_ids = list(
+            Tag.objects.filter(user=user).values_list('id', flat=True)[:2]
+        ) or [0]
+        ingredient_ids = list(
+            Ingredients.objects.filter(user=user)
+            .values_list('id', flat=True)[:2]
+        ) or [0]
+
+        return [
+            (
+                'tag list',
+                Tag.objects.filter(user=user).order_by('-name', 'id')[:100],
+                'core_tag_user_name_idx',
+            ),
+            (
+                'ingredient list',
+                Ingredients.objects.filter(user=user)
+                .order_by('-name', 'id')[:100],
+                'core_ingredients_user_name_idx',
+            ),
+            (
+                'recipe list',
+                recipes[:100],
+                'core_recipe_user_id_idx',
+            ),
+            (
+                'recipes by tag (any)',
+                filter_by_related(
+                    recipes, Recipe.tag.through, 'tag_id', tag_ids, MATCH_ANY
+                )[:100],
+                'core_recipe_tag_tag_recipe_idx',
+            ),
+            (
+                'recipes by tag (all)',
+                filter_by_related(
+                    recipes, Recipe.tag.through, 'tag_id', tag_ids, MATCH_ALL
+                )[:100],
+                'core_recipe_tag_tag_recipe_idx',
+            ),
+            (
+                'recipes by ingredients (any)',
+                filter_by_related(
+                    recipes,
+                    Recipe.ingredients.through,
+                    'ingredients_id',
+                    ingredient_ids,
+                    MATCH_ANY
+                )[:100],
+                'core_recipe_ingr_ingr_recipe_idx',
+            ),
+            (
+                'recipes by time',
+                recipes.filter(time_minutes__lte=30)
+                .order_by('time_minutes', 'id')[:100],
+                'core_recipe_user_time_idx',
+            ),
+            (
+                'recipes by price',
+                recipes.filter(price__range=(5, 10))
+                .order_by('-price', '-id')[:100],
+                'core_recipe_user_price_idx',
+            ),
+            (
+                'recipes by title prefix',
+                Recipe.objects.filter(user=user, **lookup_filters(
+                    {'title__startswith': 'a'}, Recipe, RECIPE_FILTERS
+                )).order_by('title', 'id')[:100],
+                'core_recipe_user_title_idx',
+            ),
+        ]
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['email'])
+        missing = []
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                # small tables are cheaper to scan, so the planner would
+                # otherwise never show whether an index can be used
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+
+            for label, queryset, index in self.get_queries(user):
+                plan = queryset.explain()
+                used = index in plan
+                if not used:
+                    missing.append(label)
+                style = self.style.SUCCESS if used else self.style.WARNING
+                self.stdout.write(style(f'{label} (expects {index})'))
+                self.stdout.write(plan)
+                self.stdout.write('')
+
+        if missing and options['check']:
+            raise CommandError(
+                'Queries not using their index: ' + ', '.join(missing)
+            )
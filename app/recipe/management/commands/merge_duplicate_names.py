@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from core.dedup import merge_duplicate_names
+from core.models import Tag, Ingredients
+from core.stats import rebuild_recipe_stats
+from recipe.cache import bump_generation
+
+
+class Command(BaseCommand):
+    """ Django command to merge tags and ingredients sharing a name """
+    help = 'Merge the tags and ingredients a user has under the same name'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Number of duplicate names merged per transaction'
+        )
+
+    def handle(self, *args, **options):
+        for model, field_name in ((Tag, 'tag'), (Ingredients, 'ingredients')):
+            users = set()
+            total = 0
+            for user_id, merged in merge_duplicate_names(
+                    model, field_name, options['batch_size']):
+                users.add(user_id)
+                total += merged
+            for user_id in users:
+                bump_generation(user_id)
+            # the links were moved without signals
+            rebuild_recipe_stats(users)
+
+            self.stdout.write(self.style.SUCCESS(
+                f'Merged {total} duplicate {model._meta.verbose_name_plural}'
+            ))
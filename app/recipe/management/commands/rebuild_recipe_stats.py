@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from core.stats import rebuild_recipe_stats
+from recipe.cache import bump_generation
+
+
+class Command(BaseCommand):
+    """ Django command to recompute the recipe statistics of the users """
+    help = 'Recompute the recipe counters from the recipes, fixing any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=int,
+            action='append',
+            dest='user_ids',
+            help='Only rebuild the statistics of this user id, repeatable'
+        )
+
+    def handle(self, *args, **options):
+        user_ids = options['user_ids']
+        corrected = rebuild_recipe_stats(user_ids)
+        for user_id in user_ids or ():
+            bump_generation(user_id)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt the recipe statistics, {corrected} counters corrected'
+        ))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from core.search import create_search_index, drop_search_index
+
+
+class Command(BaseCommand):
+    """ Django command to rebuild the full-text index of the recipes """
+    help = 'Recreate the recipe search index from the recipes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        with transaction.atomic(using=options['database']):
+            drop_search_index(connection)
+            create_search_index(connection)
+
+        self.stdout.write(self.style.SUCCESS('Rebuilt the search index'))
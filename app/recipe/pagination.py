@@ -0,0 +1,177 @@
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from recipe.filters import column_value
+
+
+class KeysetPagination(BasePagination):
+    """ Paginate on the values of the ordering columns of the last row
+
+    Every page is a range scan starting right after the previous page's
+    boundary row, so deep pages cost the same as the first one.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = getattr(settings, 'API_PAGE_SIZE', 100)
+    max_page_size = getattr(settings, 'API_MAX_PAGE_SIZE', 1000)
+    ordering = ('id',)
+    invalid_cursor_message = _('Invalid cursor')
+
+    def get_page_size(self, request):
+        """ Return the page size requested by the client, capped """
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+
+        return min(page_size, self.max_page_size)
+
+    def get_ordering(self, view):
+        """ Return the ordering columns, the last one being unique """
+        get_ordering = getattr(view, 'get_ordering', None)
+        if get_ordering is not None:
+            return tuple(get_ordering())
+
+        return tuple(self.ordering)
+
+    def encode_cursor(self, position, reverse):
+        """ Return the url pointing at the page next to position """
+        payload = json.dumps({'p': position, 'r': int(reverse)}, default=str)
+        cursor = base64.urlsafe_b64encode(payload.encode()).decode()
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, cursor
+        )
+
+    def decode_cursor(self, request):
+        """ Return the (position, reverse) pair held by the cursor """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            position, reverse = payload['p'], bool(payload['r'])
+        except (TypeError, ValueError, KeyError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or \
+                len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        return position, reverse
+
+    def clean_position(self, queryset, position):
+        """ Return the position converted to the types of the ordering
+        columns, which may be annotations of queryset
+        """
+        values = []
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            annotation = queryset.query.annotations.get(name)
+            if annotation is not None:
+                column = annotation.output_field
+            else:
+                column = queryset.model._meta.get_field(name)
+            try:
+                values.append(column_value(column, value))
+            except (DjangoValidationError, TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+
+        return values
+
+    def _after(self, position, reverse):
+        """ Return the filter selecting rows past position """
+        condition = Q()
+        preceding = {}
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            descending = field.startswith('-') != reverse
+            lookup = f'{name}__lt' if descending else f'{name}__gt'
+            condition |= Q(**preceding, **{lookup: value})
+            preceding[name] = value
+
+        return condition
+
+    def _position(self, instance):
+        """ Return the ordering column values of instance """
+        position = []
+        for field in self.ordering:
+            name = field.lstrip('-')
+            if isinstance(instance, dict):
+                position.append(instance[name])
+            else:
+                position.append(getattr(instance, name))
+
+        return position
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(view)
+        position, reverse = self.decode_cursor(request)
+
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(
+                field[1:] if field.startswith('-') else f'-{field}'
+                for field in ordering
+            )
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            position = self.clean_position(queryset, position)
+            queryset = queryset.filter(self._after(position, reverse))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+
+        return self.encode_cursor(self._position(self.page[-1]), False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+
+        return self.encode_cursor(self._position(self.page[0]), True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+
+class RecipeAttrPagination(KeysetPagination):
+    """ Paginate tags and ingredients in descending name order """
+    ordering = ('-name', 'id')
+
+
+class RecipePagination(KeysetPagination):
+    """ Paginate recipes in creation order """
+    ordering = ('id',)
@@ -1,38 +1,344 @@
+from collections import Counter
+
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, connection, transaction
+from django.db.models.functions import Lower
+from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
 
+from core.metrics import TimedSerializerMixin
 from core.models import Tag, Ingredients, Recipe
+from core.search import index_recipes
+from core.stats import add_link_counts, add_recipe_totals
+from recipe.images import variant_names
+from recipe.values import related_ids, related_ids_key
+
+
+def create_objects(model, objs):
+    """ Insert objs in bulk when the database returns the new ids """
+    if connection.features.can_return_ids_from_bulk_insert:
+        return model.objects.bulk_create(objs)
+
+    for obj in objs:
+        obj.save()
+    return objs
+
+
+class BulkCreateListSerializer(TimedSerializerMixin,
+                               serializers.ListSerializer):
+    """ Create all the objects of a list payload at once """
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        return create_objects(model, [
+            model(**attrs) for attrs in validated_data
+        ])
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """ Primary key field resolving ids preloaded by a list serializer """
+
+    def to_internal_value(self, data):
+        related_objects = getattr(self.root, 'related_objects', {})
+        objects = related_objects.get(self.parent.field_name)
+        if objects is None:
+            return super().to_internal_value(data)
+
+        try:
+            return objects[int(data)]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+
+class RecipeAttrListSerializer(BulkCreateListSerializer):
+    """ Create a list of tags or ingredients named uniquely per user
+
+    The objects already using the names of the payload are loaded in one
+    query. In upsert mode they are returned in place of new objects.
+    Names are compared as saved, stripped and ignoring case, and the
+    errors are reported against the items using them.
+    """
+    default_error_messages = {
+        'duplicate_names': _('This name is repeated within the list.'),
+    }
+
+    def lookup_name(self, value):
+        """ Return the name value is saved under lower cased, None when it
+        is invalid
+        """
+        try:
+            return self.child.fields['name'].run_validation(value).lower()
+        except serializers.ValidationError:
+            return None
+
+    def load_existing(self, names):
+        """ Return the user's objects using names, by lower cased name """
+        model = self.child.Meta.model
+        return {
+            obj.name.lower(): obj for obj in
+            model.objects.annotate(lower_name=Lower('name'))
+            .filter(user=self.context['request'].user, lower_name__in=names)
+        }
+
+    def to_internal_value(self, data):
+        request = self.context.get('request')
+        if isinstance(data, list) and request is not None:
+            names = {
+                self.lookup_name(item.get('name')) for item in data
+                if isinstance(item, dict)
+            }
+            self.existing = self.load_existing(names - {None})
+
+        validated_data = super().to_internal_value(data)
+        if not self.context.get('upsert'):
+            seen = set()
+            errors = []
+            for attrs in validated_data:
+                name = attrs['name'].lower()
+                errors.append(
+                    {'name': [self.error_messages['duplicate_names']]}
+                    if name in seen else {}
+                )
+                seen.add(name)
+            if any(errors):
+                raise serializers.ValidationError(errors)
+
+        return validated_data
+
+    def create(self, validated_data):
+        """ Create the objects
+
+        A name taken by a concurrent request since the validation is
+        invalid as well, except in upsert mode where the object created
+        meanwhile is returned.
+        """
+        try:
+            with transaction.atomic():
+                return self._create(validated_data)
+        except IntegrityError:
+            self.existing = self.load_existing(
+                {attrs['name'].lower() for attrs in validated_data}
+            )
+
+        if self.context.get('upsert'):
+            with transaction.atomic():
+                return self._create(validated_data)
+        raise serializers.ValidationError([
+            {'name': [self.child.error_messages['duplicate_name']]}
+            if attrs['name'].lower() in self.existing else {}
+            for attrs in validated_data
+        ])
+
+    def _create(self, validated_data):
+        if not self.context.get('upsert'):
+            return super().create(validated_data)
+
+        model = self.child.Meta.model
+        objects = dict(self.existing)
+        created = []
+        result = []
+        for attrs in validated_data:
+            name = attrs['name'].lower()
+            if name not in objects:
+                objects[name] = model(**attrs)
+                created.append(objects[name])
+            result.append(objects[name])
+        create_objects(model, created)
 
+        return result
 
-class TagSerializer(serializers.ModelSerializer):
+
+class RecipeAttrSerializer(TimedSerializerMixin,
+                           serializers.ModelSerializer):
+    """ Base serializer for tags and ingredients """
+    default_error_messages = {
+        'duplicate_name': _('An object with this name already exists.'),
+    }
+
+    def validate_name(self, value):
+        """ Reject a name the user already uses, ignoring case """
+        request = self.context.get('request')
+        if request is None or self.context.get('upsert'):
+            return value
+
+        existing = getattr(self.root, 'existing', None)
+        if existing is not None:
+            exists = value.lower() in existing
+        else:
+            exists = self.Meta.model.objects.filter(
+                user=request.user,
+                name__iexact=value
+            ).exists()
+        if exists:
+            self.fail('duplicate_name')
+
+        return value
+
+    def create(self, validated_data):
+        """ Create the object, a name taken by a concurrent request since
+        the validation being invalid as well, except in upsert mode where
+        the view returns the object created meanwhile
+        """
+        try:
+            with transaction.atomic():
+                return super().create(validated_data)
+        except IntegrityError:
+            if self.context.get('upsert'):
+                raise
+            raise serializers.ValidationError(
+                {'name': [self.error_messages['duplicate_name']]},
+                code='duplicate_name'
+            )
+
+
+class TagSerializer(RecipeAttrSerializer):
     """ Serializer for Tag object """
 
     class Meta:
         model = Tag
         fields = ('id', 'name')
         read_only_fields = ('id',)
+        list_serializer_class = RecipeAttrListSerializer
 
 
-class IngredientSerializers(serializers.ModelSerializer):
+class IngredientSerializers(RecipeAttrSerializer):
     """ Serializer for Ingredients objects """
 
     class Meta:
         model = Ingredients
         fields = ('id', 'name')
         read_only_fields = ('id',)
+        list_serializer_class = RecipeAttrListSerializer
+
+
+class TagCountSerializer(TagSerializer):
+    """ Serialize a tag with the number of recipes using it """
+    recipe_count = serializers.IntegerField(read_only=True)
+
+    class Meta(TagSerializer.Meta):
+        fields = TagSerializer.Meta.fields + ('recipe_count',)
+
+
+class IngredientCountSerializer(IngredientSerializers):
+    """ Serialize an ingredient with the number of recipes using it """
+    recipe_count = serializers.IntegerField(read_only=True)
+
+    class Meta(IngredientSerializers.Meta):
+        fields = IngredientSerializers.Meta.fields + ('recipe_count',)
+
+
+class RecipeListSerializer(TimedSerializerMixin,
+                           serializers.ListSerializer):
+    """ Validate and create a list of recipes in a fixed number of queries
+
+    The tags and ingredients of every item are loaded in one query per
+    relation before validation, and the links of all the new recipes are
+    inserted in one statement per relation.
+    """
+    related_fields = ('tag', 'ingredients')
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            self.related_objects = {}
+            for field_name in self.related_fields:
+                ids = set()
+                for item in data:
+                    values = item.get(field_name) \
+                        if isinstance(item, dict) else None
+                    if isinstance(values, list):
+                        ids.update(self._to_ints(values))
+                queryset = self.child.fields[field_name] \
+                    .child_relation.get_queryset()
+                self.related_objects[field_name] = queryset.in_bulk(ids)
+
+        return super().to_internal_value(data)
+
+    def _to_ints(self, values):
+        for value in values:
+            try:
+                yield int(value)
+            except (TypeError, ValueError):
+                continue
+
+    def create(self, validated_data):
+        related = [
+            {name: attrs.pop(name, []) for name in self.related_fields}
+            for attrs in validated_data
+        ]
+        recipes = [Recipe(**attrs) for attrs in validated_data]
+        for recipe in recipes:
+            recipe._counted_in_bulk = True
+        recipes = create_objects(Recipe, recipes)
+        add_recipe_totals(recipes)
+
+        for name in self.related_fields:
+            field = Recipe._meta.get_field(name)
+            through = field.remote_field.through
+            column = field.m2m_reverse_field_name()
+            links = through.objects.bulk_create([
+                through(**{'recipe_id': recipe.id, f'{column}_id': obj.id})
+                for recipe, links in zip(recipes, related)
+                for obj in set(links[name])
+            ])
+            add_link_counts(name, Counter(
+                getattr(link, f'{column}_id') for link in links
+            ))
+
+        # the links were inserted in bulk, without m2m_changed signals
+        recipe_ids = [recipe.id for recipe in recipes]
+        index_recipes(recipe_ids)
+
+        return list(
+            Recipe.objects.filter(id__in=recipe_ids)
+            .prefetch_related(*self.related_fields)
+            .order_by('id')
+        )
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """ Serializer mixin narrowing its fields to the request's needs
+
+    The fields listed in context['fields'] are the only ones kept, and
+    the relations in context['expand'] are nested as objects instead of
+    ids. The view validates both lists and loads only what they need.
+    """
+    # relations which ?expand= may nest, with their serializer
+    expandable_fields = {}
+    # model columns read by the fields which are not model fields
+    field_columns = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for name in self.context.get('expand') or ():
+            self.fields[name] = \
+                self.expandable_fields[name](many=True, read_only=True)
+
+        fields = self.context.get('fields')
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class RecipeSerializer(SparseFieldsMixin,
+                       TimedSerializerMixin,
+                       serializers.ModelSerializer):
     """ Serialize a  recipe """
 
-    ingredients = serializers.PrimaryKeyRelatedField(
+    ingredients = BulkPrimaryKeyRelatedField(
         many=True,
         queryset=Ingredients.objects.all()
     )
 
-    tag = serializers.PrimaryKeyRelatedField(
+    tag = BulkPrimaryKeyRelatedField(
         many=True,
         queryset=Tag.objects.all()
     )
+    expandable_fields = {
+        'ingredients': IngredientSerializers,
+        'tag': TagSerializer,
+    }
 
     class Meta:
         model = Recipe
@@ -41,18 +347,174 @@ class RecipeSerializer(serializers.ModelSerializer):
             'time_minutes', 'price', 'link'
         )
         read_only_fields = ('id',)
+        list_serializer_class = RecipeListSerializer
 
 
 class RecipeDetailSerializer(RecipeSerializer):
     """ Serialize a recipe detail """
     ingredients = IngredientSerializers(many=True, read_only=True)
     tag = TagSerializer(many=True, read_only=True)
+    image_variants = serializers.SerializerMethodField()
+    field_columns = {'image_variants': 'image'}
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ('image_variants',)
 
+    def get_image_variants(self, obj):
+        """ Return the urls of the resized images processed so far """
+        if not obj.image:
+            return {}
 
-class RecipeImageSerializer(serializers.ModelSerializer):
+        request = self.context.get('request')
+        urls = {}
+        for variant, name in variant_names(obj.image.name).items():
+            if not default_storage.exists(name):
+                continue
+            url = default_storage.url(name)
+            urls[variant] = request.build_absolute_uri(url) \
+                if request is not None else url
+
+        return urls
+
+
+class RecipeImageSerializer(TimedSerializerMixin,
+                            serializers.ModelSerializer):
     """ Serializer for uploading images to recipes """
 
     class Meta:
         model = Recipe
         fields = ('id', 'image')
         read_only_fields = ('id',)
+
+
+class RecipeStatsSerializer(TimedSerializerMixin, serializers.Serializer):
+    """ Serialize the recipe statistics of a user """
+    recipe_count = serializers.IntegerField()
+    average_time_minutes = serializers.FloatField()
+    average_price = serializers.DecimalField(max_digits=5, decimal_places=2)
+    tags = TagCountSerializer(many=True)
+    ingredients = IngredientCountSerializer(many=True)
+
+
+def sorted_ids(ids):
+    """ Return the related ids of a row in order, None meaning none """
+    return sorted(ids) if ids else []
+
+
+class ValuesListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    """ Serialize a page of values() rows, loading their related ids once """
+
+    def to_representation(self, data):
+        rows = data if isinstance(data, list) else list(data)
+        self.child.add_related_ids(rows)
+        to_representation = self.child.to_representation
+
+        return [to_representation(row) for row in rows]
+
+
+class ValuesSerializer(serializers.BaseSerializer):
+    """ Read-only serializer building items straight from values() rows
+
+    A ModelSerializer runs a field object per value of every item, which
+    dominates the time of large lists once the queries are fixed. This
+    copies the columns of each row, only converting those listed in
+    converters, and reads the M2M ids from the arrays the queryset
+    annotated, or loads them for the whole page. The output is the same
+    as the one of the model serializer it mirrors.
+    """
+    # M2M fields rendered as lists of ids
+    related_fields = ()
+    # functions turning a column value into its representation
+    converters = {}
+    expandable_fields = {}
+
+    class Meta:
+        model = None
+        fields = ()
+        list_serializer_class = ValuesListSerializer
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.output_fields = self.context.get('fields') or self.Meta.fields
+        self.columns = [
+            (name, related_ids_key(name), sorted_ids)
+            if name in self.related_fields
+            else (name, name, self.converters.get(name))
+            for name in self.output_fields
+        ]
+
+    @classmethod
+    def get_columns(cls, fields=None):
+        """ Return the values() columns and M2M fields fields read """
+        fields = fields or cls.Meta.fields
+        related = [name for name in fields if name in cls.related_fields]
+        columns = ['id'] if related else []
+        columns.extend(
+            name for name in fields
+            if name not in cls.related_fields and name not in columns
+        )
+
+        return columns, related
+
+    def add_related_ids(self, rows):
+        """ Add the ids of the M2M fields the rows were not annotated with """
+        if not rows:
+            return
+        for name in self.related_fields:
+            key = related_ids_key(name)
+            if name not in self.output_fields or key in rows[0]:
+                continue
+            ids = related_ids(self.Meta.model, name, [
+                row['id'] for row in rows
+            ])
+            for row in rows:
+                row[key] = ids.get(row['id'], [])
+
+    def to_representation(self, row):
+        return {
+            name: row[key] if convert is None else convert(row[key])
+            for name, key, convert in self.columns
+        }
+
+
+class TagValuesSerializer(ValuesSerializer):
+    """ Fast read-only TagSerializer for the tag lists """
+
+    class Meta(ValuesSerializer.Meta):
+        model = Tag
+        fields = TagSerializer.Meta.fields
+
+
+class TagCountValuesSerializer(ValuesSerializer):
+    """ Fast read-only TagCountSerializer for the tag lists """
+
+    class Meta(ValuesSerializer.Meta):
+        model = Tag
+        fields = TagCountSerializer.Meta.fields
+
+
+class IngredientValuesSerializer(ValuesSerializer):
+    """ Fast read-only IngredientSerializers for the ingredient lists """
+
+    class Meta(ValuesSerializer.Meta):
+        model = Ingredients
+        fields = IngredientSerializers.Meta.fields
+
+
+class IngredientCountValuesSerializer(ValuesSerializer):
+    """ Fast read-only IngredientCountSerializer for the ingredient lists """
+
+    class Meta(ValuesSerializer.Meta):
+        model = Ingredients
+        fields = IngredientCountSerializer.Meta.fields
+
+
+class RecipeValuesSerializer(ValuesSerializer):
+    """ Fast read-only RecipeSerializer for the recipe lists """
+    related_fields = ('ingredients', 'tag')
+    # the columns hold decimals with the field's places, as DRF renders
+    converters = {'price': str}
+
+    class Meta(ValuesSerializer.Meta):
+        model = Recipe
+        fields = RecipeSerializer.Meta.fields
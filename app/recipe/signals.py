@@ -0,0 +1,238 @@
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.db import connections, transaction
+from django.db.models.signals import post_init, post_save, pre_delete, \
+    post_delete, post_migrate, m2m_changed
+from django.dispatch import receiver
+
+from core.models import Tag, Ingredients, Recipe, RecipeStats
+from core.search import index_recipes, prune_search_index, \
+    unindex_recipes
+from core.stats import LINK_STATS, add_counts, add_link_counts, \
+    add_recipe_totals, to_decimal
+from recipe.cache import bump_generation, reset_generation
+from recipe.images import collect_image
+
+
+@receiver(post_save, sender=get_user_model())
+def start_user_generation(sender, instance, created, **kwargs):
+    """ Make sure a new user never sees lists cached for a reused id """
+    if created:
+        reset_generation(instance.id)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredients)
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredients)
+@receiver(post_delete, sender=Recipe)
+def invalidate_user_lists(sender, instance, **kwargs):
+    """ Invalidate the cached lists of the owner of instance
+
+    The lists are invalidated once the change commits, for a list read
+    before that not to be cached under the new generation.
+    """
+    user_id = instance.user_id
+    transaction.on_commit(lambda: bump_generation(user_id))
+
+
+@receiver(m2m_changed, sender=Recipe.tag.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def invalidate_user_lists_on_link(sender, instance, action, **kwargs):
+    """ Invalidate the cached lists when recipe links change """
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        user_id = instance.user_id
+        transaction.on_commit(lambda: bump_generation(user_id))
+
+
+def _image_name(instance):
+    """ Return the stored image name of a recipe, None when not loaded """
+    value = instance.__dict__.get('image')
+    return getattr(value, 'name', value)
+
+
+@receiver(post_init, sender=Recipe)
+def remember_image(sender, instance, **kwargs):
+    """ Keep the image name loaded from the database to spot changes """
+    instance._loaded_image = _image_name(instance)
+
+
+@receiver(post_save, sender=Recipe)
+def collect_replaced_image(sender, instance, **kwargs):
+    """ Delete the previous image of a recipe once nothing uses it """
+    old_name = getattr(instance, '_loaded_image', None)
+    new_name = _image_name(instance)
+    instance._loaded_image = new_name
+    if old_name and old_name != new_name:
+        transaction.on_commit(lambda: collect_image(old_name))
+
+
+@receiver(post_delete, sender=Recipe)
+def collect_deleted_image(sender, instance, **kwargs):
+    """ Delete the image of a deleted recipe once nothing uses it """
+    name = _image_name(instance)
+    if name:
+        transaction.on_commit(lambda: collect_image(name))
+
+
+@receiver(post_save, sender=Recipe)
+def index_saved_recipe(sender, instance, update_fields=None, **kwargs):
+    """ Keep the search document of a recipe in step with its title """
+    if update_fields is None or 'title' in update_fields:
+        index_recipes([instance.id])
+
+
+@receiver(post_delete, sender=Recipe)
+def unindex_deleted_recipe(sender, instance, **kwargs):
+    unindex_recipes([instance.id])
+
+
+@receiver(post_migrate)
+def prune_unindexed_recipes(sender, using, **kwargs):
+    """ Delete the search documents left by recipes deleted without
+    signals, such as by flush, which empties the model tables only
+    """
+    if sender.label == 'core':
+        prune_search_index(connections[using])
+
+
+def _linked_recipe_ids(instance):
+    """ Return the ids of the recipes linked to a tag or an ingredient """
+    field_name = 'tag' if isinstance(instance, Tag) else 'ingredients'
+    return list(
+        Recipe.objects.filter(**{field_name: instance})
+        .values_list('id', flat=True)
+    )
+
+
+@receiver(m2m_changed, sender=Recipe.tag.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def index_relinked_recipes(sender, instance, action, reverse, pk_set,
+                           **kwargs):
+    """ Re-index the recipes whose tags or ingredients changed """
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            index_recipes([instance.id])
+    elif action == 'pre_clear':
+        instance._search_recipe_ids = _linked_recipe_ids(instance)
+    elif action == 'post_clear':
+        index_recipes(instance._search_recipe_ids)
+    elif action in ('post_add', 'post_remove'):
+        index_recipes(pk_set)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredients)
+def index_renamed_recipes(sender, instance, created, **kwargs):
+    """ Re-index the recipes of a tag or an ingredient saved again """
+    if not created:
+        index_recipes(_linked_recipe_ids(instance))
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredients)
+def remember_linked_recipes(sender, instance, **kwargs):
+    instance._search_recipe_ids = _linked_recipe_ids(instance)
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredients)
+def index_unlinked_recipes(sender, instance, **kwargs):
+    """ Re-index the recipes of a deleted tag or ingredient """
+    index_recipes(getattr(instance, '_search_recipe_ids', []))
+
+
+def _loaded_totals(instance):
+    """ Return the counted values of a recipe, None when not loaded """
+    return (
+        instance.__dict__.get('time_minutes'),
+        to_decimal(instance.__dict__.get('price')),
+    )
+
+
+@receiver(post_init, sender=Recipe)
+def remember_totals(sender, instance, **kwargs):
+    """ Keep the values loaded from the database to count the changes """
+    instance._loaded_totals = _loaded_totals(instance)
+
+
+@receiver(post_save, sender=Recipe)
+def count_saved_recipe(sender, instance, created, **kwargs):
+    """ Add a new recipe, or the change of its values, to the totals """
+    old_totals = getattr(instance, '_loaded_totals', (None, None))
+    instance._loaded_totals = _loaded_totals(instance)
+    if getattr(instance, '_counted_in_bulk', False):
+        return
+
+    if created:
+        add_recipe_totals([instance])
+        return
+
+    time_minutes, price = instance._loaded_totals
+    old_time_minutes, old_price = old_totals
+    deltas = {}
+    if None not in (time_minutes, old_time_minutes):
+        deltas['time_minutes_sum'] = time_minutes - old_time_minutes
+    if None not in (price, old_price):
+        deltas['price_sum'] = price - old_price
+    add_counts(RecipeStats, {instance.user_id: deltas})
+
+
+def _recipe_links(recipe_ids, field_name, related_ids=None):
+    """ Return how many of the given recipes each related object links """
+    field = Recipe._meta.get_field(field_name)
+    column = f'{field.m2m_reverse_field_name()}_id'
+    links = field.remote_field.through.objects \
+        .filter(recipe_id__in=recipe_ids)
+    if related_ids is not None:
+        links = links.filter(**{f'{column}__in': related_ids})
+
+    return Counter(links.values_list(column, flat=True))
+
+
+@receiver(pre_delete, sender=Recipe)
+def remember_recipe_links(sender, instance, **kwargs):
+    """ Keep the links the deletion cascades to, which send no signal """
+    instance._stats_links = {
+        field_name: _recipe_links([instance.id], field_name)
+        for field_name in LINK_STATS
+    }
+
+
+@receiver(post_delete, sender=Recipe)
+def count_deleted_recipe(sender, instance, **kwargs):
+    add_recipe_totals([instance], sign=-1)
+    for field_name, counts in getattr(instance, '_stats_links', {}).items():
+        add_link_counts(field_name, counts, sign=-1)
+
+
+@receiver(m2m_changed, sender=Recipe.tag.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def count_links(sender, instance, action, reverse, pk_set, **kwargs):
+    """ Count the recipes linked to each tag and ingredient
+
+    The added ids are only the links which did not exist yet, but the
+    removed ids are the ones asked for, so the links really removed are
+    looked up before they are.
+    """
+    field_name = 'tag' if sender is Recipe.tag.through else 'ingredients'
+    if action == 'post_add':
+        if reverse:
+            counts = {instance.id: len(pk_set)}
+        else:
+            counts = dict.fromkeys(pk_set, 1)
+        add_link_counts(field_name, counts)
+    elif action in ('pre_remove', 'pre_clear'):
+        if reverse:
+            column = f'{field_name}_id'
+            links = sender.objects.filter(**{column: instance.id})
+            if pk_set is not None:
+                links = links.filter(recipe_id__in=pk_set)
+            instance._stats_unlinked = {instance.id: links.count()}
+        else:
+            instance._stats_unlinked = \
+                _recipe_links([instance.id], field_name, pk_set)
+    elif action in ('post_remove', 'post_clear'):
+        add_link_counts(field_name, instance._stats_unlinked, sign=-1)
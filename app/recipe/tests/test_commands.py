@@ -0,0 +1,106 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+
+from core.models import Tag, Ingredients, Recipe
+
+
+class ExplainQueriesCommandTests(TestCase):
+
+    def test_explain_queries_use_indexes(self):
+        """ Test the API queries are planned on their indexes """
+        user = get_user_model().objects.create_user('test@test.com', 'pass')
+        recipe = Recipe.objects.create(
+            user=user,
+            title='puttu',
+            time_minutes=5,
+            price=5.00
+        )
+        recipe.tag.add(Tag.objects.create(user=user, name='vegan'))
+        recipe.ingredients.add(
+            Ingredients.objects.create(user=user, name='rice')
+        )
+        out = StringIO()
+
+        call_command('explain_queries', '--check', stdout=out)
+
+        self.assertIn('core_recipe_tag_tag_recipe_idx', out.getvalue())
+
+    def test_explain_queries_without_users(self):
+        """ Test the command fails when there is no user to explain for """
+        with self.assertRaises(CommandError):
+            call_command('explain_queries', stdout=StringIO())
+
+
+class MergeDuplicateNamesCommandTests(TransactionTestCase):
+    """ Test merging the duplicates created before the unique indexes of
+    migration 0015 exist
+    """
+
+    def setUp(self):
+        call_command('migrate', 'core', '0014', verbosity=0)
+        self.addCleanup(call_command, 'migrate', 'core', verbosity=0)
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            'pass'
+        )
+
+    def sample_recipe(self, *tags):
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title='puttu',
+            time_minutes=5,
+            price=5.00
+        )
+        recipe.tag.add(*tags)
+        return recipe
+
+    def test_merge_duplicate_tags(self):
+        """ Test duplicate tags are merged into the oldest one """
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        duplicate1 = Tag.objects.create(user=self.user, name='vegan')
+        duplicate2 = Tag.objects.create(user=self.user, name='VEGAN')
+        other = Tag.objects.create(user=self.user, name='Dessert')
+        recipe1 = self.sample_recipe(vegan, duplicate1)
+        recipe2 = self.sample_recipe(duplicate1, duplicate2, other)
+
+        call_command(
+            'merge_duplicate_names',
+            '--batch-size', '1',
+            stdout=StringIO()
+        )
+
+        self.assertEqual(
+            set(Tag.objects.values_list('id', flat=True)),
+            {vegan.id, other.id}
+        )
+        self.assertEqual(list(recipe1.tag.all()), [vegan])
+        self.assertEqual(set(recipe2.tag.all()), {vegan, other})
+
+    def test_unique_indexes_built_after_merge(self):
+        """ Test the unique indexes are built once duplicates are merged """
+        Tag.objects.create(user=self.user, name='Vegan')
+        Tag.objects.create(user=self.user, name='vegan')
+        call_command('merge_duplicate_names', stdout=StringIO())
+
+        call_command('migrate', 'core', verbosity=0)
+
+        with connection.cursor() as cursor:
+            indexes = connection.introspection.get_constraints(
+                cursor, 'core_tag'
+            )
+        self.assertTrue(indexes['core_tag_user_lower_name_uniq']['unique'])
+
+    def test_merge_keeps_other_users_tags(self):
+        """ Test tags of different users are never merged """
+        user2 = get_user_model().objects.create_user('test2@test.com', 'pass')
+        Tag.objects.create(user=self.user, name='Vegan')
+        Tag.objects.create(user=user2, name='vegan')
+
+        call_command('merge_duplicate_names', stdout=StringIO())
+
+        self.assertEqual(Tag.objects.count(), 2)
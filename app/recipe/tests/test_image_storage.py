@@ -0,0 +1,130 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TransactionTestCase, override_settings
+
+from core.models import Recipe
+from core.storage import ContentAddressedStorage
+from recipe.images import collect_image
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+@patch('recipe.management.commands.dedup_media.schedule_processing')
+class RecipeImageStorageTests(TransactionTestCase):
+    """ Test sharing and collecting the stored recipe images """
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@test.com',
+            'test@123'
+        )
+
+    def tearDown(self):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def sample_recipe(self, content=None):
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title='puttu',
+            time_minutes=5,
+            price=5.00
+        )
+        if content is not None:
+            recipe.image.save('photo.jpg', ContentFile(content))
+        return recipe
+
+    def test_replaced_image_collected(self, mock_schedule):
+        """ Test a replaced image is deleted once no recipe uses it """
+        recipe = self.sample_recipe(b'first')
+        old_name = recipe.image.name
+
+        recipe.image.save('photo.jpg', ContentFile(b'second'))
+
+        self.assertFalse(default_storage.exists(old_name))
+        self.assertTrue(default_storage.exists(recipe.image.name))
+
+    def test_shared_image_kept(self, mock_schedule):
+        """ Test an image used by another recipe survives a deletion """
+        recipe1 = self.sample_recipe(b'same')
+        recipe2 = self.sample_recipe(b'same')
+        self.assertEqual(recipe1.image.name, recipe2.image.name)
+
+        recipe1.delete()
+        self.assertTrue(default_storage.exists(recipe2.image.name))
+
+        Recipe.objects.get(id=recipe2.id).delete()
+        self.assertFalse(default_storage.exists(recipe2.image.name))
+
+    def test_image_saved_in_uncommitted_transaction_kept(self, mock_schedule):
+        """ Test an image saved again by a transaction not committed yet is
+        not collected until that transaction commits
+        """
+        recipe = self.sample_recipe(b'same')
+        name = recipe.image.name
+        Recipe.objects.filter(id=recipe.id).update(image='')
+
+        with transaction.atomic():
+            self.assertEqual(
+                default_storage.save('upload/recipe/new.jpg',
+                                     ContentFile(b'same')),
+                name
+            )
+            self.assertFalse(collect_image(name))
+            self.assertTrue(default_storage.exists(name))
+
+        self.assertTrue(collect_image(name))
+        self.assertFalse(default_storage.exists(name))
+
+    def test_image_saved_while_collected_restored(self, mock_schedule):
+        """ Test an image marked pending while being collected is kept """
+        recipe = self.sample_recipe(b'same')
+        name = recipe.image.name
+        Recipe.objects.filter(id=recipe.id).update(image='')
+
+        with patch.object(ContentAddressedStorage, 'is_pending',
+                          side_effect=[False, True]):
+            self.assertFalse(collect_image(name))
+
+        self.assertTrue(default_storage.exists(name))
+        self.assertEqual(
+            os.listdir(os.path.dirname(default_storage.path(name))),
+            [os.path.basename(name)]
+        )
+
+    def test_dedup_media(self, mock_schedule):
+        """ Test existing uploads are merged into content addressed files """
+        os.makedirs(os.path.join(MEDIA_ROOT, 'upload/recipe'))
+        for name, content in (('a.jpg', b'same'), ('b.jpg', b'same'),
+                              ('c.jpg', b'orphan')):
+            with open(os.path.join(MEDIA_ROOT, 'upload/recipe', name),
+                      'wb') as image_file:
+                image_file.write(content)
+        recipe1 = self.sample_recipe()
+        recipe2 = self.sample_recipe()
+        Recipe.objects.filter(id=recipe1.id) \
+            .update(image='upload/recipe/a.jpg')
+        Recipe.objects.filter(id=recipe2.id) \
+            .update(image='upload/recipe/b.jpg')
+
+        call_command('dedup_media', '--delete-orphans', stdout=StringIO())
+
+        recipe1.refresh_from_db()
+        recipe2.refresh_from_db()
+        self.assertEqual(recipe1.image.name, recipe2.image.name)
+        self.assertTrue(default_storage.exists(recipe1.image.name))
+        self.assertEqual(
+            os.listdir(os.path.join(MEDIA_ROOT, 'upload/recipe')),
+            [recipe1.image.name.split('/')[2]]
+        )
+        mock_schedule.assert_called_with(recipe1.image.name)
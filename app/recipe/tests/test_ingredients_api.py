@@ -43,7 +43,7 @@ class PrivateIngredientsApiTests(TestCase):
         ingredients = Ingredients.objects.all().order_by('-name')
         serializer = IngredientSerializers(ingredients, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_for_ingredients_limited_to_user(self):
         """ Test that only ingredients authenticated to users are returned """
@@ -59,8 +59,8 @@ class PrivateIngredientsApiTests(TestCase):
         res = self.client.get(INGREDIENTS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], ingredients.name)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], ingredients.name)
 
     def test_ingredients_success(self):
         """ test to create a new ingredient """
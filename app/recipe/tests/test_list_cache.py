@@ -0,0 +1,141 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Recipe
+
+from recipe.cache import get_generation, get_list_cache
+
+
+TAGS_URL = reverse('recipe:tag-list')
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+class ListCacheTests(TransactionTestCase):
+    """ Test caching the list responses per user, invalidated once the
+    changes commit
+    """
+
+    def setUp(self):
+        get_list_cache().clear()
+        self.user = get_user_model().objects.create_user(
+            'cache@test.com',
+            'test@123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_served_from_cache(self):
+        """ Test an unchanged list is served without querying """
+        Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(TAGS_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'][0]['name'], 'Vegan')
+
+    def test_list_invalidated_on_change(self):
+        """ Test saving and deleting a tag invalidates the cached list """
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(TAGS_URL)
+
+        Tag.objects.create(user=self.user, name='Dessert')
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(len(res.data['results']), 2)
+
+        tag.delete()
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_list_invalidated_after_commit(self):
+        """ Test a list read before a change commits is not cached under
+        the new generation
+        """
+        generation = get_generation(self.user.id)
+
+        with transaction.atomic():
+            Tag.objects.create(user=self.user, name='Vegan')
+            self.assertEqual(get_generation(self.user.id), generation)
+
+        self.assertNotEqual(get_generation(self.user.id), generation)
+
+    def test_list_not_shared_between_users(self):
+        """ Test a user is never served another user's cached list """
+        Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(TAGS_URL)
+        user2 = get_user_model().objects.create_user(
+            'cache2@test.com',
+            'test@123'
+        )
+        self.client.force_authenticate(user2)
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.data['results'], [])
+
+    def test_recipe_list_invalidated_on_link_change(self):
+        """ Test changing a recipe's tags invalidates the recipe lists """
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title='puttu',
+            time_minutes=5,
+            price=5.00
+        )
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(RECIPE_URL)
+        self.client.get(RECIPE_URL, {'tag': tag.id})
+
+        recipe.tag.add(tag)
+
+        res = self.client.get(RECIPE_URL)
+        self.assertEqual(res.data['results'][0]['tag'], [tag.id])
+        res = self.client.get(RECIPE_URL, {'tag': tag.id})
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_list_not_modified(self):
+        """ Test a matching If-None-Match returns 304 until data changes """
+        res = self.client.get(TAGS_URL)
+        etag = res['ETag']
+
+        with self.assertNumQueries(0):
+            res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+
+        Tag.objects.create(user=self.user, name='Vegan')
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_list_varies_on_accept(self):
+        """ Test JSON and MessagePack lists are told apart by caches """
+        res = self.client.get(TAGS_URL)
+        msgpack_res = self.client.get(
+            TAGS_URL, HTTP_ACCEPT='application/msgpack'
+        )
+
+        self.assertIn('Accept', res['Vary'])
+        self.assertIn('Accept', msgpack_res['Vary'])
+        self.assertNotEqual(res['ETag'], msgpack_res['ETag'])
+
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=res['ETag'])
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertIn('Accept', res['Vary'])
+
+    @override_settings(RECIPE_LIST_CACHE=None)
+    def test_list_cache_disabled(self):
+        """ Test lists are queried every time with the list cache off """
+        Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(TAGS_URL)
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'][0]['name'], 'Vegan')
+        self.assertNotIn('ETag', res)
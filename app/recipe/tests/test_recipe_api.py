@@ -1,9 +1,14 @@
 import tempfile
+import json
 import os
+import shutil
+import struct
+from unittest.mock import patch
 
 from PIL import Image
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
 from rest_framework import status
@@ -11,10 +16,12 @@ from rest_framework.test import APIClient
 
 from core.models import Recipe, Tag, Ingredients
 
+from recipe.images import process_image, variant_names
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
 
 
 RECIPE_URL = reverse('recipe:recipe-list')
+EXPORT_URL = reverse('recipe:recipe-export')
 
 
 def image_upload_url(recipe_id):
@@ -82,7 +89,7 @@ class PrivateRecipeApiTests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_recipe_limited_to_user(self):
         """ Test retrieving recipes for user"""
@@ -98,8 +105,8 @@ class PrivateRecipeApiTests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_view_recipe_detail(self):
         """ test viewing a recipe detail"""
@@ -203,7 +210,159 @@ class PrivateRecipeApiTests(TestCase):
         tags = recipe.tag.all()
         self.assertEqual(len(tags), 0)
 
+    def test_bulk_create_recipes(self):
+        """ Test creating several recipes with their links at once """
+        tag = sample_tag(user=self.user)
+        ingredient1 = sample_ingredients(user=self.user, name='rice')
+        ingredient2 = sample_ingredients(user=self.user, name='dal')
+        payload = [
+            {
+                'title': 'dosa',
+                'time_minutes': 30,
+                'price': '2.00',
+                'tag': [tag.id],
+                'ingredients': [ingredient1.id, ingredient2.id],
+            },
+            {
+                'title': 'rice',
+                'time_minutes': 20,
+                'price': '1.00',
+                'tag': [],
+                'ingredients': [ingredient1.id],
+            },
+        ]
+
+        res = self.client.post(RECIPE_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipes = Recipe.objects.filter(user=self.user).order_by('id')
+        serializer = RecipeSerializer(recipes, many=True)
+        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(recipes[0].ingredients.count(), 2)
+        self.assertEqual(list(recipes[1].tag.all()), [])
+
+    def test_bulk_create_recipes_unknown_tag(self):
+        """ Test an unknown tag id is reported on its item """
+        payload = [
+            {'title': 'dosa', 'time_minutes': 30, 'price': '2.00',
+             'tag': [], 'ingredients': []},
+            {'title': 'rice', 'time_minutes': 20, 'price': '1.00',
+             'tag': [999], 'ingredients': []},
+        ]
+
+        res = self.client.post(RECIPE_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('tag', res.data[1])
+        self.assertFalse(Recipe.objects.exists())
+
+    @override_settings(RECIPE_EXPORT_CHUNK_SIZE=2)
+    def test_export_recipes(self):
+        """ Test exporting recipes streams a JSON array of all of them """
+        for i in range(5):
+            recipe = sample_recipe(user=self.user, title=f'recipe {i}')
+            recipe.tag.add(sample_tag(user=self.user, name=f'tag {i}'))
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        data = json.loads(b''.join(res.streaming_content))
+        recipes = Recipe.objects.order_by('id')
+        serializer = RecipeSerializer(recipes, many=True)
+        self.assertEqual(data, json.loads(json.dumps(serializer.data)))
+
+    def test_export_recipes_ndjson(self):
+        """ Test exporting recipes as one JSON document per line """
+        sample_recipe(user=self.user, title='appam')
+        sample_recipe(user=self.user, title='dosa')
+
+        res = self.client.get(EXPORT_URL, {'ndjson': '1'})
+
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(res.streaming_content).decode().splitlines()
+        titles = [json.loads(line)['title'] for line in lines]
+        self.assertEqual(titles, ['appam', 'dosa'])
+
+    def test_export_empty(self):
+        """ Test exporting with no recipes returns an empty array """
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(json.loads(b''.join(res.streaming_content)), [])
+
+    def test_filter_recipes_matching_several_tags_once(self):
+        """ Test a recipe matching several tags is returned once """
+        recipe = sample_recipe(user=self.user)
+        tag1 = sample_tag(user=self.user, name='vegan')
+        tag2 = sample_tag(user=self.user, name='dessert')
+        recipe.tag.add(tag1, tag2)
+
+        res = self.client.get(RECIPE_URL, {'tag': f'{tag1.id},{tag2.id}'})
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_filter_recipes_matching_all_tags(self):
+        """ Test tag_mode=all only returns recipes having every tag """
+        tag1 = sample_tag(user=self.user, name='vegan')
+        tag2 = sample_tag(user=self.user, name='dessert')
+        recipe1 = sample_recipe(user=self.user, title='fruit salad')
+        recipe1.tag.add(tag1, tag2)
+        recipe2 = sample_recipe(user=self.user, title='hummus')
+        recipe2.tag.add(tag1)
+
+        res = self.client.get(
+            RECIPE_URL,
+            {'tag': f'{tag1.id},{tag2.id}', 'tag_mode': 'all'}
+        )
+
+        ids = [recipe['id'] for recipe in res.data['results']]
+        self.assertEqual(ids, [recipe1.id])
+
+    def test_filter_recipes_matching_all_ingredients(self):
+        """ Test ingredients_mode=all ignores repeated ids """
+        ingredient1 = sample_ingredients(user=self.user, name='rice')
+        ingredient2 = sample_ingredients(user=self.user, name='dal')
+        recipe1 = sample_recipe(user=self.user, title='dosa')
+        recipe1.ingredients.add(ingredient1, ingredient2)
+        recipe2 = sample_recipe(user=self.user, title='rice')
+        recipe2.ingredients.add(ingredient1)
+
+        res = self.client.get(RECIPE_URL, {
+            'ingredients': f'{ingredient1.id},{ingredient2.id},'
+                           f'{ingredient2.id}',
+            'ingredients_mode': 'all',
+        })
 
+        ids = [recipe['id'] for recipe in res.data['results']]
+        self.assertEqual(ids, [recipe1.id])
+
+    def test_filter_recipes_invalid_ids(self):
+        """ Test non integer ids are rejected with a bad request """
+        res = self.client.get(RECIPE_URL, {'tag': '1,abc'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('tag', res.data)
+
+    def test_filter_recipes_invalid_mode(self):
+        """ Test an unknown match mode is rejected with a bad request """
+        res = self.client.get(RECIPE_URL, {'tag': '1', 'tag_mode': 'some'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('tag_mode', res.data)
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def orientation_exif(orientation):
+    """ Return raw EXIF data holding only an orientation tag """
+    entry = struct.pack('<HHIHH', 0x0112, 3, 1, orientation, 0)
+    return b'Exif\x00\x00II*\x00' + struct.pack('<IH', 8, 1) + entry + \
+        struct.pack('<I', 0)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
 class RecipeImageUploadTests(TestCase):
 
     def setUp(self):
@@ -216,9 +375,25 @@ class RecipeImageUploadTests(TestCase):
         self.recipe = sample_recipe(user=self.user)
 
     def tearDown(self):
-        self.recipe.image.delete()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
 
-    def test_upload_image_to_recipe(self):
+    def upload_sample_image(self, size=(10, 10), exif=None):
+        """ Upload a JPEG image to the sample recipe """
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            img = Image.new('RGB', size)
+            if exif is None:
+                img.save(ntf, format='JPEG')
+            else:
+                img.save(ntf, format='JPEG', exif=exif)
+            ntf.seek(0)
+            res = self.client.post(url, {'image': ntf}, format='multipart')
+
+        self.recipe.refresh_from_db()
+        return res
+
+    @patch('recipe.views.schedule_processing')
+    def test_upload_image_to_recipe(self, mock_schedule):
         """ Test Uploading an image to recipe """
         url = image_upload_url(self.recipe.id)
         with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
@@ -232,6 +407,74 @@ class RecipeImageUploadTests(TestCase):
         self.assertIn('image', res.data)
         self.assertTrue(os.path.exists(self.recipe.image.path))
 
+    @patch('recipe.views.schedule_processing')
+    def test_upload_image_schedules_processing(self, mock_schedule):
+        """ Test uploading an image queues the variants generation """
+        self.upload_sample_image()
+
+        mock_schedule.assert_called_once_with(self.recipe.image.name)
+
+    @patch('recipe.views.schedule_processing')
+    def test_process_image_variants(self, mock_schedule):
+        """ Test processing writes resized variants without EXIF """
+        exif = Image.Exif() if hasattr(Image, 'Exif') else None
+        if exif is not None:
+            exif[0x010f] = 'camera maker'
+        self.upload_sample_image(size=(1000, 500), exif=exif)
+
+        timings = process_image(self.recipe.image.name)
+
+        self.assertIn('decode', timings)
+        for variant, name in variant_names(self.recipe.image.name).items():
+            self.assertIn(variant, timings)
+            with Image.open(os.path.join(MEDIA_ROOT, name)) as img:
+                size = settings.RECIPE_IMAGE_VARIANTS[variant]
+                self.assertLessEqual(max(img.size), size)
+                self.assertNotIn('exif', img.info)
+
+        res = self.client.get(detail_url(self.recipe.id))
+        self.assertEqual(
+            set(res.data['image_variants']),
+            set(settings.RECIPE_IMAGE_VARIANTS)
+        )
+
+    @patch('recipe.views.schedule_processing')
+    def test_process_image_orientation(self, mock_schedule):
+        """ Test variants of a photo taken sideways are turned upright """
+        self.upload_sample_image(size=(1000, 500), exif=orientation_exif(6))
+
+        process_image(self.recipe.image.name)
+
+        name = variant_names(self.recipe.image.name)['thumbnail']
+        with Image.open(os.path.join(MEDIA_ROOT, name)) as img:
+            self.assertEqual(img.size, (100, 200))
+
+    @override_settings(RECIPE_IMAGE_MAX_BYTES=1000)
+    def test_upload_image_too_large(self):
+        """ Test an image over the byte limit is rejected """
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.png') as ntf:
+            img = Image.frombytes('L', (100, 100), os.urandom(100 * 100))
+            img.save(ntf, format='PNG')
+            ntf.seek(0)
+            res = self.client.post(url, {'image': ntf}, format='multipart')
+
+        self.assertEqual(
+            res.status_code,
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+
+    @override_settings(RECIPE_IMAGE_MAX_DIMENSIONS=(50, 50))
+    def test_upload_image_too_many_pixels(self):
+        """ Test an image over the dimension limits is rejected """
+        res = self.upload_sample_image(size=(60, 10))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('image', res.data)
+        self.assertFalse(self.recipe.image)
+
     def test_upload_image_bad_request(self):
         """ test uploading an invalid image """
         url = image_upload_url(self.recipe.id)
@@ -261,9 +504,9 @@ class RecipeImageUploadTests(TestCase):
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
 
     def test_filter_recipes_by_ingredients(self):
         """ Test returning recipes with specific ingredients """
@@ -286,6 +529,6 @@ class RecipeImageUploadTests(TestCase):
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
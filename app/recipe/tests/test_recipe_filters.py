@@ -0,0 +1,145 @@
+import base64
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+from recipe.cache import get_list_cache
+from recipe.filters import RECIPE_FILTERS, RECIPE_ORDERINGS, index_ordering
+
+
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+def sample_recipe(user, **params):
+    defaults = {'title': 'sample recipe', 'time_minutes': 10, 'price': 5.00}
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class RecipeFilterTests(TestCase):
+    """ Test filtering and sorting recipes on their columns """
+
+    def setUp(self):
+        get_list_cache().clear()
+        self.user = get_user_model().objects.create_user(
+            'filters@test.com',
+            'test@123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.soup = sample_recipe(
+            self.user, title='Soup', time_minutes=20, price=4.00
+        )
+        self.salad = sample_recipe(
+            self.user, title='salad', time_minutes=10, price=8.50
+        )
+        self.stew = sample_recipe(
+            self.user, title='Stew', time_minutes=90, price=12.00
+        )
+
+    def ids(self, **params):
+        res = self.client.get(RECIPE_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [recipe['id'] for recipe in res.data['results']]
+
+    def assertRejected(self, **params):
+        res = self.client.get(RECIPE_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        return res
+
+    def test_filter_ranges(self):
+        """ Test the comparison and range lookups on time and price """
+        self.assertEqual(
+            self.ids(time_minutes__lte=30), [self.soup.id, self.salad.id]
+        )
+        self.assertEqual(self.ids(time_minutes=90), [self.stew.id])
+        self.assertEqual(
+            self.ids(time_minutes__lt=30, price__lt='5'), [self.soup.id]
+        )
+        self.assertEqual(
+            self.ids(price__range='5,12'), [self.salad.id, self.stew.id]
+        )
+
+    def test_filter_bounds_past_column(self):
+        """ Test comparisons accept bounds no value of the column reaches,
+        exact matches being validated against the column
+        """
+        self.assertEqual(len(self.ids(price__lte='100000')), 3)
+        self.assertEqual(self.ids(price__gt='1e400'), [])
+        self.assertEqual(len(self.ids(price__range='0.001,1e30')), 3)
+        self.assertRejected(price='100000')
+
+    def test_filter_title_prefix(self):
+        """ Test title__startswith matches a case sensitive prefix """
+        self.assertEqual(self.ids(title__startswith='S'),
+                         [self.soup.id, self.stew.id])
+        self.assertEqual(self.ids(title__startswith='sa'), [self.salad.id])
+        self.assertEqual(len(self.ids(title__startswith='')), 3)
+
+    def test_ordering(self):
+        """ Test sorting on one column in either direction """
+        self.assertEqual(
+            self.ids(ordering='price'),
+            [self.soup.id, self.salad.id, self.stew.id]
+        )
+        self.assertEqual(
+            self.ids(ordering='-time_minutes'),
+            [self.stew.id, self.soup.id, self.salad.id]
+        )
+
+    def test_ordering_paginated(self):
+        """ Test the pages follow the requested order, ties by id """
+        tie = sample_recipe(self.user, title='Tie', price=8.50)
+        seen = []
+        url = RECIPE_URL + '?ordering=-price&page_size=1'
+        while url:
+            res = self.client.get(url)
+            seen.extend(recipe['id'] for recipe in res.data['results'])
+            url = res.data['next']
+
+        self.assertEqual(
+            seen, [self.stew.id, tie.id, self.salad.id, self.soup.id]
+        )
+
+    def test_reject_unindexed_requests(self):
+        """ Test sorts and filters without an index are rejected """
+        self.assertRejected(ordering='price,-time_minutes')
+        self.assertRejected(ordering='link')
+        self.assertRejected(link__startswith='http')
+        self.assertRejected(title__contains='o')
+        self.assertRejected(ordering='price', q='soup')
+
+    def test_reject_invalid_values(self):
+        """ Test values are validated against the column types """
+        res = self.assertRejected(time_minutes__lte='soon')
+        self.assertIn('time_minutes__lte', res.data)
+        self.assertRejected(price__range='5')
+        self.assertRejected(time_minutes='99999999999999999999')
+        self.assertRejected(price__lt='NaN')
+        self.assertRejected(price__gt='-Infinity')
+
+    def test_reject_invalid_cursor_values(self):
+        """ Test cursor values are validated against the sorted columns """
+        for ordering, position in (('price', ['zz', 1]),
+                                   ('-time_minutes', [2 ** 70, 1]),
+                                   ('id', [[1]])):
+            payload = json.dumps({'p': position, 'r': 0}).encode()
+            res = self.client.get(RECIPE_URL, {
+                'ordering': ordering,
+                'cursor': base64.urlsafe_b64encode(payload).decode(),
+            })
+
+            self.assertEqual(
+                res.status_code, status.HTTP_404_NOT_FOUND, ordering
+            )
+
+    def test_whitelist_is_indexed(self):
+        """ Test every filtered and sorted column has its own index """
+        for column in set(RECIPE_ORDERINGS) | set(RECIPE_FILTERS):
+            self.assertEqual(index_ordering(Recipe, column)[-1], 'id')
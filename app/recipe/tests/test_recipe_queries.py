@@ -0,0 +1,86 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredients
+
+
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    """ return recipe detail url """
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+@override_settings(RECIPE_LIST_CACHE=None)
+class RecipeQueryCountTests(TestCase):
+    """ Test that the recipe endpoints run a fixed number of queries """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'queries@test.com',
+            'test@123'
+        )
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='vegan')
+        self.ingredient = Ingredients.objects.create(
+            user=self.user,
+            name='salt'
+        )
+
+    def create_recipes(self, count):
+        """ Create recipes linked to a tag and an ingredient """
+        recipes = []
+        for i in range(count):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'recipe {i}',
+                time_minutes=10,
+                price=5.00
+            )
+            recipe.tag.add(self.tag)
+            recipe.ingredients.add(self.ingredient)
+            recipes.append(recipe)
+
+        return recipes
+
+    def assertConstantQueries(self, num, url, params=None):
+        """ Assert url runs num queries regardless of the result size """
+        for count in (1, 10):
+            self.create_recipes(count)
+            with self.assertNumQueries(num):
+                res = self.client.get(url, params)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_list_query_count(self):
+        """ Test listing recipes does not query per recipe """
+        self.assertConstantQueries(3, RECIPE_URL)
+
+    def test_list_filtered_by_tag_query_count(self):
+        """ Test filtering recipes by tag does not query per recipe """
+        self.assertConstantQueries(3, RECIPE_URL, {'tag': self.tag.id})
+
+    def test_list_filtered_by_ingredients_query_count(self):
+        """ Test filtering by ingredients does not query per recipe """
+        self.assertConstantQueries(
+            3,
+            RECIPE_URL,
+            {'ingredients': self.ingredient.id}
+        )
+
+    def test_retrieve_query_count(self):
+        """ Test the recipe detail prefetches its tags and ingredients """
+        recipe = self.create_recipes(1)[0]
+        for i in range(5):
+            recipe.tag.add(Tag.objects.create(user=self.user, name=f'tag {i}'))
+
+        with self.assertNumQueries(3):
+            res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['tag']), 6)
@@ -0,0 +1,188 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.sql import emit_post_migrate_signal
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredients
+from core.search import get_search_backend
+from recipe.cache import get_list_cache
+
+
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+def sample_recipe(user, title, tags=(), ingredients=()):
+    recipe = Recipe.objects.create(
+        user=user, title=title, time_minutes=10, price=5.00
+    )
+    recipe.tag.add(*tags)
+    recipe.ingredients.add(*ingredients)
+    return recipe
+
+
+class RecipeSearchTests(TestCase):
+    """ Test searching recipes with ?q= """
+
+    def setUp(self):
+        get_list_cache().clear()
+        self.user = get_user_model().objects.create_user(
+            'search@test.com',
+            'test@123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.spicy = Tag.objects.create(user=self.user, name='Spicy')
+        self.rice = Ingredients.objects.create(user=self.user, name='Rice')
+
+    def search(self, query, **params):
+        res = self.client.get(RECIPE_URL, {'q': query, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [recipe['id'] for recipe in res.data['results']]
+
+    def test_search_title_tags_and_ingredients(self):
+        """ Test the title, tag and ingredient names are searched """
+        curry = sample_recipe(self.user, 'Chicken curry')
+        tagged = sample_recipe(self.user, 'Vindaloo', tags=[self.spicy])
+        biryani = sample_recipe(self.user, 'Biryani', ingredients=[self.rice])
+        sample_recipe(self.user, 'Pancakes')
+
+        self.assertEqual(self.search('curry'), [curry.id])
+        self.assertEqual(self.search('spicy'), [tagged.id])
+        self.assertEqual(self.search('rice'), [biryani.id])
+
+    def test_search_every_word(self):
+        """ Test every word of the query has to match """
+        recipe = sample_recipe(self.user, 'Chicken curry', tags=[self.spicy])
+        sample_recipe(self.user, 'Chicken soup')
+
+        self.assertEqual(self.search('spicy chicken'), [recipe.id])
+
+    def test_search_stems_words(self):
+        """ Test words are matched on their stem """
+        recipe = sample_recipe(self.user, 'Roasted potatoes')
+
+        self.assertEqual(self.search('roasting potato'), [recipe.id])
+
+    def test_search_ranks_title_first(self):
+        """ Test title matches rank above tag matches """
+        tag = Tag.objects.create(user=self.user, name='Rice dishes')
+        by_tag = sample_recipe(self.user, 'Paella', tags=[tag])
+        by_title = sample_recipe(self.user, 'Rice pudding')
+
+        self.assertEqual(self.search('rice'), [by_title.id, by_tag.id])
+
+    def test_search_own_recipes(self):
+        """ Test other users' recipes are never found """
+        other = get_user_model().objects.create_user(
+            'other@test.com',
+            'test@123'
+        )
+        sample_recipe(other, 'Chicken curry')
+
+        self.assertEqual(self.search('curry'), [])
+
+    def test_search_ignores_query_syntax(self):
+        """ Test operators and quotes in the query are not interpreted """
+        recipe = sample_recipe(self.user, 'Chicken curry')
+
+        self.assertEqual(self.search('"curry" OR NEAR(*'), [])
+        self.assertEqual(self.search('curry*'), [recipe.id])
+        self.assertEqual(self.search('*'), [])
+
+    def test_search_paginated_by_rank(self):
+        """ Test the pages of search results follow the ranking """
+        recipes = [
+            sample_recipe(self.user, 'curry ' * count + 'dish')
+            for count in (1, 3, 2)
+        ]
+
+        res = self.client.get(RECIPE_URL, {'q': 'curry', 'page_size': 2})
+        res_next = self.client.get(res.data['next'])
+
+        ids = [recipe['id'] for recipe in res.data['results']] + \
+            [recipe['id'] for recipe in res_next.data['results']]
+        self.assertEqual(
+            ids, [recipes[1].id, recipes[2].id, recipes[0].id]
+        )
+        self.assertIsNone(res_next.data['next'])
+
+    @override_settings(RECIPE_LIST_CACHE=None)
+    def test_index_follows_changes(self):
+        """ Test renamed titles and tags and changed links are searched """
+        tag = Tag.objects.create(user=self.user, name='Mild')
+        recipe = sample_recipe(self.user, 'Chicken curry', tags=[tag])
+
+        recipe.title = 'Lamb korma'
+        recipe.save()
+        self.assertEqual(self.search('curry'), [])
+        self.assertEqual(self.search('korma'), [recipe.id])
+
+        tag.name = 'Hot'
+        tag.save()
+        self.assertEqual(self.search('hot'), [recipe.id])
+
+        recipe.tag.remove(tag)
+        self.assertEqual(self.search('hot'), [])
+
+        self.spicy.recipe_set.add(recipe)
+        self.assertEqual(self.search('spicy'), [recipe.id])
+
+        self.spicy.delete()
+        self.assertEqual(self.search('spicy'), [])
+
+    def test_bulk_created_recipes_indexed(self):
+        """ Test recipes created from a list payload are searchable """
+        payload = [
+            {'title': 'Fried rice', 'time_minutes': 10, 'price': '5.00',
+             'tag': [self.spicy.id], 'ingredients': []},
+            {'title': 'Soup', 'time_minutes': 10, 'price': '5.00',
+             'tag': [], 'ingredients': [self.rice.id]},
+        ]
+        res = self.client.post(RECIPE_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(self.search('rice')), 2)
+        self.assertEqual(self.search('spicy'), [res.data[0]['id']])
+
+    @override_settings(RECIPE_SEARCH_BACKEND='icontains')
+    def test_search_icontains(self):
+        """ Test the substring search used without a full-text index """
+        recipe = sample_recipe(self.user, 'Chicken curry', tags=[self.spicy])
+        sample_recipe(self.user, 'Pancakes')
+
+        self.assertEqual(self.search('urr'), [recipe.id])
+        self.assertEqual(self.search('spic'), [recipe.id])
+
+    def test_rebuild_search_index(self):
+        """ Test rebuilding the index keeps every recipe searchable """
+        recipe = sample_recipe(self.user, 'Chicken curry', tags=[self.spicy])
+
+        call_command('rebuild_search_index', stdout=StringIO())
+
+        self.assertEqual(self.search('spicy curry'), [recipe.id])
+
+    def test_orphan_documents_pruned(self):
+        """ Test the documents of recipes deleted without signals, as by
+        flush, are deleted after it
+        """
+        backend = get_search_backend()
+        if not hasattr(backend, 'table'):
+            self.skipTest('no full-text index')
+        recipe = sample_recipe(self.user, 'Chicken curry')
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'DELETE FROM core_recipe WHERE id = %s', [recipe.id]
+            )
+
+        emit_post_migrate_signal(0, False, connection.alias)
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM {backend.table}')
+            self.assertEqual(cursor.fetchone()[0], 0)
@@ -0,0 +1,126 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredients
+from recipe.cache import get_list_cache
+
+
+RECIPE_URL = reverse('recipe:recipe-list')
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class SparseFieldsTests(TestCase):
+    """ Test narrowing the recipe responses with ?fields= and ?expand= """
+
+    def setUp(self):
+        get_list_cache().clear()
+        self.user = get_user_model().objects.create_user(
+            'sparse@test.com',
+            'test@123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.ingredient = Ingredients.objects.create(
+            user=self.user, name='Rice'
+        )
+        self.recipes = []
+        for price in (7, 5):
+            recipe = Recipe.objects.create(
+                user=self.user, title=f'Dal {price}', time_minutes=10,
+                price=price
+            )
+            recipe.tag.add(self.tag)
+            recipe.ingredients.add(self.ingredient)
+            self.recipes.append(recipe)
+
+    def test_list_fields(self):
+        """ Test only the listed fields are loaded and returned """
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(RECIPE_URL, {'fields': 'id,title'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [set(recipe) for recipe in res.data['results']],
+            [{'id', 'title'}] * 2
+        )
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('price', queries[0]['sql'])
+
+    def test_list_fields_keep_ordering_columns(self):
+        """ Test the pagination reads the ordering column it needs """
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPE_URL, {
+                'fields': 'title', 'ordering': 'price', 'page_size': 1
+            })
+
+        self.assertEqual(res.data['results'], [{'title': 'Dal 5'}])
+        res = self.client.get(res.data['next'])
+        self.assertEqual(res.data['results'], [{'title': 'Dal 7'}])
+
+    def test_list_expand(self):
+        """ Test expanded relations are nested objects """
+        res = self.client.get(RECIPE_URL, {'expand': 'tag'})
+
+        recipe = res.data['results'][0]
+        self.assertEqual(
+            recipe['tag'], [{'id': self.tag.id, 'name': 'Vegan'}]
+        )
+        self.assertEqual(recipe['ingredients'], [self.ingredient.id])
+
+    def test_detail_fields(self):
+        """ Test the detail only loads the relations it returns """
+        recipe = self.recipes[0]
+
+        with self.assertNumQueries(1):
+            res = self.client.get(
+                detail_url(recipe.id), {'fields': 'title,image_variants'}
+            )
+
+        self.assertEqual(
+            res.data, {'title': recipe.title, 'image_variants': {}}
+        )
+
+    def test_export_fields(self):
+        """ Test the export is narrowed too """
+        res = self.client.get(EXPORT_URL, {'fields': 'id'})
+
+        content = b''.join(res.streaming_content)
+        self.assertEqual(
+            json.loads(content),
+            [{'id': recipe.id} for recipe in self.recipes]
+        )
+
+    def test_invalid_names(self):
+        """ Test unknown fields and relations are rejected """
+        res = self.client.get(RECIPE_URL, {'fields': 'id,user'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('fields', res.data)
+
+        res = self.client.get(RECIPE_URL, {'expand': 'title'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('expand', res.data)
+
+    def test_writes_return_every_field(self):
+        """ Test ?fields= does not narrow the response of an update """
+        recipe = self.recipes[0]
+
+        res = self.client.patch(
+            detail_url(recipe.id) + '?fields=title', {'time_minutes': 25}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['time_minutes'], 25)
+        self.assertEqual(res.data['tag'], [self.tag.id])
@@ -0,0 +1,166 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, RecipeStats, Tag, TagStats, Ingredients
+from recipe.cache import get_list_cache
+
+
+RECIPE_URL = reverse('recipe:recipe-list')
+STATS_URL = reverse('recipe:recipe-stats')
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredients-list')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def sample_recipe(user, tags=(), ingredients=(), **params):
+    defaults = {'title': 'Sample', 'time_minutes': 10, 'price': 5.00}
+    defaults.update(params)
+    recipe = Recipe.objects.create(user=user, **defaults)
+    recipe.tag.add(*tags)
+    recipe.ingredients.add(*ingredients)
+    return recipe
+
+
+class RecipeStatsTests(TestCase):
+    """ Test the recipe statistics kept by the signals """
+
+    def setUp(self):
+        get_list_cache().clear()
+        self.user = get_user_model().objects.create_user(
+            'stats@test.com',
+            'test@123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+        self.spicy = Tag.objects.create(user=self.user, name='Spicy')
+        self.rice = Ingredients.objects.create(user=self.user, name='Rice')
+
+    def stats(self):
+        res = self.client.get(STATS_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def tag_counts(self, data):
+        return {tag['name']: tag['recipe_count'] for tag in data['tags']}
+
+    def test_stats_without_recipes(self):
+        """ Test the statistics of a user without recipes """
+        data = self.stats()
+
+        self.assertEqual(data['recipe_count'], 0)
+        self.assertIsNone(data['average_time_minutes'])
+        self.assertIsNone(data['average_price'])
+        self.assertEqual(data['tags'], [])
+        self.assertEqual(data['ingredients'], [])
+
+    def test_stats_of_created_recipes(self):
+        """ Test the totals and counts of recipes created one by one """
+        sample_recipe(self.user, tags=[self.vegan, self.spicy],
+                      ingredients=[self.rice], time_minutes=10, price=4.00)
+        sample_recipe(self.user, tags=[self.vegan], time_minutes=20,
+                      price=5.50)
+        other = get_user_model().objects.create_user('o@test.com', 'pass')
+        sample_recipe(other, time_minutes=100, price=90.00)
+
+        data = self.stats()
+
+        self.assertEqual(data['recipe_count'], 2)
+        self.assertEqual(data['average_time_minutes'], 15.0)
+        self.assertEqual(data['average_price'], '4.75')
+        self.assertEqual(self.tag_counts(data), {'Vegan': 2, 'Spicy': 1})
+        self.assertEqual(
+            [(item['name'], item['recipe_count'])
+             for item in data['ingredients']],
+            [('Rice', 1)]
+        )
+
+    def test_stats_follow_updates_and_deletes(self):
+        """ Test changed values, links and deleted recipes are counted """
+        recipe = sample_recipe(self.user, tags=[self.vegan],
+                               time_minutes=10, price=4.00)
+        kept = sample_recipe(self.user, tags=[self.vegan, self.spicy],
+                             time_minutes=30, price=8.00)
+
+        res = self.client.patch(detail_url(recipe.id), {
+            'time_minutes': 20,
+            'price': '6.00',
+            'tag': [self.spicy.id],
+        })
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        data = self.stats()
+        self.assertEqual(data['average_time_minutes'], 25.0)
+        self.assertEqual(data['average_price'], '7.00')
+        self.assertEqual(self.tag_counts(data), {'Vegan': 1, 'Spicy': 2})
+
+        self.client.delete(detail_url(recipe.id))
+        self.spicy.recipe_set.remove(kept)
+        data = self.stats()
+        self.assertEqual(data['recipe_count'], 1)
+        self.assertEqual(data['average_price'], '8.00')
+        self.assertEqual(self.tag_counts(data), {'Vegan': 1})
+
+    def test_stats_of_bulk_created_recipes(self):
+        """ Test recipes created from a list payload are counted once """
+        payload = [
+            {'title': 'Dal', 'time_minutes': 30, 'price': '3.00',
+             'tag': [self.vegan.id], 'ingredients': [self.rice.id]},
+            {'title': 'Curry', 'time_minutes': 40, 'price': '7.00',
+             'tag': [self.vegan.id, self.spicy.id], 'ingredients': []},
+        ]
+        res = self.client.post(RECIPE_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        data = self.stats()
+
+        self.assertEqual(data['recipe_count'], 2)
+        self.assertEqual(data['average_time_minutes'], 35.0)
+        self.assertEqual(self.tag_counts(data), {'Vegan': 2, 'Spicy': 1})
+
+    def test_stats_read_in_constant_queries(self):
+        """ Test the statistics do not scan the recipes """
+        for _ in range(5):
+            sample_recipe(self.user, tags=[self.vegan])
+        self.stats()
+
+        with self.assertNumQueries(3):
+            self.stats()
+
+    def test_list_with_counts(self):
+        """ Test ?with_counts=1 adds the recipe counts to the lists """
+        sample_recipe(self.user, tags=[self.vegan], ingredients=[self.rice])
+
+        res = self.client.get(TAGS_URL, {'with_counts': 1})
+        counts = {tag['name']: tag['recipe_count']
+                  for tag in res.data['results']}
+        self.assertEqual(counts, {'Vegan': 1, 'Spicy': 0})
+
+        res = self.client.get(INGREDIENTS_URL, {'with_counts': 1})
+        self.assertEqual(res.data['results'][0]['recipe_count'], 1)
+
+        res = self.client.get(TAGS_URL)
+        self.assertNotIn('recipe_count', res.data['results'][0])
+
+    def test_rebuild_recipe_stats(self):
+        """ Test the rebuild command corrects drifted counters """
+        sample_recipe(self.user, tags=[self.vegan], time_minutes=10)
+        RecipeStats.objects.filter(user=self.user).update(recipe_count=7)
+        TagStats.objects.all().delete()
+        out = StringIO()
+
+        call_command('rebuild_recipe_stats', stdout=out)
+
+        self.assertIn('2 counters corrected', out.getvalue())
+        data = self.stats()
+        self.assertEqual(data['recipe_count'], 1)
+        self.assertEqual(self.tag_counts(data), {'Vegan': 1})
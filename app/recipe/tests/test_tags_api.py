@@ -1,13 +1,18 @@
+import base64
+import json
+from unittest.mock import patch
+
 from django.contrib.auth import get_user_model
 from django.urls import reverse
-from django.test import TestCase
+from django.test import TestCase, override_settings
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
 from core.models import Tag
 
-from recipe.serializers import TagSerializer
+from recipe.serializers import RecipeAttrListSerializer, \
+    RecipeAttrSerializer, TagSerializer
 
 TAGS_URL = reverse('recipe:tag-list')
 
@@ -45,7 +50,7 @@ class PrivateTagsApiTests(TestCase):
         tags = Tag.objects.all().order_by('-name')
         serializer = TagSerializer(tags, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_tags_limited_to_user(self):
         """ test that tags returned are for the authenticated user """
@@ -59,8 +64,8 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.get(TAGS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], tag.name)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], tag.name)
 
     def test_create_tag_success(self):
         """ Test creating a new a tag"""
@@ -78,3 +83,190 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.post(TAGS_URL, payload)
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_tags_paginated_by_cursor(self):
+        """ Test walking the tag pages returns every tag once in order """
+        for name in ('Vegan', 'Curry', 'Cake', 'Dessert', 'Bread'):
+            Tag.objects.create(user=self.user, name=name)
+
+        res = self.client.get(TAGS_URL, {'page_size': 2})
+        first_page = res.data['results']
+        names = [tag['name'] for tag in first_page]
+        second_url = res.data['next']
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            names.extend(tag['name'] for tag in res.data['results'])
+
+        expected = Tag.objects.order_by('-name', 'id')
+        self.assertEqual(names, [tag.name for tag in expected])
+
+        res = self.client.get(second_url)
+        res = self.client.get(res.data['previous'])
+        self.assertEqual(res.data['results'], first_page)
+        self.assertIsNone(res.data['previous'])
+
+    def test_tags_invalid_cursor(self):
+        """ Test that a tampered cursor is rejected """
+        res = self.client.get(TAGS_URL, {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_tags_cursor_values_validated(self):
+        """ Test cursors holding values of the wrong type are rejected """
+        Tag.objects.create(user=self.user, name='Vegan')
+        for position in ([None, 'x'], ['Vegan', 'abc'], ['Vegan', {'a': 1}],
+                         ['Vegan', 2 ** 70], ['x' * 300, 1]):
+            payload = json.dumps({'p': position, 'r': 0}).encode()
+            cursor = base64.urlsafe_b64encode(payload).decode()
+
+            res = self.client.get(TAGS_URL, {'cursor': cursor})
+
+            self.assertEqual(
+                res.status_code, status.HTTP_404_NOT_FOUND, position
+            )
+
+    def test_bulk_create_tags(self):
+        """ Test creating several tags in one request """
+        payload = [{'name': 'Vegan'}, {'name': 'Dessert'}]
+        res = self.client.post(TAGS_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        names = [tag['name'] for tag in res.data]
+        self.assertEqual(names, ['Vegan', 'Dessert'])
+        tags = Tag.objects.filter(user=self.user).order_by('id')
+        ids = [tag['id'] for tag in res.data]
+        self.assertEqual([tag.id for tag in tags], ids)
+
+    def test_bulk_create_tags_invalid(self):
+        """ Test an invalid item fails the whole batch with its error """
+        payload = [{'name': 'Vegan'}, {'name': ''}]
+        res = self.client.post(TAGS_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('name', res.data[1])
+        self.assertFalse(Tag.objects.exists())
+
+    @override_settings(API_MAX_BULK_SIZE=1)
+    def test_bulk_create_tags_too_many(self):
+        """ Test a batch larger than the limit is rejected """
+        payload = [{'name': 'Vegan'}, {'name': 'Dessert'}]
+        res = self.client.post(TAGS_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Tag.objects.exists())
+
+    def test_create_tag_duplicate_name(self):
+        """ Test a name already used, ignoring case, is rejected """
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.post(TAGS_URL, {'name': 'vegan'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Tag.objects.count(), 1)
+
+    @patch.object(RecipeAttrSerializer, 'validate_name',
+                  lambda self, value: value)
+    def test_create_tag_name_taken_concurrently(self):
+        """ Test a name taken after the validation is rejected as well """
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.post(TAGS_URL, {'name': 'vegan'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('name', res.data)
+        self.assertEqual(Tag.objects.count(), 1)
+
+    @patch.object(RecipeAttrSerializer, 'validate_name',
+                  lambda self, value: value)
+    def test_bulk_create_tags_name_taken_concurrently(self):
+        """ Test a batch with a name taken after the validation is rejected
+        as a whole, the error pointing at the item using the name
+        """
+        Tag.objects.create(user=self.user, name='Vegan')
+        payload = [{'name': 'Cake'}, {'name': 'vegan'}]
+
+        res = self.client.post(TAGS_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('name', res.data[1])
+        self.assertEqual(Tag.objects.count(), 1)
+
+    def test_bulk_upsert_tags_name_taken_concurrently(self):
+        """ Test bulk upserting returns a tag created after the validation
+        """
+        load_existing = RecipeAttrListSerializer.load_existing
+        calls = []
+
+        def load_existing_after_create(serializer, names):
+            calls.append(names)
+            if len(calls) > 1:
+                return load_existing(serializer, names)
+            # a concurrent request creates the tag after the lookup
+            Tag.objects.create(user=self.user, name='Vegan')
+            return {}
+
+        payload = [{'name': 'Cake'}, {'name': 'vegan'}]
+        with patch.object(RecipeAttrListSerializer, 'load_existing',
+                          load_existing_after_create):
+            res = self.client.post(
+                f'{TAGS_URL}?upsert=1', payload, format='json'
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data[1]['name'], 'Vegan')
+        self.assertEqual(Tag.objects.count(), 2)
+
+    def test_upsert_existing_tag(self):
+        """ Test upserting a used name returns the existing tag """
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.post(f'{TAGS_URL}?upsert=1', {'name': 'VEGAN'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {'id': tag.id, 'name': 'Vegan'})
+        self.assertEqual(Tag.objects.count(), 1)
+
+    def test_upsert_new_tag(self):
+        """ Test upserting a new name creates the tag """
+        res = self.client.post(f'{TAGS_URL}?upsert=1', {'name': 'Vegan'})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(Tag.objects.filter(name='Vegan').exists())
+
+    def test_bulk_upsert_tags(self):
+        """ Test bulk upserting reuses existing and repeated names """
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        payload = [{'name': 'vegan'}, {'name': 'Cake'}, {'name': 'cake'}]
+
+        res = self.client.post(f'{TAGS_URL}?upsert=1', payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data[0], {'id': tag.id, 'name': 'Vegan'})
+        self.assertEqual(res.data[1], res.data[2])
+        self.assertEqual(Tag.objects.count(), 2)
+
+    def test_bulk_upsert_tags_stripped_names(self):
+        """ Test bulk upserting matches names as saved, stripped """
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        payload = [{'name': ' vegan '}]
+
+        res = self.client.post(f'{TAGS_URL}?upsert=1', payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data, [{'id': tag.id, 'name': 'Vegan'}])
+        self.assertEqual(Tag.objects.count(), 1)
+
+    def test_bulk_create_tags_duplicate_names(self):
+        """ Test a batch repeating a name is rejected, the error pointing at
+        the repeated item
+        """
+        payload = [{'name': 'Cake'}, {'name': 'Vegan'}, {'name': ' cake'}]
+
+        res = self.client.post(TAGS_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[:2], [{}, {}])
+        self.assertIn('name', res.data[2])
+        self.assertFalse(Tag.objects.exists())
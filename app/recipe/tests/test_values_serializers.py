@@ -0,0 +1,106 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredients
+from recipe.cache import get_list_cache
+from recipe.serializers import RecipeSerializer, RecipeValuesSerializer, \
+    TagSerializer, TagValuesSerializer
+
+
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+class ValuesSerializerTests(TestCase):
+    """ Test the values() serializers match the model serializers """
+
+    def setUp(self):
+        get_list_cache().clear()
+        self.user = get_user_model().objects.create_user(
+            'values@test.com',
+            'test@123'
+        )
+        self.tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ('vegan', 'spicy', 'quick')
+        ]
+        salt = Ingredients.objects.create(user=self.user, name='salt')
+        self.recipes = []
+        for price, tags in ((5, self.tags[::-1]), (12.5, [])):
+            recipe = Recipe.objects.create(
+                user=self.user, title='Dal', time_minutes=10, price=price,
+                link='https://example.com'
+            )
+            recipe.tag.add(*tags)
+            recipe.ingredients.add(salt)
+            self.recipes.append(recipe)
+
+    def rows(self, model, serializer_class, fields=None):
+        columns = serializer_class.get_columns(fields)[0]
+        return list(model.objects.order_by('id').values(*columns))
+
+    def test_recipe_values_match(self):
+        """ Test the recipe rows serialize like the recipe instances """
+        expected = RecipeSerializer(
+            Recipe.objects.order_by('id'), many=True
+        ).data
+        rows = self.rows(Recipe, RecipeValuesSerializer)
+
+        with self.assertNumQueries(2):
+            data = RecipeValuesSerializer(rows, many=True).data
+
+        self.assertEqual(data, expected)
+
+    def test_recipe_values_sparse_fields(self):
+        """ Test the related ids are only loaded when listed """
+        fields = ['title', 'price']
+        rows = self.rows(Recipe, RecipeValuesSerializer, fields)
+
+        with self.assertNumQueries(0):
+            data = RecipeValuesSerializer(
+                rows, many=True, context={'fields': fields}
+            ).data
+
+        self.assertEqual(data, [
+            {'title': 'Dal', 'price': '5.00'},
+            {'title': 'Dal', 'price': '12.50'},
+        ])
+
+    def test_tag_values_match(self):
+        """ Test the tag rows serialize like the tag instances """
+        self.assertEqual(
+            TagValuesSerializer(
+                self.rows(Tag, TagValuesSerializer), many=True
+            ).data,
+            TagSerializer(Tag.objects.order_by('id'), many=True).data
+        )
+
+    def test_list_uses_values(self):
+        """ Test the recipe list serializes rows with sorted related ids """
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        res = client.get(RECIPE_URL, {'fields': 'id,tag'})
+
+        self.assertEqual(res.data['results'], [
+            {'id': self.recipes[0].id, 'tag': sorted(
+                tag.id for tag in self.tags
+            )},
+            {'id': self.recipes[1].id, 'tag': []},
+        ])
+
+    def test_benchmark_serializers(self):
+        """ Test the microbenchmark compares both serializers """
+        out = StringIO()
+
+        call_command(
+            'benchmark_serializers', '--rows=20', '--repeat=1', stdout=out
+        )
+
+        self.assertIn('same output: yes', out.getvalue())
+        self.assertEqual(Recipe.objects.count(), 2)
@@ -0,0 +1,91 @@
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadhandler import StopUpload, \
+    TemporaryFileUploadHandler
+from django.utils.translation import gettext as _
+from PIL import Image
+from rest_framework import status
+
+
+class RecipeImageUploadHandler(TemporaryFileUploadHandler):
+    """ Stream an image upload to disk, aborting as soon as it is too big
+
+    The byte size is checked against the request's Content-Length before
+    anything is read and again as chunks arrive. The pixel dimensions are
+    read from the image header in the first chunks, without decoding.
+    """
+    # multipart boundaries and headers around the file itself
+    multipart_overhead = 64 * 2 ** 10
+    max_header_size = 256 * 2 ** 10
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.error = None
+        self.error_status = None
+        self.received = 0
+        self.header = b''
+        self.header_parsed = False
+
+    def abort(self, message, error_status):
+        """ Record why the upload is refused and stop reading it """
+        self.error = message
+        self.error_status = error_status
+        raise StopUpload(connection_reset=True)
+
+    def abort_too_large(self):
+        msg = _('Ensure the image is at most %d bytes.')
+        self.abort(
+            msg % settings.RECIPE_IMAGE_MAX_BYTES,
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
+
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        limit = settings.RECIPE_IMAGE_MAX_BYTES + self.multipart_overhead
+        if content_length > limit:
+            self.error_status = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+
+        return super().handle_raw_input(
+            input_data, META, content_length, boundary, encoding
+        )
+
+    def new_file(self, *args, **kwargs):
+        if self.error_status is not None:
+            self.abort_too_large()
+        self.received = 0
+        self.header = b''
+        self.header_parsed = False
+
+        return super().new_file(*args, **kwargs)
+
+    def check_dimensions(self, raw_data):
+        """ Refuse the image once its header shows it is too wide or tall """
+        self.header += raw_data
+        try:
+            width, height = Image.open(BytesIO(self.header)).size
+        except Exception:
+            # the header is not complete yet, or this is not an image, in
+            # which case the image field validation reports it
+            self.header_parsed = len(self.header) >= self.max_header_size
+            return
+
+        self.header_parsed = True
+        self.header = b''
+        max_width, max_height = settings.RECIPE_IMAGE_MAX_DIMENSIONS
+        if width > max_width or height > max_height:
+            msg = _('Ensure the image is at most %(width)d x %(height)d '
+                    'pixels.')
+            self.abort(
+                msg % {'width': max_width, 'height': max_height},
+                status.HTTP_400_BAD_REQUEST
+            )
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.RECIPE_IMAGE_MAX_BYTES:
+            self.abort_too_large()
+        if not self.header_parsed:
+            self.check_dimensions(raw_data)
+
+        return super().receive_data_chunk(raw_data, start)
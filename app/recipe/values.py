@@ -0,0 +1,59 @@
+from collections import defaultdict
+
+from django.db import connections
+from django.db.models import IntegerField, OuterRef, Subquery
+
+
+def related_ids_key(field_name):
+    """ Return the row key holding the related ids of an M2M field """
+    return f'{field_name}_ids'
+
+
+def _links(model, field_name):
+    """ Return the through model of an M2M field and its two columns """
+    field = model._meta.get_field(field_name)
+    return (
+        field.remote_field.through,
+        f'{field.m2m_field_name()}_id',
+        f'{field.m2m_reverse_field_name()}_id',
+    )
+
+
+def related_ids(model, field_name, ids):
+    """ Return {id: sorted related ids} of the M2M field_name of model """
+    through, source, column = _links(model, field_name)
+    grouped = defaultdict(list)
+    for source_id, related_id in through.objects \
+            .filter(**{f'{source}__in': ids}) \
+            .order_by(source, column) \
+            .values_list(source, column):
+        grouped[source_id].append(related_id)
+
+    return grouped
+
+
+def annotate_related_ids(queryset, field_names):
+    """ Add the sorted related ids of the M2M fields to every row
+
+    Only PostgreSQL can aggregate them into an array, in a subquery
+    evaluated for the rows of the page alone. Elsewhere the queryset is
+    returned as is, and the serializer loads the ids of the whole page
+    with one query per field.
+    """
+    if connections[queryset.db].vendor != 'postgresql' or not field_names:
+        return queryset
+
+    from django.contrib.postgres.aggregates import ArrayAgg
+    from django.contrib.postgres.fields import ArrayField
+
+    annotations = {}
+    for field_name in field_names:
+        through, source, column = _links(queryset.model, field_name)
+        ids = through.objects.filter(**{source: OuterRef('id')}) \
+            .order_by().values(source) \
+            .annotate(ids=ArrayAgg(column)).values('ids')
+        annotations[related_ids_key(field_name)] = Subquery(
+            ids, output_field=ArrayField(IntegerField())
+        )
+
+    return queryset.annotate(**annotations)
@@ -1,23 +1,131 @@
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Prefetch
+from django.db.models.functions import Coalesce
+from django.http import StreamingHttpResponse
+from django.utils.translation import gettext as _
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.relations import ManyRelatedField
 from rest_framework.response import Response
+from rest_framework.serializers import ListSerializer
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 
 from core.models import Tag, Ingredients, Recipe
+from core.search import search_recipes
+from core.stats import get_recipe_stats
 from recipe import serializers
+from recipe.cache import CachedListMixin, bump_generation
+from recipe.exports import iter_json
+from recipe.filters import MATCH_ANY, MATCH_MODES, RECIPE_FILTERS, \
+    RECIPE_ORDERINGS, filter_by_related, lookup_filters, parse_ordering
+from recipe.images import schedule_processing
+from recipe.pagination import RecipeAttrPagination, RecipePagination
+from recipe.uploads import RecipeImageUploadHandler
+from recipe.values import annotate_related_ids, related_ids_key
+from user.authentication import CachedTokenAuthentication
 
 
-class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
+class BulkCreateMixin:
+    """ Accept a list payload on create and save it in one transaction """
+
+    def create(self, request, *args, **kwargs):
+        if not isinstance(request.data, list):
+            return super().create(request, *args, **kwargs)
+
+        if len(request.data) > settings.API_MAX_BULK_SIZE:
+            msg = _('Ensure this list has at most %d items.')
+            raise ValidationError([msg % settings.API_MAX_BULK_SIZE])
+
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            serializer.save(user=self.request.user)
+        bump_generation(self.request.user.id)
+
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class BaseRecipeAttrViewSet(BulkCreateMixin,
+                            CachedListMixin,
+                            viewsets.GenericViewSet,
                             mixins.ListModelMixin,
                             mixins.CreateModelMixin):
     """ base viewset for user owned recipe attributes """
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = RecipeAttrPagination
+
+    list_serializer_class = None
+    count_serializer_class = None
+
+    @property
+    def with_counts(self):
+        """ Return whether ?with_counts=1 asked for the recipe counts """
+        return self.request.query_params.get('with_counts') in ('1', 'true')
 
     def get_queryset(self):
         """ Return objects for current authenticated user """
-        return self.queryset.filter(user=self.request.user).order_by('-name')
+        queryset = self.queryset.filter(user=self.request.user)
+        if self.action != 'list':
+            return queryset.order_by('-name')
+
+        if self.with_counts:
+            queryset = queryset.annotate(
+                recipe_count=Coalesce('stats__recipe_count', 0)
+            )
+        columns = self.get_serializer_class().get_columns()[0]
+        return queryset.order_by('-name').values(*columns)
+
+    def get_serializer_class(self):
+        """ List values() rows, with the recipe counts on request """
+        if self.action == 'list':
+            if self.with_counts:
+                return self.count_serializer_class
+            return self.list_serializer_class
+
+        return self.serializer_class
+
+    def get_serializer_context(self):
+        """ Pass the upsert mode requested with ?upsert=1 """
+        context = super().get_serializer_context()
+        context['upsert'] = \
+            self.request.query_params.get('upsert') in ('1', 'true')
+        return context
+
+    def _get_by_name(self, name):
+        """ Return the user's object named name ignoring case, or None """
+        return self.queryset.filter(
+            user=self.request.user,
+            name__iexact=name
+        ).first()
+
+    def create(self, request, *args, **kwargs):
+        """ Create an object, or return the existing one in upsert mode """
+        if isinstance(request.data, list) or \
+                not self.get_serializer_context()['upsert']:
+            return super().create(request, *args, **kwargs)
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        name = serializer.validated_data['name']
+        existing = self._get_by_name(name)
+        if existing is None:
+            try:
+                with transaction.atomic():
+                    self.perform_create(serializer)
+                return Response(
+                    serializer.data,
+                    status=status.HTTP_201_CREATED
+                )
+            except IntegrityError:
+                existing = self._get_by_name(name)
+
+        return Response(
+            self.get_serializer(existing).data,
+            status=status.HTTP_200_OK
+        )
 
     def perform_create(self, serializer):
         """ Create a new object"""
@@ -28,24 +136,142 @@ class TagViewSet(BaseRecipeAttrViewSet):
     """ Manage Tags in the database """
     queryset = Tag.objects.all()
     serializer_class = serializers.TagSerializer
+    list_serializer_class = serializers.TagValuesSerializer
+    count_serializer_class = serializers.TagCountValuesSerializer
+    cache_prefix = 'tags'
 
 
 class IngredientsViewSet(BaseRecipeAttrViewSet):
     """ Manage the ingredients in the database """
     queryset = Ingredients.objects.all()
     serializer_class = serializers.IngredientSerializers
+    list_serializer_class = serializers.IngredientValuesSerializer
+    count_serializer_class = serializers.IngredientCountValuesSerializer
+    cache_prefix = 'ingredients'
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(BulkCreateMixin,
+                    CachedListMixin,
+                    viewsets.ModelViewSet):
     """ manage recipes in the database """
     serializer_class = serializers.RecipeSerializer
+    cache_prefix = 'recipes'
     queryset = Recipe.objects.all()
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = RecipePagination
+    # the actions whose responses ?fields= and ?expand= shape
+    read_actions = ('list', 'retrieve', 'export')
 
-    def _params_to_ints(self, qs):
+    def _params_to_ints(self, qs, param):
         """ Convert a list of strig ID's to a list of intergers """
-        return [int(str_id) for str_id in qs.split(',')]
+        try:
+            return [int(str_id) for str_id in qs.split(',')]
+        except ValueError:
+            msg = _('Expected a comma separated list of integer ids.')
+            raise ValidationError({param: [msg]})
+
+    def _match_mode(self, param):
+        """ Return the validated any/all match mode in param """
+        mode = self.request.query_params.get(param, MATCH_ANY)
+        if mode not in MATCH_MODES:
+            msg = _('Expected one of: %s.') % ', '.join(MATCH_MODES)
+            raise ValidationError({param: [msg]})
+
+        return mode
+
+    def _names_param(self, param, allowed):
+        """ Return the comma separated names of param, None when absent """
+        names = [
+            name for name in self.request.query_params.get(param, '')
+            .split(',') if name
+        ]
+        if not names:
+            return None
+        if not set(names) <= set(allowed):
+            msg = _('Expected a comma separated list of: %s.') % \
+                ', '.join(allowed)
+            raise ValidationError({param: [msg]})
+
+        return names
+
+    def get_serializer_context(self):
+        """ Pass the fields and relations requested with ?fields= and
+        ?expand= to the serializers of the read actions
+        """
+        context = super().get_serializer_context()
+        if self.action in self.read_actions:
+            serializer_class = self.get_serializer_class()
+            context['fields'] = self._names_param(
+                'fields', serializer_class.Meta.fields
+            )
+            context['expand'] = self._names_param(
+                'expand', serializer_class.expandable_fields
+            )
+        return context
+
+    def _prefetch_related_objects(self, queryset):
+        """ Load only the columns and relations the current action
+        serializes, as narrowed by ?fields= and ?expand=
+        """
+        if self.action == 'upload_image':
+            return queryset
+        if self.values_list:
+            return self._values_queryset(queryset)
+
+        serializer = self.get_serializer_class()(
+            context=self.get_serializer_context()
+        )
+        columns = {'id'}
+        prefetches = []
+        for name, field in serializer.fields.items():
+            if isinstance(field, ListSerializer):
+                related = field.child.Meta.model.objects \
+                    .only(*field.child.fields)
+            elif isinstance(field, ManyRelatedField):
+                related = field.child_relation.queryset.only('id')
+            else:
+                columns.add(serializer.field_columns.get(name, field.source))
+                continue
+            prefetches.append(Prefetch(name, queryset=related))
+        queryset = queryset.prefetch_related(*prefetches)
+        if self.action not in self.read_actions:
+            # the saved instances need all their columns
+            return queryset
+
+        if self.action == 'list':
+            # the pagination reads the ordering columns of the last row
+            columns.update(field.lstrip('-') for field in self.get_ordering())
+        model_columns = {
+            field.name for field in Recipe._meta.concrete_fields
+        }
+        return queryset.only(*columns & model_columns)
+
+    @property
+    def values_list(self):
+        """ Return whether the action lists values() rows, which it does
+        unless relations are expanded into objects
+        """
+        return self.action == 'list' and \
+            not self.request.query_params.get('expand')
+
+    def _values_queryset(self, queryset):
+        """ Return the rows of the columns and related ids the list needs """
+        columns, related = self.get_serializer_class().get_columns(
+            self.get_serializer_context()['fields']
+        )
+        # the pagination reads the ordering columns of the last row
+        columns.extend(
+            name for name in (field.lstrip('-')
+                              for field in self.get_ordering())
+            if name not in columns
+        )
+        queryset = annotate_related_ids(queryset, related)
+
+        return queryset.values(*columns, *(
+            key for key in map(related_ids_key, related)
+            if key in queryset.query.annotations
+        ))
 
     def get_queryset(self):
         """ Retrieve the recipes for the authenticated user """
@@ -53,19 +279,60 @@ class RecipeViewSet(viewsets.ModelViewSet):
         ingredients = self.request.query_params.get('ingredients')
         queryset = self.queryset
         if tag:
-            tag_ids = self._params_to_ints(tag)
-            queryset = queryset.filter(tag__id__in=tag_ids)
+            tag_ids = self._params_to_ints(tag, 'tag')
+            queryset = filter_by_related(
+                queryset,
+                Recipe.tag.through,
+                'tag_id',
+                tag_ids,
+                self._match_mode('tag_mode')
+            )
         if ingredients:
-            ingredient_id = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredient_id)
+            ingredient_id = self._params_to_ints(ingredients, 'ingredients')
+            queryset = filter_by_related(
+                queryset,
+                Recipe.ingredients.through,
+                'ingredients_id',
+                ingredient_id,
+                self._match_mode('ingredients_mode')
+            )
 
-        return queryset.filter(user=self.request.user)
+        queryset = queryset.filter(
+            user=self.request.user,
+            **lookup_filters(self.request.query_params, Recipe, RECIPE_FILTERS)
+        )
+        if self.search_query:
+            queryset = search_recipes(queryset, self.search_query)
+        return self._prefetch_related_objects(queryset)
+
+    @property
+    def search_query(self):
+        """ Return the full-text search requested with ?q= """
+        return self.request.query_params.get('q', '').strip()
+
+    def get_ordering(self):
+        """ Order search results by relevance, others by ?ordering= or
+        by creation
+        """
+        ordering = self.request.query_params.get('ordering')
+        if self.search_query:
+            if ordering:
+                msg = _('Search results are ordered by relevance.')
+                raise ValidationError({'ordering': [msg]})
+            return ('-rank', 'id')
+        if ordering:
+            return parse_ordering(ordering, Recipe, RECIPE_ORDERINGS)
+
+        return self.pagination_class.ordering
 
     def get_serializer_class(self):
         """ Return appropriate serializer class """
         if self.action == 'retrieve':
             return serializers.RecipeDetailSerializer
 
+        elif self.values_list:
+            return serializers.RecipeValuesSerializer
+
         elif self.action == 'upload_image':
             return serializers.RecipeImageSerializer
 
@@ -78,14 +345,24 @@ class RecipeViewSet(viewsets.ModelViewSet):
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
         """ upload an image to recipe """
+        upload_handler = RecipeImageUploadHandler(request._request)
+        request._request.upload_handlers = [upload_handler]
         recipe = self.get_object()
         serializer = self.get_serializer(
             recipe,
             data=request.data
         )
+        if upload_handler.error:
+            return Response(
+                {'image': [upload_handler.error]},
+                status=upload_handler.error_status
+            )
 
         if serializer.is_valid():
-            serializer.save()
+            # the stored image stays pending until the recipe is committed
+            with transaction.atomic():
+                serializer.save()
+            schedule_processing(recipe.image.name)
             return Response(
                 serializer.data,
                 status=status.HTTP_200_OK
@@ -94,3 +371,30 @@ class RecipeViewSet(viewsets.ModelViewSet):
             serializer.errors,
             status=status.HTTP_400_BAD_REQUEST
         )
+
+    @action(methods=['GET'], detail=False)
+    def stats(self, request):
+        """ Return the recipe totals of the user and the counts per tag
+        and per ingredient, kept up to date by recipe.signals
+        """
+        serializer = serializers.RecipeStatsSerializer(
+            get_recipe_stats(request.user),
+            context=self.get_serializer_context()
+        )
+        return Response(serializer.data)
+
+    @action(methods=['GET'], detail=False)
+    def export(self, request):
+        """ Stream every matching recipe as JSON, or NDJSON with ?ndjson=1 """
+        ndjson = request.query_params.get('ndjson') in ('1', 'true')
+        content = iter_json(
+            self.filter_queryset(self.get_queryset()),
+            self.get_serializer_class(),
+            settings.RECIPE_EXPORT_CHUNK_SIZE,
+            ndjson=ndjson,
+            context=self.get_serializer_context()
+        )
+        content_type = 'application/x-ndjson' if ndjson \
+            else 'application/json'
+
+        return StreamingHttpResponse(content, content_type=content_type)
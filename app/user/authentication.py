@@ -0,0 +1,71 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.translation import ugettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from core.metrics import registry
+
+
+token_cache_stats = registry.cache_stats('auth-token')
+
+
+def get_token_cache():
+    """ Return the cache holding the authenticated tokens, None when the
+    tokens are not cached
+    """
+    if settings.AUTH_TOKEN_CACHE is None:
+        return None
+
+    return caches[settings.AUTH_TOKEN_CACHE]
+
+
+def token_cache_key(key):
+    """ Return the cache key of a token key """
+    return f'auth-token:{key}'
+
+
+def invalidate_token(key):
+    """ Drop a token from the cache """
+    cache = get_token_cache()
+    if cache is not None:
+        cache.delete(token_cache_key(key))
+
+
+def invalidate_user_tokens(user):
+    """ Drop every token of user from the cache """
+    cache = get_token_cache()
+    if cache is not None:
+        keys = Token.objects.filter(user=user).values_list('key', flat=True)
+        cache.delete_many([token_cache_key(key) for key in keys])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """ Token authentication caching the user of every token
+
+    A cached token authenticates without any query. The cached user is
+    dropped whenever the user is saved or the token deleted, see
+    user.signals, so changes made with QuerySet.update() are only seen
+    once the cached entry expires.
+    """
+
+    def authenticate_credentials(self, key):
+        cache = get_token_cache()
+        if cache is None:
+            return super().authenticate_credentials(key)
+
+        cache_key = token_cache_key(key)
+        user = cache.get(cache_key)
+        token_cache_stats.record(user is not None)
+        if user is None:
+            user, token = super().authenticate_credentials(key)
+            cache.set(cache_key, user, settings.AUTH_TOKEN_CACHE_TTL)
+            return (user, token)
+
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+
+        return (user, self.get_model()(key=key, user=user))
@@ -1,9 +1,14 @@
 from django.contrib.auth import get_user_model, authenticate
 from django.utils.translation import ugettext_lazy as _
-from rest_framework import serializers
+from django.conf import settings
+from rest_framework import exceptions, serializers
 
+from core.metrics import TimedSerializerMixin
+from user.throttling import login_blocked, record_login_failure, \
+    reset_login_failures
 
-class UserSerializer(serializers.ModelSerializer):
+
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """ Serilizer for User objets """
 
     class Meta:
@@ -38,15 +43,20 @@ class AuthTokenSerializer(serializers.Serializer):
         """ validate and authenticate the user """
         email = attrs.get('email')
         password = attrs.get('password')
+        request = self.context.get('request')
+        if login_blocked(request, email):
+            raise exceptions.Throttled(wait=settings.LOGIN_FAILURES_WINDOW)
 
         user = authenticate(
-            request=self.context.get('request'),
+            request=request,
             username=email,
             password=password
         )
         if not user:
+            record_login_failure(request, email)
             msg = _('unable to authenticate with provided credentials')
             raise serializers.ValidationError(msg, code='authentication')
 
+        reset_login_failures(request, email)
         attrs['user'] = user
         return attrs
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from user.authentication import invalidate_token, invalidate_user_tokens
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    """ Stop authenticating with a token once it is deleted """
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_saved_user_tokens(sender, instance, created, **kwargs):
+    """ Look the tokens of a changed user up again, wherever they are
+    changed from
+    """
+    if not created:
+        invalidate_user_tokens(instance)
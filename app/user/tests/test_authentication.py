@@ -0,0 +1,121 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from user.authentication import get_token_cache, token_cache_key, \
+    token_cache_stats
+
+
+ME_URL = reverse('user:me')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """ Test authenticating with a cached token """
+
+    def setUp(self):
+        get_token_cache().clear()
+        token_cache_stats.reset()
+        self.user = get_user_model().objects.create_user(
+            email='test@test.com',
+            password='test@123',
+            name='name'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_token_lookup_cached(self):
+        """ Test the token and its user are only looked up once """
+        with self.assertNumQueries(1):
+            self.client.get(ME_URL)
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+        self.assertEqual(
+            token_cache_stats.as_dict(),
+            {'hits': 1, 'misses': 1, 'hit_rate': 0.5}
+        )
+
+    def test_update_user_invalidates_token(self):
+        """ Test saving the user drops their cached tokens """
+        self.client.get(ME_URL)
+
+        self.user.name = 'new name'
+        self.user.save()
+
+        self.assertIsNone(
+            get_token_cache().get(token_cache_key(self.token.key))
+        )
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.data['name'], 'new name')
+
+    def test_deactivated_user_rejected(self):
+        """ Test a cached token of a deactivated user stops authenticating """
+        self.client.get(ME_URL)
+
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_demoted_user_loses_staff_access(self):
+        """ Test a cached token carries the current staff status """
+        self.user.is_staff = True
+        self.user.save()
+        self.client.get(ME_URL)
+
+        self.user.is_staff = False
+        self.user.save()
+        res = self.client.get(reverse('metrics'))
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_token_cache_stats_in_metrics(self):
+        """ Test the token cache hit rate is reported to admin users """
+        self.user.is_staff = True
+        self.user.save()
+        self.client.get(ME_URL)
+
+        res = self.client.get(reverse('metrics'))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['caches']['auth-token']['misses'], 1)
+
+    def test_deleted_token_rejected(self):
+        """ Test a deleted token stops authenticating """
+        self.client.get(ME_URL)
+
+        self.token.delete()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_invalid_token_rejected(self):
+        """ Test an unknown token is rejected and not cached """
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIsNone(get_token_cache().get('auth-token:invalid'))
+
+    @override_settings(AUTH_TOKEN_CACHE=None)
+    def test_token_cache_disabled(self):
+        """ Test tokens are looked up every time with the token cache off """
+        self.client.get(ME_URL)
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('authtoken_token', queries[0]['sql'])
+        self.assertEqual(token_cache_stats.as_dict()['hits'], 0)
@@ -1,10 +1,12 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from user.throttling import get_login_failures_cache
+
 
 CREATE_USER_URL = reverse('user:create')
 TOKEN_URL = reverse('user:token')
@@ -139,3 +141,49 @@ class PrivateUserApiTests(TestCase):
         self.assertEqual(self.user.name, payload['name'])
         self.assertTrue(self.user.check_password(payload['password']))
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+@override_settings(LOGIN_FAILURES_LIMIT=2)
+class LoginFailuresTests(TestCase):
+    """ Test blocking logins after repeated failures """
+
+    def setUp(self):
+        get_login_failures_cache().clear()
+        self.client = APIClient()
+        self.payload = {'email': 'test@test.com', 'password': 'test@123'}
+        create_user(**self.payload)
+
+    def test_login_blocked_after_failures(self):
+        """ Test the client is refused once the limit is reached, even with
+        the right password, while the owner logs in from elsewhere
+        """
+        for _ in range(2):
+            res = self.client.post(
+                TOKEN_URL,
+                {'email': 'test@test.com', 'password': 'wrong'},
+                REMOTE_ADDR='10.0.0.1'
+            )
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.post(
+            TOKEN_URL, self.payload, REMOTE_ADDR='10.0.0.1'
+        )
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertNotIn('token', res.data)
+
+        res = self.client.post(
+            TOKEN_URL, self.payload, REMOTE_ADDR='10.0.0.2'
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('token', res.data)
+
+    def test_login_success_resets_failures(self):
+        """ Test a successful login forgets the previous failures """
+        wrong = {'email': 'test@test.com', 'password': 'wrong'}
+        self.client.post(TOKEN_URL, wrong)
+        self.client.post(TOKEN_URL, self.payload)
+        self.client.post(TOKEN_URL, wrong)
+
+        res = self.client.post(TOKEN_URL, self.payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
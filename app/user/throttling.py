@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+
+
+def _failures_key(request, username):
+    """ Return the key counting the failures of username from the client
+    of request, so that others cannot lock the account's owner out
+    """
+    ident = BaseThrottle().get_ident(request)
+    return f'login-failures:{ident}:{username.lower()}'
+
+
+def get_login_failures_cache():
+    """ Return the cache counting the failed logins """
+    return caches[settings.LOGIN_FAILURES_CACHE]
+
+
+def login_blocked(request, username):
+    """ Return whether username failed to log in too many times from the
+    client of request
+    """
+    key = _failures_key(request, username)
+    failures = get_login_failures_cache().get(key, 0)
+    return failures >= settings.LOGIN_FAILURES_LIMIT
+
+
+def record_login_failure(request, username):
+    """ Count a failed login of username for the blocking window """
+    cache = get_login_failures_cache()
+    key = _failures_key(request, username)
+    if not cache.add(key, 1, settings.LOGIN_FAILURES_WINDOW):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, 1, settings.LOGIN_FAILURES_WINDOW)
+
+
+def reset_login_failures(request, username):
+    """ Forget the failed logins of username from the client of request """
+    get_login_failures_cache().delete(_failures_key(request, username))